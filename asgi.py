@@ -0,0 +1,23 @@
+"""
+The ASGI entry point of the API for asyncio servers such as Uvicorn:
+
+    EOSERV_API_ARGS="--readonly --threads 8 --concurrency 64" uvicorn --workers 4 asgi:app
+
+Requests are accepted and answered on the event loop of every worker while the Flask app runs on a pool of
+--threads threads, so slow pub decoding and database reads only ever hold up a thread. Each worker handles or
+queues at most --concurrency requests and answers 503 to the rest. The background threads are started once the
+server reports startup through the lifespan protocol.
+"""
+import os
+import shlex
+
+import main
+from eoasgi import AsyncApp
+
+args = main.parse_arguments(shlex.split(os.environ.get("EOSERV_API_ARGS", "")))
+main.configure(args)
+if args.preload:
+    main.preload(args.preload_processes)
+
+app = AsyncApp(main.app, args.threads, args.concurrency, startup=lambda: main.start(args), shutdown=main.stop)
+main.server = app
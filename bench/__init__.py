@@ -0,0 +1,4 @@
+"""
+Microbenchmarks and a load driver for the EOServ REST API, run against synthetic pub, ini and database files.
+See bench/__main__.py for usage.
+"""
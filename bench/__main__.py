@@ -0,0 +1,108 @@
+"""
+Benchmarks the pub and ini readers, the memory of pub records, character serialization and a mixed request profile
+against synthetic data:
+
+    python -m bench --items 10000 --characters 20000 --output results.json
+    python -m bench --compare results.json
+
+Every run writes its results as JSON. With --compare, the results are also compared with those of an earlier run,
+printing the ratio of every timing and of the throughput, where a ratio above 1 means this run is slower.
+"""
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+import eogen
+from bench import micro, synthetic
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """
+    :param results: the results of this run
+    :param baseline: the results of an earlier run
+    :return: the ratio of the time taken by this run to that of the earlier run, for every benchmark of both runs
+    """
+    ratios = {name: timing["min"] / baseline["micro"][name]["min"] for name, timing in results["micro"].items()
+              if name in baseline.get("micro", {}) and baseline["micro"][name]["min"]}
+    if "load" in results and "load" in baseline:
+        ratios["load"] = baseline["load"]["throughput"] / results["load"]["throughput"]
+    return ratios
+
+
+def run(args) -> dict:
+    """
+    :param args: the parsed command line arguments
+    :return: the results of every benchmark
+    """
+    counts = {"items": args.items, "npcs": args.npcs, "spells": args.spells, "classes": args.classes,
+              "maps": args.maps}
+    directory = args.directory or tempfile.mkdtemp(prefix="eobench")
+    start = time.perf_counter()
+    files = synthetic.generate(directory, map_size=args.map_size, characters=args.characters, guilds=args.guilds,
+                               seed=args.seed, **counts)
+    results = {
+        "meta": {"python": sys.version.split()[0], "platform": platform.platform(), "time": time.time(),
+                 "seed": args.seed, "map_size": args.map_size, "characters": args.characters, "guilds": args.guilds,
+                 **counts, "generate_seconds": time.perf_counter() - start},
+        "micro": micro.bench_readers(files, args.repeat),
+        "records": micro.bench_records(files, args.repeat),
+    }
+    results["micro"].update(micro.bench_characters(files, args.repeat))
+    if args.requests:
+        import main
+        from bench import load
+
+        options = ["--readonly", "--decode-cache", "", "--database", "sqlite:///" + os.path.abspath(files["database"])]
+        for key in ("eif", "enf", "esf", "ecf", "drops", "shops", "skills", "maps"):
+            options += ["--" + key, files[key]]
+        main_args = main.parse_arguments(options)
+        main.configure(main_args)
+        main.start(main_args)
+        try:
+            client = main.app.test_client()
+            load.replay(client, files, counts, min(args.requests, 200), seed=args.seed + 1)  # warm up caches
+            results["load"] = load.replay(client, files, counts, args.requests, seed=args.seed)
+        finally:
+            main.stop()
+    return results
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog="python -m bench", description="Benchmark the EOServ REST API.")
+    parser.add_argument("--directory", help="directory to write the synthetic files to, defaults to a temporary one")
+    parser.add_argument("--items", type=int, default=10000, help="number of synthetic items")
+    parser.add_argument("--npcs", type=int, default=5000, help="number of synthetic NPCs")
+    parser.add_argument("--spells", type=int, default=2000, help="number of synthetic spells")
+    parser.add_argument("--classes", type=int, default=30, help="number of synthetic classes")
+    parser.add_argument("--maps", type=int, default=10, help="number of synthetic maps")
+    parser.add_argument("--map-size", type=int, default=100,
+                        help="width and height of the synthetic maps, at most 252")
+    parser.add_argument("--characters", type=int, default=20000, help="number of synthetic characters")
+    parser.add_argument("--guilds", type=int, default=200, help="number of synthetic guilds")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the synthetic data and request mix")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs of every microbenchmark")
+    parser.add_argument("--requests", type=int, default=5000, help="number of requests replayed, 0 to skip")
+    parser.add_argument("--output", help="file to write the results to, defaults to standard output")
+    parser.add_argument("--compare", help="results of an earlier run to compare with")
+    args = parser.parse_args()
+    if min(args.items, args.npcs, args.spells, args.classes, args.maps, args.characters, args.guilds) < 1:
+        parser.error("every synthetic file needs at least one entry")
+    if not 1 <= args.map_size <= eogen.CHAR_MAX:
+        parser.error("--map-size must be between 1 and %d" % eogen.CHAR_MAX)
+
+    results = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            results["compare"] = compare(results, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    for name, ratio in results.get("compare", {}).items():
+        print("%-24s %.2fx" % (name, ratio), file=sys.stderr)
@@ -0,0 +1,186 @@
+"""
+Request mix benchmarks: replay() drives a test client of the app in process, for python -m bench, while run()
+drives a running server over HTTP to compare the throughput of its entry points, e.g. the Flask development server:
+
+    python main.py --readonly
+    python -m bench.load http://127.0.0.1:5000 --clients 32 --seconds 20
+
+against the ASGI app:
+
+    EOSERV_API_ARGS="--readonly --threads 8 --concurrency 64" uvicorn --workers 4 asgi:app
+    python -m bench.load http://127.0.0.1:8000 --clients 32 --seconds 20
+"""
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass, field
+
+# a mix of pub, ini, join and database requests against the shipped data, cycled through by every client of run
+PROFILE = [
+    "/api/items/1",
+    "/api/items?limit=50",
+    "/api/npcs/1",
+    "/api/spells/1",
+    "/api/classes",
+    "/api/drops/1/simulate?kills=10000&seed=1",
+    "/api/items/1/sources",
+    "/api/npcs/1/drops",
+    "/api/leaderboards/level",
+    "/api/leaderboards/exp?limit=25",
+]
+
+# the routes of the mixed request profile of replay and their weights, formatted with random ids, names and tags
+ROUTES = [
+    ("/api/items/{item}", 20),
+    ("/api/items?limit=50&offset={item}", 5),
+    ("/api/items?type=Weapon&fields=id,name,min_damage,max_damage&limit=20", 3),
+    ("/api/items/by-name/Gold", 2),
+    ("/api/items/{item}/sources", 5),
+    ("/api/npcs/{npc}", 10),
+    ("/api/npcs/{npc}/drops", 5),
+    ("/api/spells/{spell}", 5),
+    ("/api/spells/{spell}/trainers", 2),
+    ("/api/classes/{class_id}", 2),
+    ("/api/drops/{npc}/simulate?kills=10000&seed=1", 2),
+    ("/api/characters/{name}", 15),
+    ("/api/characters?names={name},{other},{third}", 4),
+    ("/api/guilds/{tag}", 3),
+    ("/api/guilds/{tag}/characters?limit=50", 3),
+    ("/api/leaderboards/level?limit=50", 5),
+    ("/api/leaderboards/exp/{name}", 3),
+    ("/api/maps/{map_id}", 1),
+]
+
+
+def replay(client, files: dict, counts: dict, requests: int, routes: list[tuple[str, int]] = None,
+           seed: int = 1) -> dict:
+    """
+    Replays a weighted mix of requests against a test client of the app, in a single thread.
+    :param client: the test client, e.g. main.app.test_client()
+    :param files: the synthetic files, as returned by bench.synthetic.generate
+    :param counts: the number of items, npcs, spells, classes and maps to draw ids from
+    :param requests: the number of requests to send
+    :param routes: the (route, weight) pairs to draw requests from, defaults to ROUTES
+    :param seed: the seed of the random number generator, the same seed replays the same requests
+    :return: the throughput, bytes served, status counts and latency of every route
+    """
+    routes = routes or ROUTES
+    rng = random.Random(seed)
+    drawn = rng.choices([route for route, _ in routes], [weight for _, weight in routes], k=requests)
+    latencies = {route: [] for route, _ in routes}
+    statuses = {}
+    served = 0
+    start = time.perf_counter()
+    for route in drawn:
+        path = route.format(item=rng.randint(1, counts["items"]), npc=rng.randint(1, counts["npcs"]),
+                            spell=rng.randint(1, counts["spells"]), class_id=rng.randint(1, counts["classes"]),
+                            name=rng.choice(files["names"]), other=rng.choice(files["names"]),
+                            third=rng.choice(files["names"]), tag=rng.choice(files["tags"]),
+                            map_id=rng.randint(1, counts["maps"]))
+        began = time.perf_counter()
+        response = client.get(path)
+        served += len(response.get_data())
+        latencies[route].append(time.perf_counter() - began)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    seconds = time.perf_counter() - start
+
+    results = {}
+    for route, values in latencies.items():
+        if values:
+            values.sort()
+            results[route] = {"requests": len(values), "mean_ms": statistics.mean(values) * 1000,
+                              "p50_ms": percentile(values, 0.5) * 1000, "p99_ms": percentile(values, 0.99) * 1000}
+    return {"requests": requests, "seconds": seconds, "throughput": requests / seconds, "bytes": served,
+            "statuses": {str(status): count for status, count in sorted(statuses.items())}, "routes": results}
+
+
+@dataclass
+class LoadReport:
+    """A class used to represent the throughput and latency of a load run."""
+    url: str
+    clients: int
+    seconds: float
+    requests: int = 0
+    errors: int = 0
+    statuses: dict = field(default_factory=dict)
+    throughput: float = 0.0
+    latency_ms: dict = field(default_factory=dict)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    :param values: the sorted values
+    :param fraction: the fraction of values below the percentile, e.g. 0.99
+    :return: the value at the percentile
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def run(url: str, paths: list[str] = None, clients: int = 16, seconds: float = 10.0) -> LoadReport:
+    """
+    Sends requests from many concurrent clients, each keeping one request in flight, for a number of seconds.
+    :param url: the base url of the server, e.g. http://127.0.0.1:5000
+    :param paths: the paths requested in turn by every client, defaults to PROFILE
+    :param clients: the number of concurrent clients
+    :param seconds: the duration of the run
+    :return: the throughput and latency of the run
+    """
+    paths = paths or PROFILE
+    report = LoadReport(url, clients, seconds)
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(offset: int):
+        done = []
+        statuses = {}
+        errors = 0
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url + paths[i % len(paths)], timeout=30) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except OSError:
+                status = None
+                errors += 1
+            done.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            i += 1
+        with lock:
+            latencies.extend(done)
+            report.errors += errors
+            for status, count in statuses.items():
+                report.statuses[str(status)] = report.statuses.get(str(status), 0) + count
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    report.requests = len(latencies)
+    report.throughput = report.requests / seconds
+    report.latency_ms = {name: percentile(latencies, fraction) * 1000
+                         for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))}
+    return report
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog="python -m bench.load",
+                            description="Measure the throughput of a running EOServ REST API.")
+    parser.add_argument("url", help="base url of the server, e.g. http://127.0.0.1:5000")
+    parser.add_argument("--clients", type=int, default=16, help="number of concurrent clients")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of the run")
+    parser.add_argument("--path", action="append", help="path to request instead of the default profile")
+    args = parser.parse_args()
+    print(json.dumps(asdict(run(args.url.rstrip("/"), args.path, args.clients, args.seconds)), indent=2))
@@ -0,0 +1,146 @@
+import gc
+import sqlite3
+import statistics
+import time
+import tracemalloc
+from enum import Enum
+from typing import Any, Callable
+
+import eolib
+
+# the readers benchmarked against the synthetic files, keyed by the command line argument of the file
+READERS = {
+    "eif": eolib.read_eif,
+    "enf": eolib.read_enf,
+    "esf": eolib.read_esf,
+    "ecf": eolib.read_ecf,
+    "drops": eolib.read_drops,
+    "shops": eolib.read_shops,
+    "skills": eolib.read_skills,
+}
+
+
+def measure(function: Callable[[], Any], repeat: int = 5, number: int = 1) -> dict:
+    """
+    Times a function with the garbage collector disabled, like timeit.
+    :param function: the function to time
+    :param repeat: the number of timed runs
+    :param number: the number of calls per run
+    :return: the minimum, median and mean seconds per call
+    """
+    timings = []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            timings.append((time.perf_counter() - start) / number)
+    finally:
+        if enabled:
+            gc.enable()
+    return {"min": min(timings), "median": statistics.median(timings), "mean": statistics.mean(timings),
+            "repeat": repeat, "number": number}
+
+
+def bench_readers(files: dict, repeat: int = 5) -> dict:
+    """
+    :param files: the synthetic files, as returned by bench.synthetic.generate
+    :param repeat: the number of timed runs of every reader
+    :return: the timing and entry count of every reader, keyed by reader name
+    """
+    results = {}
+    for key, reader in READERS.items():
+        entries = len(reader(files[key]))
+        results[reader.__name__] = dict(measure(lambda: reader(files[key]), repeat), entries=entries)
+    return results
+
+
+def allocated(function: Callable[[], Any]) -> int:
+    """
+    :param function: the function to measure, whose result is kept alive until it is measured
+    :return: the bytes still allocated by the function once it returned
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_records(files: dict, repeat: int = 5) -> dict:
+    """
+    Compares the slotted pub records and table-driven enum decoding of eolib with records holding a per-instance
+    __dict__ and enum fields decoded through Enum.__call__, as they were before.
+
+    Both kinds of record are copied from the same decoded entries, so they share their field values and only the
+    record objects themselves are measured.
+    :param files: the synthetic files, as returned by bench.synthetic.generate
+    :param repeat: the number of timed runs of every enum decode
+    :return: the bytes per record of both kinds of record and the seconds per value of both enum decodes, keyed by
+             pub class name
+    """
+    results = {}
+    for key in ("eif", "enf", "esf", "ecf"):
+        entries = READERS[key](files[key])
+        pub = type(entries[0])
+        unslotted = type(pub.__name__ + "Dict", (), {})
+
+        def copy(record_type: type) -> list:
+            copies = []
+            for entry in entries:
+                record = record_type.__new__(record_type)
+                for name in pub.__slots__:
+                    setattr(record, name, getattr(entry, name))
+                copies.append(record)
+            return copies
+
+        result = {
+            "entries": len(entries),
+            "slotted_bytes_per_record": allocated(lambda: copy(pub)) / len(entries),
+            "dict_bytes_per_record": allocated(lambda: copy(unslotted)) / len(entries),
+        }
+        for name in pub.__slots__:
+            enum = type(getattr(entries[0], name))
+            if issubclass(enum, Enum):
+                table = eolib.members(enum)
+                values = [getattr(entry, name).value for entry in entries]
+                result["%s_table" % name] = measure(lambda: [table[value] for value in values], repeat)["min"] / \
+                    len(values)
+                result["%s_call" % name] = measure(lambda: [enum(value) for value in values], repeat)["min"] / \
+                    len(values)
+        results[pub.__name__] = result
+    return results
+
+
+def bench_characters(files: dict, repeat: int = 5, limit: int = 5000) -> dict:
+    """
+    Times Character.serialize over characters of the synthetic database, detached from any session.
+    :param files: the synthetic files, as returned by bench.synthetic.generate
+    :param repeat: the number of timed runs
+    :param limit: the number of characters serialized per run
+    :return: the timing per character
+    """
+    from eodatabase import Character
+
+    # keyed by column name, since attributes such as class_id are named differently from their column
+    columns = {attribute.columns[0].name: attribute.key for attribute in Character.__mapper__.column_attrs}
+    with sqlite3.connect(files["database"]) as connection:
+        cursor = connection.execute("SELECT %s FROM characters LIMIT ?" % ", ".join("`%s`" % i for i in columns),
+                                    (limit,))
+        keys = [columns[i[0]] for i in cursor.description]
+        characters = [Character(**dict(zip(keys, row))) for row in cursor]
+
+    def serialize():
+        for character in characters:
+            character.serialize()
+
+    timing = measure(serialize, repeat)
+    for key in ("min", "median", "mean"):
+        timing[key] /= max(1, len(characters))
+    return {"Character.serialize": dict(timing, entries=len(characters))}
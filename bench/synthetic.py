@@ -0,0 +1,160 @@
+import os
+import random
+import sqlite3
+
+import eogen
+
+# the schema of the tables copied from the source database into a synthetic one
+TABLES = ("characters", "guilds")
+
+
+def write_drops(file: str, npcs: int, items: int, per_npc: int, rng: random.Random) -> str:
+    """
+    :param file: the path to write the drops.ini file to
+    :param npcs: the number of NPCs dropping items
+    :param items: the number of items to drop from
+    :param per_npc: the average number of drops per NPC
+    :param rng: the random number generator
+    :return: the path to the written file
+    """
+    with open(file, "w") as f:
+        f.write("# synthetic drops\n")
+        for npc in range(1, npcs + 1):
+            drops = ",".join("%d,%d,%d,%.2f" % (item, low, low + rng.randint(0, 4), rng.uniform(0.1, 60))
+                             for item, low in ((rng.randint(1, items), rng.randint(1, 3))
+                                               for _ in range(rng.randint(1, 2 * per_npc))))
+            f.write("%d = %s\n" % (npc, drops))
+    return file
+
+
+def write_shops(file: str, vendors: int, items: int, per_shop: int, rng: random.Random) -> str:
+    """
+    :param file: the path to write the shops.ini file to
+    :param vendors: the number of shops
+    :param items: the number of items to trade and craft
+    :param per_shop: the average number of trades per shop
+    :param rng: the random number generator
+    :return: the path to the written file
+    """
+    with open(file, "w") as f:
+        f.write("# synthetic shops\n")
+        for vendor in range(1, vendors + 1):
+            f.write("%d.name = Shop %d\n" % (vendor, vendor))
+            f.write("%d.trade = %s\n" % (vendor, ",".join(
+                "%d,%d,%d" % (rng.randint(1, items), price * 2, price)
+                for price in (rng.randint(1, 5000) for _ in range(rng.randint(1, 2 * per_shop))))))
+            f.write("%d.craft = %s\n" % (vendor, ",".join(
+                "%d,%s" % (rng.randint(1, items), ",".join("%d,%d" % (rng.randint(1, items), rng.randint(1, 10))
+                                                            for _ in range(4)))
+                for _ in range(rng.randint(1, 4)))))
+    return file
+
+
+def write_skills(file: str, masters: int, spells: int, classes: int, per_master: int, rng: random.Random) -> str:
+    """
+    :param file: the path to write the skills.ini file to
+    :param masters: the number of skill masters
+    :param spells: the number of spells to teach
+    :param classes: the number of classes
+    :param per_master: the average number of spells taught per master
+    :param rng: the random number generator
+    :return: the path to the written file
+    """
+    with open(file, "w") as f:
+        f.write("# synthetic skills\n")
+        for master in range(1, masters + 1):
+            f.write("%d.name = Master %d\n" % (master, master))
+            f.write("%d.learn = %s\n" % (master, ",".join(
+                "%d,%d,%d,%d,%d,0,0,0,%s" % (rng.randint(1, spells), rng.randint(0, 50000), rng.randint(0, 100),
+                                             rng.randint(0, classes), rng.choice((0, rng.randint(1, spells))),
+                                             ",".join(str(rng.randint(0, 50)) for _ in range(6)))
+                for _ in range(rng.randint(1, 2 * per_master)))))
+    return file
+
+
+def write_database(file: str, source: str, characters: int, guilds: int, items: int, spells: int,
+                   rng: random.Random) -> tuple[str, list[str], list[str]]:
+    """
+    Writes an EOServ database of random characters and guilds, with the schema of an existing database.
+    :param file: the path to write the database to
+    :param source: the path to the database to copy the schema from
+    :param characters: the number of characters
+    :param guilds: the number of guilds, which about half the characters are a member of
+    :param items: the number of items to fill inventories, banks and paperdolls from
+    :param spells: the number of spells to fill spell books from
+    :param rng: the random number generator
+    :return: a tuple of the path to the written database, the character names and the guild tags
+    """
+    if os.path.exists(file):
+        os.remove(file)
+    with sqlite3.connect(source) as connection:
+        schema = [sql for _, sql in connection.execute("SELECT name, sql FROM sqlite_master WHERE sql IS NOT NULL")
+                  if any("`%s`" % table in sql.split("(", 1)[0] for table in TABLES)]
+    names = ["char%06d" % i for i in range(characters)]
+    tags = ["%03X" % i for i in range(guilds)]
+
+    def pairs(count: int, upper: int) -> str:
+        return "".join("%d,%d," % (rng.randint(1, upper), rng.randint(1, 1000)) for _ in range(count))
+
+    connection = sqlite3.connect(file)
+    try:
+        for sql in schema:
+            connection.execute(sql)
+        connection.executemany(
+            "INSERT INTO guilds (tag, name, description, created, ranks, bank) VALUES (?, ?, ?, ?, ?, ?)",
+            [(tag, "Guild %s" % tag, "A synthetic guild", 0, "Leader,Recruiter,,,,,,,Member", rng.randint(0, 10 ** 6))
+             for tag in tags])
+        connection.executemany(
+            "INSERT INTO characters (name, account, title, home, admin, class, gender, race, hairstyle, haircolor, "
+            "level, exp, str, int, wis, agi, con, cha, karma, goldbank, usage, inventory, bank, paperdoll, spells, "
+            "guild, guild_rank, guild_rank_string) "
+            "VALUES (?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(name, name, "", "Wanderer", rng.randint(0, 8), rng.randint(0, 1), rng.randint(0, 3),
+              rng.randint(1, 20), rng.randint(0, 9), level, level ** 3 * 10 + rng.randint(0, 999),
+              *(rng.randint(0, 200) for _ in range(6)), rng.randint(0, 2000), rng.randint(0, 10 ** 7),
+              rng.randint(0, 10 ** 5), pairs(rng.randint(0, 30), items), pairs(rng.randint(0, 60), items),
+              ",".join(str(rng.choice((0, rng.randint(1, items)))) for _ in range(15)) + ",",
+              pairs(rng.randint(0, 12), spells), *guild)
+             for name, level, guild in ((name, rng.randint(0, 250),
+                                         (rng.choice(tags), rng.randint(1, 9), "Member")
+                                         if tags and rng.random() < 0.5 else (None, None, None))
+                                        for name in names)])
+        connection.commit()
+    finally:
+        connection.close()
+    return file, names, tags
+
+
+def generate(directory: str, items: int = 10000, npcs: int = 5000, spells: int = 2000, classes: int = 30,
+             maps: int = 10, map_size: int = 100, characters: int = 20000, guilds: int = 200, seed: int = 1,
+             data: str = "data", database: str = "database.sdb") -> dict:
+    """
+    Writes a synthetic set of pub, map, ini and database files, the pubs scaled up from those shipped with the API.
+    :param directory: the directory to write the files to
+    :param items: the number of entries of the EIF pub
+    :param npcs: the number of entries of the ENF pub, drops.ini, shops.ini and skills.ini are sized after it
+    :param spells: the number of entries of the ESF pub
+    :param classes: the number of entries of the ECF pub
+    :param maps: the number of maps, with ids from 1
+    :param map_size: the width and height of every map
+    :param characters: the number of characters of the database
+    :param guilds: the number of guilds of the database
+    :param seed: the seed of the random number generator, the same seed writes the same files
+    :param data: the directory of the pub files to scale up
+    :param database: the database to copy the schema from
+    :return: a dictionary of the path of every file keyed by its command line argument, and the character names
+             and guild tags of the database
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+
+    def path(name: str) -> str:
+        return os.path.join(directory, name)
+
+    files = eogen.generate(directory, items, npcs, spells, classes, maps, map_size, seed, data)
+    files["drops"] = write_drops(path("drops.ini"), npcs, items, 6, rng)
+    files["shops"] = write_shops(path("shops.ini"), max(1, npcs // 20), items, 15, rng)
+    files["skills"] = write_skills(path("skills.ini"), max(1, npcs // 50), spells, classes, 10, rng)
+    files["database"], files["names"], files["tags"] = write_database(path("database.sdb"), database, characters,
+                                                                      guilds, items, spells, rng)
+    return files
@@ -0,0 +1,156 @@
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+# the body of the responses to requests turned away while every slot is taken
+BUSY = b'{"message":"The server is busy, try again shortly."}'
+
+
+class AsyncApp:
+    """
+    A class used to serve a WSGI app from an asyncio server through the ASGI interface.
+
+    Requests are read and answered on the event loop, and only the app itself runs on a bounded pool of threads,
+    where decoding files and querying the database may block without holding up the loop. At most concurrency
+    requests are handled or waiting for a thread at once, further requests are turned away immediately with a
+    503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, wsgi: Callable, threads: int = 8, concurrency: int = 64, startup: Callable[[], None] = None,
+                 shutdown: Callable[[], None] = None):
+        """
+        :param wsgi: the WSGI app
+        :param threads: the number of threads running the app
+        :param concurrency: the number of requests handled or waiting for a thread at once
+        :param startup: the function called once the server has started, e.g. to start background threads (optional)
+        :param shutdown: the function called when the server stops (optional)
+        """
+        self.wsgi = wsgi
+        self.threads = threads
+        self.concurrency = concurrency
+        self.startup = startup
+        self.shutdown = shutdown
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="asgi")
+        self.active = 0
+        self.handled = 0
+        self.rejected = 0
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(scope["type"], "is not supported")
+
+    async def lifespan(self, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self.startup is not None:
+                    try:
+                        await asyncio.get_running_loop().run_in_executor(self.executor, self.startup)
+                    except Exception as e:
+                        # the server reports the failure and exits instead of serving without background threads
+                        await send({"type": "lifespan.startup.failed", "message": "%s: %s" % (type(e).__name__, e)})
+                        return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.shutdown is not None:
+                    self.shutdown()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def http(self, scope: dict, receive: Callable, send: Callable):
+        if self.active >= self.concurrency:
+            self.rejected += 1
+            await send({"type": "http.response.start", "status": 503, "headers": [
+                (b"content-type", b"application/json"), (b"content-length", str(len(BUSY)).encode()),
+                (b"retry-after", b"1")]})
+            await send({"type": "http.response.body", "body": BUSY})
+            return
+
+        self.active += 1
+        try:
+            body = []
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    break
+            environ = self.environ(scope, b"".join(body))
+            status, headers, chunks = await asyncio.get_running_loop().run_in_executor(self.executor, self.run,
+                                                                                       environ)
+        finally:
+            self.active -= 1
+        self.handled += 1
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"".join(chunks)})
+
+    @staticmethod
+    def environ(scope: dict, body: bytes) -> dict:
+        """
+        :param scope: the ASGI scope of the request
+        :param body: the body of the request
+        :return: the WSGI environ of the request
+        """
+        server = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": "HTTP/%s" % scope["http_version"],
+            "REMOTE_ADDR": scope["client"][0] if scope.get("client") else "",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            name = name.decode("latin-1").upper().replace("-", "_")
+            if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                name = "HTTP_" + name
+            value = value.decode("latin-1")
+            environ[name] = environ[name] + "," + value if name in environ and name.startswith("HTTP_") else value
+        environ["CONTENT_LENGTH"] = str(len(body))
+        return environ
+
+    def run(self, environ: dict) -> tuple[int, list, list[bytes]]:
+        """
+        Runs the WSGI app for a single request, on a thread of the pool.
+        :param environ: the WSGI environ of the request
+        :return: the status, headers and body chunks of the response
+        """
+        response = []
+        chunks = []
+
+        def start_response(status: str, headers: list, exc_info=None):
+            response[:] = [int(status.split(" ", 1)[0]),
+                           [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]]
+            return chunks.append
+
+        result = self.wsgi(environ, start_response)
+        try:
+            chunks.extend(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response[0], response[1], chunks
+
+    def stats(self) -> dict:
+        """
+        :return: the size of the thread pool and the number of active, handled and rejected requests
+        """
+        return {"threads": self.threads, "concurrency": self.concurrency, "active": self.active,
+                "handled": self.handled, "rejected": self.rejected}
@@ -0,0 +1,385 @@
+import hashlib
+import mmap
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+import eolib
+
+
+def file_digest(file: str) -> str:
+    """
+    :param file: the path to the file
+    :return: the SHA-1 digest of the file
+    """
+    with open(file, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def fingerprint(file: str, header: bool = True) -> tuple[tuple[int, int], str, int]:
+    """
+    :param file: the path to the file
+    :param header: whether the file starts with a pub header containing a rid
+    :return: a tuple of the mtime and size, the SHA-1 digest and the rid (or None) of the file
+    """
+    result = os.stat(file)
+    digest = file_digest(file)
+    rid = eolib.read_pub_header(file)[1] if header else None
+    return (result.st_mtime_ns, result.st_size), digest, rid
+
+
+@dataclass
+class CacheEntry:
+    """A class used to represent a decoded file held by a PubCache."""
+    stat: tuple[int, int]
+    digest: str
+    rid: int
+    value: Any
+    derived: dict = field(default_factory=dict)
+    loaded: float = field(default_factory=time.time)
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
+
+    def derive(self, name: str, builder: Callable[[Any], Any]) -> Any:
+        """
+        Gets a value computed from the decoded entries, such as an index, building it at most once. Callers should
+        take both the entries and their derived values from the same entry, so a reload in between never pairs the
+        entries of one version with an index of another.
+        :param name: the name of the derived value
+        :param builder: the function used to compute the value from the decoded entries
+        :return: the derived value
+        """
+        if name not in self.derived:
+            with self.lock:
+                if name not in self.derived:
+                    self.derived[name] = builder(self.value)
+        return self.derived[name]
+
+    @property
+    def etag(self) -> str:
+        """
+        :return: a strong entity tag identifying this version of the file
+        """
+        return self.digest if self.rid is None else "%x-%s" % (self.rid, self.digest)
+
+
+class DiskCache:
+    """
+    A directory of decoded files, so a cold start can load them instead of decoding them again.
+
+    Every decoded file is pickled into a sidecar named after the file, a hash of its absolute path, the reader, the
+    reader version and the SHA-1 digest of the file, so a changed file or decoder never matches a stale sidecar and
+    files of the same name in different directories keep their own sidecars. A file rewritten while it is decoded is
+    not stored, so a sidecar always holds the version its digest names. Sidecars are loaded straight from a
+    memory-mapped view and replaced atomically, and only trusted directories should be used since loading a sidecar
+    unpickles it.
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: the directory the sidecars are kept in
+        """
+        self.directory = directory
+
+    @staticmethod
+    def __prefix(file: str, reader: Callable[[str], Any]) -> str:
+        # files sharing a name in different directories, such as two pub directories, must not share sidecars
+        location = hashlib.sha1(os.path.abspath(file).encode()).hexdigest()[:16]
+        return "%s.%s.%s." % (os.path.basename(file), location, reader.__name__)
+
+    def __path(self, file: str, reader: Callable[[str], Any], digest: str) -> str:
+        name = "%sv%d.%s.pickle" % (self.__prefix(file, reader), eolib.READER_VERSION, digest)
+        return os.path.join(self.directory, name)
+
+    def read(self, file: str, reader: Callable[[str], Any], digest: str) -> Any:
+        """
+        :param file: the path to the file
+        :param reader: the function used to decode the file, e.g. eolib.read_eif
+        :param digest: the SHA-1 digest of the file
+        :return: the decoded file, loaded from its sidecar or decoded and then stored in a new sidecar
+        """
+        path = self.__path(file, reader, digest)
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return pickle.loads(data)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            pass
+
+        value = reader(file)
+        try:
+            if file_digest(file) != digest:
+                # rewritten since it was hashed, so the value may not be the one the digest names
+                return value
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = "%s.%d.tmp" % (path, os.getpid())
+            with open(temporary, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+            prefix = self.__prefix(file, reader)
+            for name in os.listdir(self.directory):
+                if name.startswith(prefix) and name.endswith(".pickle") and name != os.path.basename(path):
+                    os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+        return value
+
+
+class PubCache:
+    """
+    A thread-safe cache of decoded Endless Online pub files.
+
+    A file is checked again whenever its mtime or size changes, and then decoded again unless its SHA-1
+    digest and rid are both unchanged, so an edit in place keeping the size and rid is still picked up.
+    Requests racing on a stale file wait for a single reload instead of each decoding the file themselves.
+    Files without a pub header, such as EOServ ini files, can be cached as well by passing header=False.
+    """
+
+    def __init__(self, disk: DiskCache = None):
+        """
+        :param disk: the directory of decoded files to load files from before decoding them (optional)
+        """
+        self.disk = disk
+        self.entries = {}
+        self.locks = {}
+        self.watched = set()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        # functions called with the path, reader and decode seconds of every file decoded
+        self.decode_listeners = []
+
+    def __count(self, counter: str):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def __file_lock(self, file: str) -> threading.Lock:
+        with self.lock:
+            return self.locks.setdefault(file, threading.Lock())
+
+    @staticmethod
+    def __stat(file: str) -> tuple[int, int]:
+        result = os.stat(file)
+        return result.st_mtime_ns, result.st_size
+
+    def watch(self, file: str):
+        """
+        Marks a file as watched, so requests are served the loaded version without checking the file and only
+        refresh() picks up changes, e.g. when a watcher notices one.
+        :param file: the path to the file
+        """
+        with self.lock:
+            self.watched.add(file)
+
+    def entry(self, file: str, reader: Callable[[str], Any], header: bool = True) -> CacheEntry:
+        """
+        :param file: the path to the pub file
+        :param reader: the function used to decode the pub file, e.g. eolib.read_eif
+        :param header: whether the file starts with a pub header containing a rid
+        :return: the up to date cache entry of the given file
+        """
+        entry = self.entries.get(file)
+        if entry is None or file not in self.watched:
+            entry, current = self.refresh(file, reader, header), entry
+            if entry is not current:
+                return entry
+        self.__count('hits')
+        return entry
+
+    def refresh(self, file: str, reader: Callable[[str], Any], header: bool = True) -> CacheEntry:
+        """
+        Loads a file again if it was rewritten since it was loaded. The new version replaces the old one in a single
+        step, so requests holding the old entry keep seeing a consistent version.
+        :param file: the path to the pub file
+        :param reader: the function used to decode the pub file, e.g. eolib.read_eif
+        :param header: whether the file starts with a pub header containing a rid
+        :return: the up to date cache entry of the given file
+        """
+        stat = self.__stat(file)
+        entry = self.entries.get(file)
+        if entry is not None and entry.stat == stat:
+            return entry
+
+        with self.__file_lock(file):
+            entry = self.entries.get(file)
+            stat = self.__stat(file)
+            if entry is not None and entry.stat == stat:
+                return entry
+
+            stat, digest, rid = fingerprint(file, header)
+            if entry is not None and entry.digest == digest and entry.rid == rid:
+                # touched but not rewritten, e.g. by a deploy copying identical files
+                entry.stat = stat
+                return entry
+
+            self.__count('misses' if entry is None else 'reloads')
+            entry = CacheEntry(stat, digest, rid, self.decode(file, reader, digest))
+            self.entries[file] = entry
+            return entry
+
+    def decode(self, file: str, reader: Callable[[str], Any], digest: str) -> Any:
+        """
+        :param file: the path to the file
+        :param reader: the function used to decode the file, e.g. eolib.read_eif
+        :param digest: the SHA-1 digest of the file
+        :return: the decoded file, from the disk cache if there is one
+        """
+        start = time.perf_counter()
+        value = reader(file) if self.disk is None else self.disk.read(file, reader, digest)
+        for listener in self.decode_listeners:
+            listener(file, reader, time.perf_counter() - start)
+        return value
+
+    def insert(self, file: str, stat: tuple[int, int], digest: str, rid: int, value: Any) -> CacheEntry:
+        """
+        Stores a file decoded elsewhere, such as by a bulk loader, as if it had been read through entry().
+        :param file: the path to the file
+        :param stat: the mtime and size of the file before it was decoded
+        :param digest: the SHA-1 digest of the file
+        :param rid: the rid of the file, or None if it has no pub header
+        :param value: the decoded file
+        :return: the new cache entry
+        """
+        with self.__file_lock(file):
+            entry = CacheEntry(stat, digest, rid, value)
+            self.entries[file] = entry
+            return entry
+
+    def get(self, file: str, reader: Callable[[str], Any], header: bool = True) -> Any:
+        """
+        :param file: the path to the pub file
+        :param reader: the function used to decode the pub file, e.g. eolib.read_eif
+        :param header: whether the file starts with a pub header containing a rid
+        :return: the decoded entries of the given file
+        """
+        return self.entry(file, reader, header).value
+
+    def versions(self) -> dict:
+        """
+        :return: a dictionary of the loaded version of every file, keyed by path
+        """
+        return {file: {
+            "etag": entry.etag,
+            "rid": entry.rid,
+            "sha1": entry.digest,
+            "mtime_ns": entry.stat[0],
+            "size": entry.stat[1],
+            "loaded": entry.loaded,
+            "watched": file in self.watched,
+        } for file, entry in list(self.entries.items())}
+
+    def stats(self) -> dict:
+        """
+        :return: a dictionary of the cache counters
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "files": len(self.entries),
+                "disk": self.disk.directory if self.disk is not None else None,
+            }
+
+
+class JoinCache:
+    """
+    A thread-safe holder of a value computed from several cached files, such as an index joining them, which is
+    only computed again when one of the files changes.
+    """
+
+    def __init__(self, builder: Callable[..., Any]):
+        """
+        :param builder: the function used to compute the value from the decoded files, in the order given to entry
+        """
+        self.builder = builder
+        self.current = None
+        self.lock = threading.Lock()
+        self.builds = 0
+
+    def entry(self, inputs: list[CacheEntry]) -> CacheEntry:
+        """
+        :param inputs: the up to date cache entries of the files the value is computed from
+        :return: a cache entry of the value, whose etag changes whenever one of the inputs does
+        """
+        digest = hashlib.sha1(",".join(entry.etag for entry in inputs).encode()).hexdigest()
+        entry = self.current
+        if entry is not None and entry.digest == digest:
+            return entry
+        with self.lock:
+            entry = self.current
+            if entry is None or entry.digest != digest:
+                entry = CacheEntry(None, digest, None, self.builder(*(i.value for i in inputs)))
+                self.current = entry
+                self.builds += 1
+            return entry
+
+
+class TTLCache:
+    """
+    A thread-safe least recently used cache whose values expire a fixed number of seconds after being stored.
+    """
+
+    def __init__(self, size: int = 4096, ttl: float = 10.0):
+        """
+        :param size: the maximum number of values to keep
+        :param ttl: the number of seconds a value is served for before it must be looked up again
+        """
+        self.size = size
+        self.ttl = ttl
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any:
+        """
+        :param key: the key of the value
+        :return: the cached value, or None if it is missing or expired
+        """
+        with self.lock:
+            item = self.values.get(key)
+            if item is None or item[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.values.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, value: Any):
+        """
+        :param key: the key of the value
+        :param value: the value to cache
+        """
+        with self.lock:
+            self.values[key] = (time.monotonic() + self.ttl, value)
+            self.values.move_to_end(key)
+            while len(self.values) > self.size:
+                self.values.popitem(last=False)
+
+    def invalidate(self, key: Hashable = None):
+        """
+        :param key: the key of the value to drop, or None to drop every value
+        """
+        with self.lock:
+            self.invalidations += 1
+            if key is None:
+                self.values.clear()
+            else:
+                self.values.pop(key, None)
+
+    def stats(self) -> dict:
+        """
+        :return: a dictionary of the cache counters
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "size": len(self.values),
+            }
@@ -0,0 +1,138 @@
+import numpy as np
+
+from eolib import EOReader
+
+# The fixed layout of every pub entry after its length-prefixed strings, as (field, width) pairs.
+# Fields named None are bytes the readers in eolib skip.
+EIF_LAYOUT = [
+    ("graphic", 2), ("type", 1), ("subtype", 1), ("special", 1), ("health", 2), ("mana", 2),
+    ("min_damage", 2), ("max_damage", 2), ("accuracy", 2), ("evade", 2), ("armor", 2), (None, 1),
+    ("strength", 1), ("intelligence", 1), ("wisdom", 1), ("agility", 1), ("constitution", 1), ("charisma", 1),
+    (None, 6), ("spec1", 3), ("spec2", 1), ("spec3", 1), ("level_requirement", 2), ("class_requirement", 2),
+    ("strength_requirement", 2), ("intelligence_requirement", 2), ("wisdom_requirement", 2),
+    ("agility_requirement", 2), ("constitution_requirement", 2), ("charisma_requirement", 2),
+    ("element", 1), ("element_power", 1), ("weight", 1), (None, 1), ("size", 1),
+]
+
+ENF_LAYOUT = [
+    ("graphic", 2), (None, 1), ("boss", 2), ("child", 2), ("type", 2), ("vendor", 2), ("health", 3), (None, 2),
+    ("min_damage", 2), ("max_damage", 2), ("accuracy", 2), ("evade", 2), ("armor", 2), (None, 5),
+    ("element_weak", 2), ("element_weak_power", 2), (None, 1), ("experience", 3),
+]
+
+ESF_LAYOUT = [
+    ("icon", 2), ("graphic", 2), ("mana", 2), ("stamina", 2), ("cast_time", 1), (None, 2), ("type", 3),
+    ("element", 1), ("element_power", 2), ("target_restrict", 1), ("target_type", 1), (None, 4),
+    ("min_damage", 2), ("max_damage", 2), ("accuracy", 2), (None, 5), ("heal", 2), (None, 15),
+]
+
+ECF_LAYOUT = [
+    ("parent", 1), ("stat_table", 1), ("strength", 2), ("intelligence", 2), ("wisdom", 2), ("agility", 2),
+    ("constitution", 2), ("charisma", 2),
+]
+
+# the decoded value of every byte, see EOReader.number
+VALUES = np.array(EOReader.VALUES, dtype=np.int64)
+WEIGHTS = np.array([1, EOReader.ONE_BYTE_MAX, EOReader.TWO_BYTE_MAX, EOReader.THREE_BYTE_MAX], dtype=np.int64)
+
+
+def __find_records(data: bytes, total: int, strings: int, size: int) -> tuple[np.ndarray, list[list[str]]]:
+    """
+    Walks the length prefixes of every entry to find where each one starts.
+    :param data: the contents of the pub file
+    :param total: the number of entries in the pub file
+    :param strings: the number of length-prefixed strings at the start of each entry
+    :param size: the width of the fixed part of each entry
+    :return: the offsets of the fixed part of each entry and the strings of each entry
+    """
+    values = EOReader.VALUES
+    offsets = np.empty(total, dtype=np.int64)
+    names = [[] for _ in range(strings)]
+    position = 10
+    for i in range(total):
+        lengths = [values[b] for b in data[position:position + strings]]
+        if len(lengths) < strings:
+            raise EOFError("unexpected end of data at", position)
+        position += strings
+        for column, length in zip(names, lengths):
+            column.append(data[position:position + length].decode("ascii"))
+            position += length
+        offsets[i] = position
+        position += size
+    if position > len(data):
+        raise EOFError("unexpected end of data at", len(data))
+    return offsets, names
+
+
+def __read_columns(extension: str, layout: list, string_fields: list[str], file: str) -> np.ndarray:
+    """
+    Reads an Endless Online pub file into a structured array with one column per field.
+    :param extension: the file magic used to validated the pub file type
+    :param layout: the (field, width) pairs of the fixed part of each entry
+    :param string_fields: the names of the length-prefixed strings at the start of each entry
+    :param file: the path to the pub file
+    :return: a structured array with one row per pub entry
+    """
+    with open(file, "rb") as f:
+        data = f.read()
+    magic = data[:3].decode("ascii")
+    if extension != magic:
+        raise ValueError(magic, "is not valid", extension, "file")
+    total = EOReader.number(data[7], data[8]) - 1
+
+    size = sum(width for _, width in layout)
+    offsets, strings = __find_records(data, total, len(string_fields), size)
+
+    # decode every byte of every fixed part in one pass, then combine the bytes of each field
+    raw = np.frombuffer(data, dtype=np.uint8)
+    decoded = VALUES[raw[offsets[:, None] + np.arange(size)]]
+
+    fields = [("id", np.int32)]
+    fields += [(name, f"U{max(map(len, column), default=1)}") for name, column in zip(string_fields, strings)]
+    fields += [(name, np.int32) for name, _ in layout if name is not None]
+    columns = np.empty(total, dtype=fields)
+    columns["id"] = np.arange(1, total + 1)
+    for name, column in zip(string_fields, strings):
+        columns[name] = column
+    offset = 0
+    for name, width in layout:
+        if name is not None:
+            columns[name] = decoded[:, offset:offset + width] @ WEIGHTS[:width]
+        offset += width
+    return columns
+
+
+def read_eif_columns(file: str) -> np.ndarray:
+    """
+    Reads an Endless Online items file into columns
+    :param file: the path to the eif file
+    :return: a structured array with one column per EIF field
+    """
+    return __read_columns("EIF", EIF_LAYOUT, ["name"], file)
+
+
+def read_enf_columns(file: str) -> np.ndarray:
+    """
+    Reads an Endless Online NPCs file into columns
+    :param file: the path to the enf file
+    :return: a structured array with one column per ENF field
+    """
+    return __read_columns("ENF", ENF_LAYOUT, ["name"], file)
+
+
+def read_esf_columns(file: str) -> np.ndarray:
+    """
+    Reads an Endless Online spells file into columns
+    :param file: the path to the esf file
+    :return: a structured array with one column per ESF field
+    """
+    return __read_columns("ESF", ESF_LAYOUT, ["name", "shout"], file)
+
+
+def read_ecf_columns(file: str) -> np.ndarray:
+    """
+    Reads an Endless Online classes file into columns
+    :param file: the path to the ecf file
+    :return: a structured array with one column per ECF field
+    """
+    return __read_columns("ECF", ECF_LAYOUT, ["name"], file)
@@ -1,13 +1,27 @@
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
 
 db = SQLAlchemy()
 
+# functions called with the name of a character whenever it is changed through the ORM
+character_listeners = []
+
 
 class Character(db.Model):
     """
     A class used to represent an EOServ Character database entry
     """
     __tablename__ = 'characters'
+    __table_args__ = (db.Index('character_guild_level_index', 'guild', 'level'),)
     name = db.Column(db.String(16), primary_key=True)
     account = db.Column(db.String(16))
     title = db.Column(db.String(32))
@@ -16,6 +30,7 @@ class Character(db.Model):
     admin = db.Column(db.Integer, nullable=False)
     gender = db.Column(db.Integer, nullable=False)
     race = db.Column(db.Integer, nullable=False)
+    class_id = db.Column('class', db.Integer, nullable=False)
     hairstyle = db.Column(db.Integer, nullable=False)
     haircolor = db.Column(db.Integer, nullable=False)
     level = db.Column(db.Integer, nullable=False)
@@ -58,13 +73,13 @@ class Character(db.Model):
         return '<Character %r>' % self.name
 
     def __unserialize_paperdoll(self) -> dict:
-        values = self.paperdoll[:-1].split(',')
-        return {name: int(values[slot]) for slot, name in enumerate(self.slots)}
+        return dict(zip(self.slots, map(int, self.paperdoll.split(',')))) if self.paperdoll else {}
 
     @staticmethod
     def __unserialize_pairs(text) -> dict:
-        values = text[:-1].split(',')
-        return {values[i]: int(values[i + 1]) for i in range(0, len(values), 2)} if text else {}
+        # pairs the ids and amounts in a single pass over the values, ignoring the trailing comma
+        values = iter(text[:-1].split(','))
+        return dict(zip(values, map(int, values))) if text else {}
 
     def serialize(self) -> dict:
         """
@@ -101,13 +116,21 @@ class Character(db.Model):
         }
 
 
+@event.listens_for(Character, 'after_insert')
+@event.listens_for(Character, 'after_update')
+@event.listens_for(Character, 'after_delete')
+def __notify_character_listeners(mapper, connection, target: Character):
+    for listener in character_listeners:
+        listener(target.name)
+
+
 class Guild(db.Model):
     """
     A class used to represent an EOServ Guild database entry.
     """
     __tablename__ = 'guilds'
     tag = db.Column(db.String(3), primary_key=True)
-    name = db.Column(db.String(32), unique=True),
+    name = db.Column(db.String(32), unique=True)
     description = db.Column(db.Text)
     created = db.Column(db.Integer)
     ranks = db.Column(db.Text)
@@ -128,3 +151,164 @@ class Guild(db.Model):
             "ranks": self.ranks,
             "bank": self.bank,
         }
+
+
+# the columns of a guild roster entry and the name each is serialized as
+ROSTER_COLUMNS = [
+    ("name", Character.name),
+    ("title", Character.title),
+    ("level", Character.level),
+    ("class", Character.class_id),
+    ("gender", Character.gender),
+    ("guild_rank", Character.guild_rank_string),
+    ("guild_rank_id", Character.guild_rank),
+]
+
+# the rank of a guild member, with members without one ranked first, rendered with a literal 0 so that SQLite
+# matches it against the expression of the guild rank index
+ROSTER_RANK = db.func.coalesce(Character.guild_rank, db.literal_column("0"))
+
+# the index serving guild rosters sorted by rank, created along with the indexes declared by the models
+db.Index('character_guild_rank_index', Character.guild, ROSTER_RANK, Character.name)
+
+# the orderings a guild roster can be sorted by, as (column, descending) pairs
+ROSTER_SORTS = {
+    "level": (Character.level, True),
+    "rank": (ROSTER_RANK, False),
+}
+
+
+def guild_roster(tag: str, sort: str = "level", after: tuple = None, limit: int = 100) -> list[dict]:
+    """
+    Reads a page of a guild roster, selecting only the roster columns and paginating on (sort column, name).
+    :param tag: the tag of the guild
+    :param sort: the name of the ordering, one of ROSTER_SORTS
+    :param after: the (sort value, name) of the last member of the previous page (optional)
+    :param limit: the maximum number of members to return
+    :return: a list of the serialized members
+    """
+    column, descending = ROSTER_SORTS[sort]
+    query = db.session.query(*[i for _, i in ROSTER_COLUMNS]).filter(Character.guild == tag)
+    if after is not None:
+        value, name = after
+        beyond = column < value if descending else column > value
+        query = query.filter(db.or_(beyond, db.and_(column == value, Character.name > name)))
+    query = query.order_by(column.desc() if descending else column.asc(), Character.name.asc()).limit(limit)
+    keys = [key for key, _ in ROSTER_COLUMNS]
+    return [dict(zip(keys, row)) for row in query.yield_per(limit)]
+
+
+def create_indexes(bind: Engine = None):
+    """
+    Creates the indexes declared by the models which are missing from the database, such as the guild roster index.
+    :param bind: the engine of the database, defaults to the engine of the current app
+    """
+    bind = bind if bind is not None else db.engine
+    inspector = db.inspect(bind)
+    for table in db.Model.metadata.tables.values():
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind)
+
+
+class DatabaseMetrics:
+    """A class used to represent counters of how long queries took and how long they waited for a connection."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {"query": [0, 0.0, 0.0], "pool_wait": [0, 0.0, 0.0]}
+
+    def record(self, name: str, seconds: float):
+        """
+        :param name: the name of the timing, either query or pool_wait
+        :param seconds: the duration to record
+        """
+        with self.lock:
+            timing = self.timings[name]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def stats(self) -> dict:
+        """
+        :return: a dictionary of the count, total and maximum seconds of every timing
+        """
+        with self.lock:
+            return {name: {"count": count, "seconds": total, "max_seconds": longest}
+                    for name, (count, total, longest) in self.timings.items()}
+
+
+database_metrics = DatabaseMetrics()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def __start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def __stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    database_metrics.record('query', time.perf_counter() - conn.info['query_start'].pop())
+
+
+@event.listens_for(Engine, 'handle_error')
+def __discard_query_timer(context):
+    # a failed query never reaches after_cursor_execute, so its start is dropped here
+    if context.connection is not None and context.cursor is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+
+class TimedQueuePool(QueuePool):
+    """A QueuePool which records how long every checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            database_metrics.record('pool_wait', time.perf_counter() - start)
+
+
+def configure_sqlite(app: Flask, path: str, pool_size: int = 8, pool_timeout: float = 5.0,
+                     mmap_size: int = 256 << 20, cache_size: int = 16 << 20, busy_timeout: int = 250):
+    """
+    Configures the app to read the live EOServ SQLite database through a pool of read-only connections.
+
+    Connections are opened with mode=ro and PRAGMA query_only, so the API can never take a write lock, and
+    each statement runs in its own implicit read transaction. A reader only waits busy_timeout milliseconds
+    while the game server holds a write lock before giving up, so it never queues behind or delays a writer.
+    :param app: the app to configure
+    :param path: the path of the database file
+    :param pool_size: the number of connections kept open, one checked out per request thread
+    :param pool_timeout: the number of seconds a request waits for a free connection
+    :param mmap_size: the number of bytes of the database file each connection memory-maps
+    :param cache_size: the number of bytes of page cache each connection keeps
+    :param busy_timeout: the number of milliseconds a read waits on a write lock
+    """
+    path = os.path.abspath(path)
+    uri = 'file:%s?mode=ro' % urllib.parse.quote(path)
+
+    def connect() -> sqlite3.Connection:
+        connection = sqlite3.connect(uri, uri=True, timeout=busy_timeout / 1000, check_same_thread=False)
+        connection.execute('PRAGMA query_only = 1')
+        connection.execute('PRAGMA mmap_size = %d' % mmap_size)
+        connection.execute('PRAGMA cache_size = %d' % -(cache_size // 1024))
+        connection.execute('PRAGMA busy_timeout = %d' % busy_timeout)
+        return connection
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'creator': connect,
+        'poolclass': TimedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': 0,
+        'pool_timeout': pool_timeout,
+    }
+
+
+def journal_mode() -> str:
+    """
+    :return: the journal mode of the database, e.g. wal or delete
+    """
+    return db.session.execute('PRAGMA journal_mode').scalar()
@@ -0,0 +1,172 @@
+import math
+from typing import TYPE_CHECKING
+
+from eolib import ENF, Drop, Shop
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# numpy is imported by the functions computing probabilities, so the API only needs it to serve drop simulations
+# and rankings
+
+# the ways EOServ picks the single item an NPC drops, see the DropRateMode option of EOServ
+DROP_RATE_MODES = {
+    1: "every drop is rolled and one of the successful drops is picked at random",
+    2: "drops are rolled in order and the first successful drop is picked",
+    3: "a single roll is compared against the cumulative chance of the drops in order",
+}
+
+# the id of gold, which is worth its amount
+GOLD = 1
+
+# the metrics NPCs can be ranked by
+RANKING_SORTS = ("value", "value_per_health", "experience_per_health", "value_per_experience")
+
+
+def probabilities(chances: list[float], mode: int = 3) -> "np.ndarray":
+    """
+    Computes the exact chance of every drop being the one an NPC drops, since EOServ drops at most one item per kill.
+    :param chances: the chance of every drop in percent, in the order of the drops table
+    :param mode: the drop rate mode, one of DROP_RATE_MODES
+    :return: the probability of every drop per kill
+    """
+    import numpy as np
+
+    if mode not in DROP_RATE_MODES:
+        raise ValueError(mode, "is not one of", list(DROP_RATE_MODES))
+    chances = np.clip(np.asarray(chances, dtype=np.float64) / 100, 0, 1)
+    if mode == 3:
+        return np.diff(np.minimum(np.cumsum(chances), 1), prepend=0)
+    if mode == 2:
+        return chances * np.cumprod(np.concatenate(([1], 1 - chances[:-1])))
+
+    result = np.zeros(len(chances))
+    for i, chance in enumerate(chances):
+        # the distribution of the number of other drops which succeed alongside this one
+        others = np.array([1.0])
+        for other in np.delete(chances, i):
+            others = np.append(others * (1 - other), 0) + np.append(0, others * other)
+        result[i] = chance * (others / np.arange(1, len(others) + 1)).sum()
+    return result
+
+
+def simulate(drops: list[Drop], kills: int, mode: int = 3, rate: float = 1.0, seed: int = None,
+             batch: int = 1 << 18) -> dict:
+    """
+    Estimates what an NPC yields by simulating kills in vectorized batches.
+
+    Every kill drops at most one item, so the item of each kill is drawn from the exact per-kill probabilities with a
+    single uniform roll, and its amount with a second one.
+    :param drops: the drops of the NPC, in the order of the drops table
+    :param kills: the number of kills to simulate
+    :param mode: the drop rate mode, one of DROP_RATE_MODES
+    :param rate: the DropRate multiplier applied to every chance
+    :param seed: the seed of the random number generator, for reproducible results (optional)
+    :param batch: the maximum number of kills simulated at once, bounding memory use
+    :return: a dictionary of the number of kills and the estimates of every drop
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    count = len(drops)
+    exact = probabilities([drop.chance * rate for drop in drops], mode)
+    thresholds = np.cumsum(exact)
+    low = np.array([drop.min_amount for drop in drops], dtype=np.float64)
+    span = np.maximum(np.array([drop.max_amount for drop in drops], dtype=np.float64) - low, 0) + 1
+
+    hits = np.zeros(count, dtype=np.int64)
+    total = np.zeros(count, dtype=np.float64)
+    squares = np.zeros(count, dtype=np.float64)
+    for start in range(0, kills if count else 0, batch):
+        picked = np.searchsorted(thresholds, rng.random(min(batch, kills - start)), side="right")
+        picked = picked[picked < count]
+        amounts = low[picked] + np.floor(rng.random(len(picked)) * span[picked])
+        hits += np.bincount(picked, minlength=count)
+        total += np.bincount(picked, amounts, minlength=count)
+        squares += np.bincount(picked, amounts * amounts, minlength=count)
+
+    results = []
+    for i, drop in enumerate(drops):
+        probability = float(hits[i]) / kills if kills else 0.0
+        expected = float(total[i]) / kills if kills else 0.0
+        results.append({
+            "id": drop.id,
+            "probability": probability,
+            "exact_probability": float(exact[i]),
+            "expected": expected,
+            "variance": float(squares[i]) / kills - expected * expected if kills else 0.0,
+            "kills_to_drop": kills_to_drop(probability),
+        })
+    return {"kills": kills, "mode": mode, "rate": rate, "drops": results}
+
+
+def kills_to_drop(probability: float) -> dict:
+    """
+    :param probability: the chance an item drops per kill
+    :return: the mean, median and 90th percentile of the number of kills until the item first drops
+    """
+    if probability <= 0:
+        return {"mean": None, "p50": None, "p90": None}
+    if probability >= 1:
+        return {"mean": 1.0, "p50": 1, "p90": 1}
+    return {
+        "mean": 1 / probability,
+        "p50": math.ceil(math.log(0.5) / math.log1p(-probability)),
+        "p90": math.ceil(math.log(0.1) / math.log1p(-probability)),
+    }
+
+
+def item_values(shops: dict[int, Shop]) -> dict[int, int]:
+    """
+    :param shops: the shops table
+    :return: the value of every item, the most gold any shop pays for it
+    """
+    values = {GOLD: 1}
+    for shop in shops.values():
+        for trade in shop.trade:
+            values[trade.id] = max(values.get(trade.id, 0), trade.sell)
+    return values
+
+
+def expected_value(drops: list[Drop], values: dict[int, int], mode: int = 3, rate: float = 1.0) -> float:
+    """
+    :param drops: the drops of the NPC, in the order of the drops table
+    :param values: the value of every item, see item_values
+    :param mode: the drop rate mode, one of DROP_RATE_MODES
+    :param rate: the DropRate multiplier applied to every chance
+    :return: the exact expected value of the items dropped per kill
+    """
+    exact = probabilities([drop.chance * rate for drop in drops], mode)
+    return float(sum(probability * (drop.min_amount + max(drop.max_amount, drop.min_amount)) / 2 *
+                     values.get(drop.id, 0) for probability, drop in zip(exact, drops)))
+
+
+def rank(table: dict[int, list[Drop]], npcs: list[ENF], values: dict[int, int], mode: int = 3,
+         rate: float = 1.0) -> list[dict]:
+    """
+    Ranks every NPC of a drops table by the expected value of a kill.
+    :param table: the drops table
+    :param npcs: the entries of the NPC pub file, ordered by id
+    :param values: the value of every item, see item_values
+    :param mode: the drop rate mode, one of DROP_RATE_MODES
+    :param rate: the DropRate multiplier applied to every chance
+    :return: the NPCs sorted by the expected value of a kill, highest first, with their experience and health
+    """
+    ranking = []
+    for npc_id, drops in table.items():
+        value = expected_value(drops, values, mode, rate)
+        npc = npcs[npc_id - 1] if 1 <= npc_id <= len(npcs) else None
+        health = npc.health if npc is not None else 0
+        experience = npc.experience if npc is not None else 0
+        ranking.append({
+            "id": npc_id,
+            "name": npc.name if npc is not None else None,
+            "health": health,
+            "experience": experience,
+            "value": value,
+            "value_per_health": value / health if health else None,
+            "experience_per_health": experience / health if health else None,
+            "value_per_experience": value / experience if experience else None,
+        })
+    ranking.sort(key=lambda result: result["value"], reverse=True)
+    return ranking
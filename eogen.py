@@ -0,0 +1,181 @@
+"""
+A generator of synthetic pub and map files of any size, for testing how the API scales:
+
+    python eogen.py data/synthetic --items 10000 --npcs 5000 --maps 50 --map-size 200
+
+Pub entries are copies of the entries of the shipped pubs with numbered names and their stats varied, so the files
+look like real game data. Maps are random but valid: every layer, spawn, chest, warp and sign decodes and refers to
+ids within the generated pubs.
+"""
+import dataclasses
+import os
+import random
+from argparse import ArgumentParser
+from enum import Enum
+
+import eolib
+from eolib import EMF, EMFChest, EMFNPC, EMFSign, EMFWarp, EOWriter
+
+# the fields of pub entries which are ids or graphics rather than stats, and are copied as they are
+FIXED = {"id", "graphic", "icon", "spec1", "spec2", "spec3", "class_requirement", "parent", "stat_table", "vendor",
+         "element", "element_weak", "cast_time"}
+
+# the largest single byte value, which bounds map sizes and the number of rows, spawns, chests and signs of a map
+CHAR_MAX = EOWriter.MAX[1]
+
+
+def entries(pub: type, count: int, rng: random.Random, templates: list = None) -> list:
+    """
+    :param pub: a class representing a single entry in a pub file, e.g. eolib.EIF
+    :param count: the number of entries
+    :param rng: the random number generator
+    :param templates: the entries to copy, e.g. those of a shipped pub, or None for random values
+    :return: the entries, with their ids set
+    """
+    fields = dataclasses.fields(pub)
+    varied = [field.name for field in fields if field.type is int and field.name not in FIXED]
+    result = []
+    for i in range(count):
+        entry = pub()
+        if templates:
+            template = templates[i % len(templates)]
+            for field in fields:
+                setattr(entry, field.name, getattr(template, field.name))
+            if i >= len(templates):
+                entry.name = ("%s %d" % (template.name, i // len(templates)))[-CHAR_MAX:]
+                for name in varied:
+                    value = getattr(entry, name)
+                    if value:
+                        limit = next(m for m in EOWriter.MAX[1:] if value <= m)
+                        setattr(entry, name, min(int(value * rng.uniform(0.8, 1.25)), limit))
+        else:
+            for field in fields:
+                if field.type is str:
+                    value = "%s %d" % (pub.__name__, i + 1) if field.name == "name" else ""
+                elif isinstance(field.type, type) and issubclass(field.type, Enum):
+                    value = rng.choice(list(field.type))
+                elif field.type is bool:
+                    value = rng.random() < 0.05
+                else:
+                    value = rng.randint(0, 100)
+                setattr(entry, field.name, value)
+        entry.id = i + 1
+        result.append(entry)
+    return result
+
+
+def scatter(width: int, height: int, density: float, values: range, rng: random.Random) -> dict[int, dict[int, int]]:
+    """
+    :param width: the width of the map
+    :param height: the height of the map
+    :param density: the fraction of tiles set
+    :param values: the values to draw tiles from
+    :param rng: the random number generator
+    :return: a layer of tiles keyed by y and then x, as returned by EMF.layer()
+    """
+    rows = {}
+    per_row = min(CHAR_MAX, int(width * density))
+    if per_row:
+        for y in range(min(height, CHAR_MAX)):
+            rows[y] = {x: rng.choice(values) for x in sorted(rng.sample(range(width), per_row))}
+    return rows
+
+
+def game_map(map_id: int, width: int, height: int, rng: random.Random, npcs: int = 1, items: int = 1,
+             maps: int = 1) -> tuple[EMF, dict]:
+    """
+    :param map_id: the id of the map
+    :param width: the width of the map, at most 252
+    :param height: the height of the map, at most 252
+    :param rng: the random number generator
+    :param npcs: the number of NPCs to spawn from
+    :param items: the number of items to fill chests from
+    :param maps: the number of maps to warp to
+    :return: a tuple of the map and its layers, to be written with eolib.write_emf
+    """
+    if not 1 <= width <= CHAR_MAX or not 1 <= height <= CHAR_MAX:
+        raise ValueError("maps can be at most", CHAR_MAX, "tiles wide and high")
+    area = width * height
+    emf = EMF()
+    emf.id = map_id
+    emf._rid = rng.randrange(EOWriter.MAX[4] + 1)
+    emf.name = "Map %d" % map_id
+    emf.type = 0
+    emf.effect = 0
+    emf.music = rng.randint(0, 30)
+    emf.music_control = 0
+    emf.ambient_sound = 0
+    emf.width = width
+    emf.height = height
+    emf.fill_tile = rng.randint(1, 100)
+    emf.map_available = True
+    emf.can_scroll = True
+    emf.relog_x = rng.randrange(width)
+    emf.relog_y = rng.randrange(height)
+    emf.npcs = [EMFNPC(rng.randrange(width), rng.randrange(height), rng.randint(1, npcs), rng.randint(0, 7),
+                       rng.randint(1, 300), rng.randint(1, 5)) for _ in range(min(CHAR_MAX, 1 + area // 400))]
+    emf.chests = [EMFChest(rng.randrange(width), rng.randrange(height), 0, rng.randint(0, 3), rng.randint(1, items),
+                           rng.randint(1, 60), rng.randint(1, 1000)) for _ in range(min(CHAR_MAX, area // 4000))]
+    emf.warps = [EMFWarp(x, y, rng.randint(1, maps), rng.randrange(width), rng.randrange(height), 0, 0)
+                 for y in sorted(rng.sample(range(height), min(height, 4))) for x in (0, width - 1)]
+    emf.signs = [EMFSign(rng.randrange(width), rng.randrange(height), "Sign %d" % i, "Welcome to map %d" % map_id)
+                 for i in range(min(CHAR_MAX, area // 5000))]
+    layers = {
+        "specs": scatter(width, height, 0.05, range(1, 8), rng),
+        "ground": scatter(width, height, 0.3, range(1, 200), rng),
+        "objects": scatter(width, height, 0.08, range(1, 500), rng),
+        "overlay": scatter(width, height, 0.02, range(1, 100), rng),
+        "down_wall": scatter(width, height, 0.04, range(1, 300), rng),
+        "right_wall": scatter(width, height, 0.04, range(1, 300), rng),
+        "shadow": scatter(width, height, 0.01, range(1, 50), rng),
+    }
+    return emf, layers
+
+
+def generate(directory: str, items: int = 10000, npcs: int = 5000, spells: int = 2000, classes: int = 30,
+             maps: int = 10, map_size: int = 100, seed: int = 1, data: str = "data") -> dict:
+    """
+    Writes a synthetic set of pub and map files.
+    :param directory: the directory to write the files to, maps are written to its maps directory
+    :param items: the number of entries of the EIF pub
+    :param npcs: the number of entries of the ENF pub
+    :param spells: the number of entries of the ESF pub
+    :param classes: the number of entries of the ECF pub
+    :param maps: the number of maps, with ids from 1
+    :param map_size: the width and height of every map, at most 252
+    :param seed: the seed of the random number generator, the same seed writes the same files
+    :param data: the directory of the shipped pubs copied from, pubs missing from it are filled with random values
+    :return: a dictionary of the path of every file keyed by its command line argument
+    """
+    rng = random.Random(seed)
+    files = {"maps": os.path.join(directory, "maps")}
+    os.makedirs(files["maps"], exist_ok=True)
+    for key, name, pub, reader, writer, count in (
+            ("eif", "dat001.eif", eolib.EIF, eolib.read_eif, eolib.write_eif, items),
+            ("enf", "dtn001.enf", eolib.ENF, eolib.read_enf, eolib.write_enf, npcs),
+            ("esf", "dsl001.esf", eolib.ESF, eolib.read_esf, eolib.write_esf, spells),
+            ("ecf", "dat001.ecf", eolib.ECF, eolib.read_ecf, eolib.write_ecf, classes)):
+        source = os.path.join(data, "pub", name)
+        templates = reader(source) if os.path.exists(source) else None
+        files[key] = os.path.join(directory, name)
+        writer(files[key], entries(pub, count, rng, templates))
+    for map_id in range(1, maps + 1):
+        emf, layers = game_map(map_id, map_size, map_size, rng, npcs, items, maps)
+        eolib.write_emf(os.path.join(files["maps"], "%05d.emf" % map_id), emf, layers)
+    return files
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Generate synthetic Endless Online pub and map files.")
+    parser.add_argument("directory", help="directory to write the files to")
+    parser.add_argument("--items", type=int, default=10000, help="number of items")
+    parser.add_argument("--npcs", type=int, default=5000, help="number of NPCs")
+    parser.add_argument("--spells", type=int, default=2000, help="number of spells")
+    parser.add_argument("--classes", type=int, default=30, help="number of classes")
+    parser.add_argument("--maps", type=int, default=10, help="number of maps")
+    parser.add_argument("--map-size", type=int, default=100, help="width and height of every map, at most 252")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the random number generator")
+    args = parser.parse_args()
+    for key, path in generate(args.directory, args.items, args.npcs, args.spells, args.classes, args.maps,
+                              args.map_size, args.seed).items():
+        print(key, path)
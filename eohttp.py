@@ -0,0 +1,109 @@
+import gzip
+from dataclasses import dataclass
+
+from flask import Request, Response
+
+from eojson import JSONSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# the content codings bodies are precompressed in, in order of preference
+CODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+@dataclass
+class RenderedBody:
+    """A class used to represent a rendered JSON response body along with its precompressed variants."""
+    etag: str
+    variants: dict[str, bytes]
+
+
+def render(data: dict, serializer: JSONSerializer, etag: str) -> RenderedBody:
+    """
+    Renders a response body once in every supported content coding.
+    :param data: the response data
+    :param serializer: the serializer used to render the data as JSON
+    :param etag: the strong entity tag of the identity coded response, see coded_etag for the other codings
+    :return: the rendered body
+    """
+    body = serializer.dumps(data)
+    variants = {"identity": body, "gzip": gzip.compress(body, 9)}
+    if "br" in CODINGS:
+        variants["br"] = brotli.compress(body)
+    return RenderedBody(etag, variants)
+
+
+def accepts_json(request: Request) -> bool:
+    """
+    :param request: the current request
+    :return: whether the request prefers JSON over the browsable API
+    """
+    return request.accept_mimetypes.best_match(["application/json", "text/html"],
+                                               default="application/json") == "application/json"
+
+
+def representation_etag(etag: str, request: Request) -> str:
+    """
+    :param etag: the strong entity tag of the JSON representation of a resource
+    :param request: the current request
+    :return: the strong entity tag of the representation the request negotiates, which differs for the browsable API
+    """
+    return etag if accepts_json(request) else etag + "-html"
+
+
+def content_coding(request: Request) -> str:
+    """
+    :param request: the current request
+    :return: the preferred content coding of CODINGS the client accepts, or identity
+    """
+    for coding in CODINGS:
+        if request.accept_encodings.quality(coding) > 0:
+            return coding
+    return "identity"
+
+
+def coded_etag(etag: str, coding: str) -> str:
+    """
+    Strong entity tags must differ between the content codings of a body, since their bytes do.
+    :param etag: the strong entity tag of the identity coded body
+    :param coding: the content coding of the body
+    :return: the strong entity tag of the body in the given coding
+    """
+    return etag if coding == "identity" else "%s-%s" % (etag, coding)
+
+
+def not_modified(etag: str, vary: tuple[str, ...] = ("Accept",)) -> Response:
+    """
+    :param etag: the strong entity tag of the unchanged resource
+    :param vary: the request headers the representation was chosen by
+    :return: an empty 304 response
+    """
+    response = Response(status=304)
+    response.set_etag(etag)
+    for header in vary:
+        response.vary.add(header)
+    return response
+
+
+def respond(rendered: RenderedBody, request: Request) -> Response:
+    """
+    Serves a rendered body, honoring If-None-Match and choosing the best content coding the client accepts.
+    :param rendered: the rendered body
+    :param request: the current request
+    :return: the response
+    """
+    coding = content_coding(request)
+    etag = coded_etag(rendered.etag, coding)
+    if request.if_none_match.contains(etag):
+        return not_modified(etag, ("Accept", "Accept-Encoding"))
+
+    response = Response(rendered.variants[coding], mimetype="application/json")
+    response.set_etag(etag)
+    response.vary.add("Accept")
+    response.vary.add("Accept-Encoding")
+    if coding != "identity":
+        response.content_encoding = coding
+    return response
@@ -0,0 +1,111 @@
+from bisect import bisect_left, bisect_right
+from enum import Enum
+from typing import Any, Iterable
+
+
+class PubIndex:
+    """
+    A class used to represent lookup structures over the entries of a pub file.
+
+    Names are indexed case-insensitively for exact and prefix lookups, enum and boolean fields map each
+    value to the ids that have it and the remaining integer fields are kept sorted for range queries.
+    """
+
+    def __init__(self, entries: list, fields: Iterable[str]):
+        """
+        :param entries: the entries of the pub file, ordered by id
+        :param fields: the names of the fields of each entry
+        """
+        self.names = {}
+        self.categories = {}
+        self.numbers = {}
+
+        for entry in entries:
+            self.names.setdefault(entry.name.lower(), []).append(entry.id)
+        ordered = sorted((entry.name.lower(), entry.id) for entry in entries)
+        self.sorted_names = [name for name, _ in ordered]
+        self.sorted_name_ids = [entry_id for _, entry_id in ordered]
+
+        sample = entries[0] if entries else None
+        for field in fields:
+            value = getattr(sample, field, None)
+            if isinstance(value, (Enum, bool)):
+                table = {}
+                for entry in entries:
+                    table.setdefault(getattr(entry, field), []).append(entry.id)
+                self.categories[field] = table
+            elif isinstance(value, int) and field != "id":
+                ordered = sorted((getattr(entry, field), entry.id) for entry in entries)
+                self.numbers[field] = ([value for value, _ in ordered], [entry_id for _, entry_id in ordered])
+
+    def named(self, name: str) -> list[int]:
+        """
+        :param name: the name to look up, ignoring case
+        :return: the ids of the entries with the given name
+        """
+        return self.names.get(name.lower(), [])
+
+    def prefixed(self, prefix: str) -> list[int]:
+        """
+        :param prefix: the start of the names to look up, ignoring case
+        :return: the ids of the entries with names starting with the prefix, in name order
+        """
+        prefix = prefix.lower()
+        start = bisect_left(self.sorted_names, prefix)
+        end = bisect_left(self.sorted_names, prefix + chr(0x10FFFF), start)
+        return self.sorted_name_ids[start:end]
+
+    def equal(self, field: str, value: Any) -> list[int]:
+        """
+        :param field: the name of an enum, boolean or integer field
+        :param value: the value to look up
+        :return: the ids of the entries where the field has the given value
+        """
+        if field in self.categories:
+            return self.categories[field].get(value, [])
+        return self.between(field, value, value)
+
+    def between(self, field: str, low: int = None, high: int = None, low_inclusive: bool = True,
+                high_inclusive: bool = True) -> list[int]:
+        """
+        :param field: the name of an integer field
+        :param low: the lower bound of the range (optional)
+        :param high: the upper bound of the range (optional)
+        :param low_inclusive: whether entries equal to the lower bound are included
+        :param high_inclusive: whether entries equal to the upper bound are included
+        :return: the ids of the entries where the field is within the range, ordered by the field
+        """
+        values, ids = self.numbers[field]
+        start = 0 if low is None else (bisect_left if low_inclusive else bisect_right)(values, low)
+        end = len(values) if high is None else (bisect_right if high_inclusive else bisect_left)(values, high)
+        return ids[start:end]
+
+    def lookup(self, field: str, operator: str, value: Any) -> list[int]:
+        """
+        Resolves a single query filter through the index.
+        :param field: the name of the field being filtered
+        :param operator: the name of the filter operator, e.g. eq or lte
+        :param value: the parsed value of the filter
+        :return: the ids of the matching entries, or None if the filter can not be answered by the index
+        """
+        if field == "name":
+            if operator == "iexact":
+                return self.named(value)
+            if operator == "prefix":
+                return self.prefixed(value)
+            return None
+        if field in self.categories or field in self.numbers:
+            if operator == "eq":
+                return self.equal(field, value)
+            if operator == "in":
+                return [entry_id for i in value for entry_id in self.equal(field, i)]
+        if field in self.numbers:
+            if operator == "lt":
+                return self.between(field, high=value, high_inclusive=False)
+            if operator == "lte":
+                return self.between(field, high=value)
+            if operator == "gt":
+                return self.between(field, low=value, low_inclusive=False)
+            if operator == "gte":
+                return self.between(field, low=value)
+        return None
@@ -0,0 +1,113 @@
+from eolib import ECF, EIF, ENF, ESF, Drop, ENFType, Shop, SkillMaster
+
+
+def reference(entries: list, entry_id: int) -> dict:
+    """
+    :param entries: the entries of a pub file, ordered by id
+    :param entry_id: the id of the entry
+    :return: a dictionary of the id and the name of the entry, which is None if the id is not in the pub file
+    """
+    name = entries[entry_id - 1].name if 1 <= entry_id <= len(entries) else None
+    return {"id": entry_id, "name": name}
+
+
+class CrossReference:
+    """
+    A class used to represent the drops, shops and skills of an EOServ server joined with the pub files they refer to.
+
+    Every lookup is computed once when the index is built: where each item can be found, what each NPC drops and
+    which NPCs teach each spell, with the names of the items, NPCs, spells and classes resolved. Drops are keyed by NPC id,
+    shops by the vendor id of shop NPCs and skills by the id of the NPC teaching them.
+    """
+
+    def __init__(self, items: list[EIF], npcs: list[ENF], spells: list[ESF], classes: list[ECF],
+                 drops: dict[int, list[Drop]], shops: dict[int, Shop], skills: dict[int, SkillMaster]):
+        # the pub entries and tables the index was built from, so responses can read them from the same version
+        self.items = items
+        self.npcs = npcs
+        self.spells = spells
+        self.classes = classes
+        self.drop_table = drops
+        self.shop_table = shops
+        self.item_sources = {}
+        self.npc_drops = {}
+        self.spell_trainers = {}
+
+        vendors = {}
+        for npc in npcs:
+            if npc.type == ENFType.Shop and npc.vendor > 0:
+                vendors.setdefault(npc.vendor, []).append(reference(npcs, npc.id))
+
+        for npc_id, npc_drops in drops.items():
+            npc = reference(npcs, npc_id)
+            self.npc_drops[npc_id] = [dict(reference(items, drop.id), min_amount=drop.min_amount,
+                                           max_amount=drop.max_amount, chance=drop.chance) for drop in npc_drops]
+            for drop in npc_drops:
+                self.__sources(drop.id)["drops"].append({
+                    "npc": npc,
+                    "min_amount": drop.min_amount,
+                    "max_amount": drop.max_amount,
+                    "chance": drop.chance,
+                })
+
+        for vendor_id, shop in shops.items():
+            sellers = vendors.get(vendor_id, [])
+            for trade in shop.trade:
+                self.__sources(trade.id)["shops"].append({
+                    "shop": shop.name,
+                    "npcs": sellers,
+                    "buy": trade.buy,
+                    "sell": trade.sell,
+                })
+            for craft in shop.craft:
+                self.__sources(craft.id)["crafts"].append({
+                    "shop": shop.name,
+                    "npcs": sellers,
+                    "ingredients": [dict(reference(items, ingredient.id), amount=ingredient.amount)
+                                    for ingredient in craft.ingredients],
+                })
+
+        for npc_id, master in skills.items():
+            npc = reference(npcs, npc_id)
+            for skill in master.learn:
+                self.spell_trainers.setdefault(skill.id, []).append({
+                    "npc": npc,
+                    "trainer": master.name,
+                    "cost": skill.cost,
+                    "level": skill.level,
+                    "class": reference(classes, skill.class_id) if skill.class_id else None,
+                    "spell_req": [reference(spells, spell_id) for spell_id in skill.spell_req],
+                    "str_req": skill.str_req,
+                    "int_req": skill.int_req,
+                    "wis_req": skill.wis_req,
+                    "agi_req": skill.agi_req,
+                    "con_req": skill.con_req,
+                    "cha_req": skill.cha_req,
+                })
+
+    def __sources(self, item_id: int) -> dict:
+        sources = self.item_sources.get(item_id)
+        if sources is None:
+            sources = self.item_sources[item_id] = {"drops": [], "shops": [], "crafts": []}
+        return sources
+
+    def sources(self, item_id: int) -> dict:
+        """
+        :param item_id: the id of the item
+        :return: the NPCs dropping the item and the shops selling, buying and crafting it
+        """
+        return self.item_sources.get(item_id, {"drops": [], "shops": [], "crafts": []})
+
+    def drops(self, npc_id: int) -> list[dict]:
+        """
+        :param npc_id: the id of the NPC
+        :return: the items dropped by the NPC
+        """
+        return self.npc_drops.get(npc_id, [])
+
+    def trainers(self, spell_id: int) -> list[dict]:
+        """
+        :param spell_id: the id of the spell
+        :return: the NPCs teaching the spell along with the cost and requirements of learning it
+        """
+        return self.spell_trainers.get(spell_id, [])
@@ -0,0 +1,143 @@
+import dataclasses
+import json
+from enum import Enum
+from typing import Any, Callable
+
+from flask import current_app, request
+from flask_api.renderers import JSONRenderer
+
+from eometrics import metrics, route_label
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENUM_MODES = ("value", "name")
+
+encode_string = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class JSONSerializer:
+    """
+    A class used to serialize pub records and the dictionaries and lists containing them to JSON.
+
+    Every dataclass is compiled once into a plan: a generated function which formats all of its fields in a single
+    string operation, so records are never walked field by field or copied into dictionaries.
+    """
+
+    def __init__(self, enums: str = "value", backend: str = None):
+        """
+        :param enums: whether enum fields are written as their integer value or their member name
+        :param backend: "orjson" or "plans", defaults to orjson when it is installed
+        """
+        if enums not in ENUM_MODES:
+            raise ValueError(enums, "is not one of", ENUM_MODES)
+        if backend is None:
+            backend = "orjson" if orjson is not None else "plans"
+        if backend == "orjson" and orjson is None:
+            raise ValueError("orjson is not installed")
+        self.enums = enums
+        self.backend = backend
+        self.plans = {}
+
+    def __compile(self, cls: type) -> Callable[[Any], str]:
+        """
+        Generates the function used to serialize instances of a dataclass.
+        :param cls: the dataclass
+        :return: a function which returns the JSON representation of an instance of the class
+        """
+        parts = []
+        arguments = []
+        for field in dataclasses.fields(cls):
+            key = encode_string(field.name).replace("%", "%%")
+            parts.append("%s:%%s" % key)
+            if field.type in (int, "int") or (isinstance(field.type, type) and issubclass(field.type, Enum)
+                                                and self.enums == "value"):
+                arguments.append("int(o.%s)" % field.name)
+            elif field.type in (bool, "bool"):
+                arguments.append("'true' if o.%s else 'false'" % field.name)
+            elif field.type in (str, "str"):
+                arguments.append("string(o.%s)" % field.name)
+            else:
+                arguments.append("value(o.%s)" % field.name)
+        source = "def plan(o):\n    return '{%s}' %% (%s,)\n" % (",".join(parts), ", ".join(arguments))
+        namespace = {"string": encode_string, "value": self.encode}
+        exec(source, namespace)
+        return namespace["plan"]
+
+    def plan(self, cls: type) -> Callable[[Any], str]:
+        """
+        :param cls: a dataclass
+        :return: the compiled function used to serialize instances of the class
+        """
+        plan = self.plans.get(cls)
+        if plan is None:
+            plan = self.plans[cls] = self.__compile(cls)
+        return plan
+
+    def encode(self, data: Any) -> str:
+        """
+        :param data: the data to serialize
+        :return: the JSON representation of the data
+        """
+        if isinstance(data, str):
+            return encode_string(data)
+        if isinstance(data, Enum):
+            return str(data.value) if self.enums == "value" else encode_string(data.name)
+        if isinstance(data, bool) or data is None:
+            return "true" if data else "false" if data is not None else "null"
+        if isinstance(data, (int, float)):
+            return json.dumps(data)
+        if isinstance(data, dict):
+            return "{%s}" % ",".join("%s:%s" % (encode_string(str(key)), self.encode(value))
+                                     for key, value in data.items())
+        if isinstance(data, (list, tuple)):
+            if data and dataclasses.is_dataclass(data[0]) and all(type(i) is type(data[0]) for i in data):
+                plan = self.plan(type(data[0]))
+                return "[%s]" % ",".join(map(plan, data))
+            return "[%s]" % ",".join(map(self.encode, data))
+        if dataclasses.is_dataclass(data):
+            return self.plan(type(data))(data)
+        raise TypeError("Object of type %s is not JSON serializable" % type(data).__name__)
+
+    def dumps(self, data: Any) -> bytes:
+        """
+        :param data: the data to serialize
+        :return: the UTF-8 encoded JSON representation of the data
+        """
+        if self.backend == "orjson" and self.enums == "value":
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        return self.encode(data).encode("utf-8")
+
+
+__serializers = {}
+
+
+def serializer(enums: str = "value", backend: str = None) -> JSONSerializer:
+    """
+    :param enums: whether enum fields are written as their integer value or their member name
+    :param backend: "orjson" or "plans", defaults to orjson when it is installed
+    :return: a shared serializer, so each dataclass is only compiled once per configuration
+    """
+    key = (enums, backend)
+    if key not in __serializers:
+        __serializers[key] = JSONSerializer(enums, backend)
+    return __serializers[key]
+
+
+def app_serializer() -> JSONSerializer:
+    """
+    :return: the serializer configured by the JSON_ENUMS and JSON_BACKEND settings of the current app
+    """
+    return serializer(current_app.config.get("JSON_ENUMS", "value"), current_app.config.get("JSON_BACKEND"))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """A Flask-API renderer which serializes responses through the compiled plans of a JSONSerializer."""
+
+    def render(self, data, media_type, **options):
+        with metrics.timer("render_duration_seconds", route=route_label(request)):
+            if options.get("indent") is not None or "indent" in media_type.params:
+                return super().render(data, media_type, **options)
+            return app_serializer().dumps(data)
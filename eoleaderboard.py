@@ -0,0 +1,219 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Optional
+
+from flask import Flask
+
+from eodatabase import Character, db
+
+# the stats characters can be ranked by and the columns they are read from
+STATS = {
+    "level": Character.level,
+    "exp": Character.exp,
+    "karma": Character.karma,
+    "gold": Character.goldbank,
+}
+
+# the columns kept for every character, in the order they are stored
+COLUMNS = [Character.name, Character.usage, Character.guild, Character.class_id] + list(STATS.values())
+# the position of the first stat in a stored row
+STATS_OFFSET = 4
+
+
+class Ranking:
+    """
+    A class used to represent characters sorted by a single stat, highest first.
+
+    Entries are kept in a sorted array of (-value, name) keys so the rank of a character is found with a
+    binary search and ties are broken by name.
+    """
+
+    def __init__(self):
+        self.keys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, name: str, value: int):
+        insort(self.keys, (-value, name))
+
+    def extend(self, entries: list[tuple[str, int]]):
+        """
+        Adds many entries with a single sort, rather than an insertion each.
+        :param entries: a list of (name, value) pairs
+        """
+        self.keys.extend((-value, name) for name, value in entries)
+        self.keys.sort()
+
+    def remove(self, name: str, value: int):
+        i = bisect_left(self.keys, (-value, name))
+        if i < len(self.keys) and self.keys[i] == (-value, name):
+            del self.keys[i]
+
+    def discard(self, names: set[str]):
+        """
+        Removes many entries in a single pass, rather than a deletion each.
+        :param names: the names of the entries to remove
+        """
+        self.keys = [key for key in self.keys if key[1] not in names]
+
+    def rank(self, name: str, value: int) -> int:
+        """
+        :param name: the name of the character
+        :param value: the current value of the stat for the character
+        :return: the 1-based position of the character
+        """
+        return bisect_left(self.keys, (-value, name)) + 1
+
+    def top(self, offset: int, limit: int) -> list[tuple[int, str]]:
+        """
+        :param offset: the number of leading entries to skip
+        :param limit: the maximum number of entries to return
+        :return: a list of (value, name) pairs
+        """
+        return [(-value, name) for value, name in self.keys[offset:offset + limit]]
+
+
+class Leaderboards:
+    """
+    A class used to represent in-memory rankings of every character by level, exp, karma and gold.
+
+    Every stat is ranked overall, per guild and per class. The rankings are built from the characters table
+    once and then kept up to date by polling the usage and exp of every character and only reloading the
+    characters where either changed.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.rankings = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    @staticmethod
+    def __partitions(row: tuple) -> list[tuple]:
+        _, _, guild, class_id = row[:4]
+        partitions = [("all", None), ("class", class_id)]
+        if guild:
+            partitions.append(("guild", guild.strip()))
+        return partitions
+
+    def __add(self, row: tuple):
+        self.rows[row[0]] = row
+        for partition in self.__partitions(row):
+            for i, stat in enumerate(STATS, STATS_OFFSET):
+                self.rankings.setdefault((stat,) + partition, Ranking()).add(row[0], row[i])
+
+    def __extend(self, rows: list[tuple]):
+        added = {}
+        for row in rows:
+            self.rows[row[0]] = row
+            for partition in self.__partitions(row):
+                for i, stat in enumerate(STATS, STATS_OFFSET):
+                    added.setdefault((stat,) + partition, []).append((row[0], row[i]))
+        for key, entries in added.items():
+            self.rankings.setdefault(key, Ranking()).extend(entries)
+
+    def __discard(self, names: set[str]):
+        if names:
+            for name in names:
+                del self.rows[name]
+            for ranking in self.rankings.values():
+                ranking.discard(names)
+
+    def __remove(self, name: str):
+        row = self.rows.pop(name)
+        for partition in self.__partitions(row):
+            for i, stat in enumerate(STATS, STATS_OFFSET):
+                self.rankings[(stat,) + partition].remove(name, row[i])
+
+    def refresh(self, chunk: int = 500):
+        """
+        Reloads every character whose usage or exp changed since the last refresh. Must be called within an
+        application context. A few changed characters are inserted into the rankings one at a time, while the
+        initial build and any refresh changing more than a chunk of characters filter and sort every ranking once.
+        :param chunk: the maximum number of characters reloaded per query
+        """
+        current = {name: (usage, exp) for name, usage, exp in
+                   db.session.query(Character.name, Character.usage, Character.exp)}
+        exp = STATS_OFFSET + list(STATS).index("exp")
+        with self.lock:
+            known = {name: (row[1], row[exp]) for name, row in self.rows.items()}
+        changed = [name for name, state in current.items() if known.get(name) != state]
+        deleted = [name for name in known if name not in current]
+
+        rows = []
+        for i in range(0, len(changed), chunk):
+            rows.extend(tuple(row) for row in
+                        db.session.query(*COLUMNS).filter(Character.name.in_(changed[i:i + chunk])))
+
+        with self.lock:
+            stale = deleted + [row[0] for row in rows if row[0] in self.rows]
+            if len(stale) + len(rows) > chunk:
+                self.__discard(set(stale))
+                self.__extend(rows)
+            else:
+                for name in stale:
+                    self.__remove(name)
+                for row in rows:
+                    self.__add(row)
+
+    def start(self, app: Flask, interval: float = 60.0) -> threading.Thread:
+        """
+        Builds the rankings and keeps refreshing them in a background thread.
+        :param app: the app providing the database
+        :param interval: the number of seconds between refreshes
+        :return: the refresh thread
+        """
+        def run():
+            while not self.stopped.wait(interval):
+                try:
+                    with app.app_context():
+                        self.refresh()
+                except Exception:
+                    # e.g. a busy database, the rankings are kept until the next refresh succeeds
+                    app.logger.exception("failed to refresh the leaderboards")
+
+        with app.app_context():
+            self.refresh()
+        thread = threading.Thread(target=run, name="leaderboards", daemon=True)
+        thread.start()
+        return thread
+
+    def __ranking(self, stat: str, guild: Optional[str], class_id: Optional[int]) -> Ranking:
+        if guild is not None:
+            return self.rankings.get((stat, "guild", guild), Ranking())
+        if class_id is not None:
+            return self.rankings.get((stat, "class", class_id), Ranking())
+        return self.rankings.get((stat, "all", None), Ranking())
+
+    def top(self, stat: str, offset: int = 0, limit: int = 100, guild: str = None, class_id: int = None) -> dict:
+        """
+        :param stat: the stat to rank by, one of STATS
+        :param offset: the number of leading characters to skip
+        :param limit: the maximum number of characters to return
+        :param guild: the tag of the guild to rank within (optional)
+        :param class_id: the id of the class to rank within (optional)
+        :return: a dictionary of the number of ranked characters and the requested page of the ranking
+        """
+        with self.lock:
+            ranking = self.__ranking(stat, guild, class_id)
+            results = [{"rank": offset + i + 1, "name": name, "value": value}
+                       for i, (value, name) in enumerate(ranking.top(offset, limit))]
+            return {"total": len(ranking), "results": results}
+
+    def rank(self, stat: str, name: str) -> Optional[dict]:
+        """
+        :param stat: the stat to rank by, one of STATS
+        :param name: the name of the character
+        :return: the overall, guild and class rank of the character, or None if it is unknown
+        """
+        with self.lock:
+            row = self.rows.get(name)
+            if row is None:
+                return None
+            value = row[STATS_OFFSET + list(STATS).index(stat)]
+            result = {"name": name, "value": value}
+            for kind, partition in self.__partitions(row):
+                key = "rank" if kind == "all" else kind + "_rank"
+                result[key] = self.rankings[(stat, kind, partition)].rank(name, value)
+            return result
@@ -1,13 +1,29 @@
-from configparser import ConfigParser
+import dataclasses
+import mmap
+import os
+import zlib
+
 from dataclasses import dataclass
 from enum import Enum
+from typing import Callable, Iterator
+
+# the version of the decoders below, bump it whenever a change alters what they return so cached decodes are discarded
+READER_VERSION = 2
 
 
 class EOReader:
-    """A class used to read an Endless Online encoded binary file."""
+    """
+    A class used to read an Endless Online encoded binary file.
+
+    The whole file is read (or memory-mapped) once and decoded from a memoryview with a cursor.
+    """
     ONE_BYTE_MAX = 253
     TWO_BYTE_MAX = int(pow(ONE_BYTE_MAX, 2))
     THREE_BYTE_MAX = int(pow(ONE_BYTE_MAX, 3))
+    MMAP_THRESHOLD = 1 << 20
+
+    # the decoded value of every possible byte: 254 and 0 are remapped to 1 and 128 before subtracting 1
+    VALUES = tuple(0 if b == 254 else 127 if b == 0 else b - 1 for b in range(256))
 
     @staticmethod
     def number(b1: int, b2: int = 254, b3: int = 254, b4: int = 254):
@@ -19,83 +35,264 @@ class EOReader:
         :param b4: the fourth byte to decode (optional
         :return: the value represented by the given series of bytes
         """
-        b1 = 1 if b1 == 254 else b1
-        b2 = 1 if b2 == 254 else b2
-        b3 = 1 if b3 == 254 else b3
-        b4 = 1 if b4 == 254 else b4
-
-        b1 = 128 if b1 == 0 else b1
-        b2 = 128 if b2 == 0 else b2
-        b3 = 128 if b3 == 0 else b3
-        b4 = 128 if b4 == 0 else b4
-
-        b1 -= 1
-        b2 -= 1
-        b3 -= 1
-        b4 -= 1
+        values = EOReader.VALUES
+        return (values[b4] * EOReader.THREE_BYTE_MAX) + (values[b3] * EOReader.TWO_BYTE_MAX) + \
+            (values[b2] * EOReader.ONE_BYTE_MAX) + values[b1]
 
-        return (b4 * EOReader.THREE_BYTE_MAX) + (b3 * EOReader.TWO_BYTE_MAX) + (b2 * EOReader.ONE_BYTE_MAX) + b1
-
-    def __init__(self, path: str):
-        self.file = open(path, "rb")
-        pass
+    def __init__(self, path: str = None, data: bytes = None, use_mmap: bool = None):
+        """
+        :param path: the path of the file to read
+        :param data: the bytes to read instead of a file (optional)
+        :param use_mmap: whether to memory-map the file rather than read it, defaults to doing so for large files
+        """
+        self.map = None
+        if path is not None:
+            with open(path, "rb") as file:
+                size = os.fstat(file.fileno()).st_size
+                if use_mmap or (use_mmap is None and size >= EOReader.MMAP_THRESHOLD):
+                    self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+                    data = self.map if self.map is not None else b""
+                else:
+                    data = file.read()
+        self.buffer = data
+        self.data = memoryview(data)
+        self.position = 0
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.file.close()
+        self.close()
+
+    def close(self):
+        self.data.release()
+        self.buffer = None
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def __take(self, amount: int) -> int:
+        position = self.position
+        if position + amount > len(self.data):
+            raise EOFError("unexpected end of data at", position)
+        self.position = position + amount
+        return position
+
+    def seek(self, position: int):
+        """
+        :param position: the offset from the start of the data to continue reading from
+        """
+        self.position = position
+
+    def tell(self) -> int:
+        """
+        :return: the offset from the start of the data of the next byte
+        """
+        return self.position
+
+    def remaining(self) -> int:
+        """
+        :return: the number of bytes left to read
+        """
+        return len(self.data) - self.position
 
     def read_byte(self) -> int:
         """
         :return: the value of the next byte
         """
-        return self.file.read(1)[0]
+        return self.data[self.__take(1)]
+
+    def read_bytes(self, length: int) -> memoryview:
+        """
+        :param length: the amount of bytes to read
+        :return: a view of the next length bytes
+        """
+        position = self.__take(length)
+        return self.data[position:position + length]
 
     def read_char(self) -> int:
         """
         :return: the decoded value of the next byte
         """
-        return EOReader.number(self.read_byte())
+        return EOReader.VALUES[self.data[self.__take(1)]]
 
     def read_short(self) -> int:
         """
         :return: the decoded value of the next 2 bytes
         """
-        return EOReader.number(self.read_byte(), self.read_byte())
+        data, values, i = self.data, EOReader.VALUES, self.__take(2)
+        return values[data[i]] + values[data[i + 1]] * EOReader.ONE_BYTE_MAX
 
     def read_three(self) -> int:
         """
         :return: the decoded value of the next 3 bytes
         """
-        return EOReader.number(self.read_byte(), self.read_byte(), self.read_byte())
+        data, values, i = self.data, EOReader.VALUES, self.__take(3)
+        return values[data[i]] + values[data[i + 1]] * EOReader.ONE_BYTE_MAX + \
+            values[data[i + 2]] * EOReader.TWO_BYTE_MAX
 
     def read_int(self) -> int:
         """
         :return:  the decoded value of the next 4 bytes
         """
-        return EOReader.number(self.read_byte(), self.read_byte(), self.read_byte(), self.read_byte())
+        data, values, i = self.data, EOReader.VALUES, self.__take(4)
+        return values[data[i]] + values[data[i + 1]] * EOReader.ONE_BYTE_MAX + \
+            values[data[i + 2]] * EOReader.TWO_BYTE_MAX + values[data[i + 3]] * EOReader.THREE_BYTE_MAX
 
     def read_fixed_string(self, length: int) -> str:
         """
         :param length: the length of the string to read
         :return: the ascii representation of length bytes
         """
-        return self.file.read(length).decode("ascii")
+        return str(self.read_bytes(length), "ascii")
 
     def read_break_string(self):
         """
         :return: the ascii representation of the bytes up to 0xFF
         """
-        data = []
-        b = self.read_byte()
-        while b != 0xFF:
-            data.append(b)
-            b = self.read_byte()
-        return bytes(data).decode("ascii")
+        end = self.buffer.find(b"\xff", self.position)
+        if end < 0:
+            raise EOFError("unterminated string at", self.position)
+        value = str(self.data[self.position:end], "ascii")
+        self.position = end + 1
+        return value
 
     def skip(self, amount: int):
-        self.file.read(amount)
+        self.__take(amount)
+
+
+class EOWriter:
+    """
+    A class used to write an Endless Online encoded binary file, the inverse of EOReader.
+
+    Values are appended to a single buffer. Numbers are encoded like the game encodes them: every base 253 digit is
+    stored plus 1, and the unused high bytes of small numbers are 254.
+    """
+    # the largest value which fits in 1 to 4 bytes
+    MAX = (0, EOReader.ONE_BYTE_MAX - 1, EOReader.TWO_BYTE_MAX - 1, EOReader.THREE_BYTE_MAX - 1,
+           EOReader.THREE_BYTE_MAX * EOReader.ONE_BYTE_MAX - 1)
+
+    # the encoded byte of every single byte value
+    CHARS = tuple(bytes((value + 1,)) for value in range(EOReader.ONE_BYTE_MAX))
+
+    @staticmethod
+    def encode_number(value: int, size: int = 4) -> bytes:
+        """
+        Encodes a single value into a series of bytes.
+        :param value: the value to encode
+        :param size: the number of bytes to encode it in
+        :return: the bytes EOReader.number decodes into the value
+        """
+        if not 0 <= value <= EOWriter.MAX[size]:
+            raise ValueError(value, "does not fit in", size, "bytes")
+        encoded = bytearray((254,) * size)
+        original = value
+        for i, base in ((3, EOReader.THREE_BYTE_MAX), (2, EOReader.TWO_BYTE_MAX), (1, EOReader.ONE_BYTE_MAX)):
+            if i < size and original >= base:
+                encoded[i] = value // base + 1
+                value %= base
+        encoded[0] = value + 1
+        return bytes(encoded)
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def __len__(self):
+        return len(self.data)
+
+    def to_bytes(self) -> bytes:
+        """
+        :return: the written bytes
+        """
+        return bytes(self.data)
+
+    def save(self, path: str):
+        """
+        :param path: the path of the file to write the bytes to
+        """
+        with open(path, "wb") as file:
+            file.write(self.data)
+
+    def add_byte(self, value: int):
+        """
+        :param value: the raw value of the next byte
+        """
+        self.data.append(value)
+
+    def add_bytes(self, data: bytes):
+        """
+        :param data: the raw bytes to append
+        """
+        self.data += data
+
+    def add_char(self, value: int):
+        """
+        :param value: the value to encode in the next byte
+        """
+        if not 0 <= value < EOReader.ONE_BYTE_MAX:
+            raise ValueError(value, "does not fit in", 1, "bytes")
+        self.data += EOWriter.CHARS[value]
+
+    def add_short(self, value: int):
+        """
+        :param value: the value to encode in the next 2 bytes
+        """
+        self.data += EOWriter.encode_number(value, 2)
+
+    def add_three(self, value: int):
+        """
+        :param value: the value to encode in the next 3 bytes
+        """
+        self.data += EOWriter.encode_number(value, 3)
+
+    def add_int(self, value: int):
+        """
+        :param value: the value to encode in the next 4 bytes
+        """
+        self.data += EOWriter.encode_number(value, 4)
+
+    def add_fixed_string(self, value: str):
+        """
+        :param value: the ascii string to append, its length stored elsewhere
+        """
+        self.data += value.encode("ascii")
+
+    def add_break_string(self, value: str):
+        """
+        :param value: the ascii string to append, followed by 0xFF
+        """
+        self.data += value.encode("ascii") + b"\xff"
+
+    def fill(self, amount: int):
+        """
+        :param amount: the number of zero bytes to write where EOReader skips over unused values
+        """
+        self.data += EOWriter.CHARS[0] * amount
+
+
+class Members(dict):
+    """
+    A class used to represent the members of an int Enum keyed by value, which raises ValueError for an unknown value
+    just like Enum.__call__, so a malformed file fails to decode the same way it did before.
+    """
+
+    def __init__(self, enum: type):
+        """
+        :param enum: an int Enum
+        """
+        super().__init__((member.value, member) for member in enum)
+        self.enum = enum
+
+    def __missing__(self, value: int):
+        raise ValueError("%r is not a valid %s" % (value, self.enum.__name__))
+
+
+def members(enum: type) -> dict:
+    """
+    :param enum: an int Enum
+    :return: a dictionary of the enum members keyed by value, used to decode enum fields without Enum.__call__
+    """
+    return Members(enum)
 
 
 class EIFType(int, Enum):
@@ -126,6 +323,9 @@ class EIFType(int, Enum):
     CureCurse = 25
 
 
+EIF_TYPES = members(EIFType)
+
+
 class EIFSubType(int, Enum):
     Normal = 0
     Range = 1
@@ -134,6 +334,9 @@ class EIFSubType(int, Enum):
     TwoHanded = 4
 
 
+EIF_SUBTYPES = members(EIFSubType)
+
+
 class EIFSpecial(int, Enum):
     Common = 0
     Uncommon = 1
@@ -145,6 +348,9 @@ class EIFSpecial(int, Enum):
     Unknown2 = 7
 
 
+EIF_SPECIALS = members(EIFSpecial)
+
+
 class EIFSize(int, Enum):
     Size1x1 = 0
     Size1x2 = 1
@@ -156,9 +362,19 @@ class EIFSize(int, Enum):
     Size2x4 = 7
 
 
+EIF_SIZES = members(EIFSize)
+
+
 @dataclass
 class EIF:
     """A class used to represent a single entry in an Endless Online items pub file."""
+    __slots__ = (
+        "id", "name", "graphic", "type", "subtype", "special", "health", "mana", "min_damage", "max_damage",
+        "accuracy", "evade", "armor", "strength", "intelligence", "wisdom", "agility", "constitution", "charisma",
+        "spec1", "spec2", "spec3", "level_requirement", "class_requirement", "strength_requirement",
+        "intelligence_requirement", "wisdom_requirement", "agility_requirement", "constitution_requirement",
+        "charisma_requirement", "element", "element_power", "weight", "size"
+    )
     id: int
     name: str
     graphic: int
@@ -198,9 +414,9 @@ class EIF:
         if reader:
             self.name = reader.read_fixed_string(reader.read_char())
             self.graphic = reader.read_short()
-            self.type = EIFType(reader.read_char())
-            self.subtype = EIFSubType(reader.read_char())
-            self.special = EIFSpecial(reader.read_char())
+            self.type = EIF_TYPES[reader.read_char()]
+            self.subtype = EIF_SUBTYPES[reader.read_char()]
+            self.special = EIF_SPECIALS[reader.read_char()]
             self.health = reader.read_short()
             self.mana = reader.read_short()
             self.min_damage = reader.read_short()
@@ -231,7 +447,46 @@ class EIF:
             self.element_power = reader.read_char()
             self.weight = reader.read_char()
             reader.skip(1)
-            self.size = EIFSize(reader.read_char())
+            self.size = EIF_SIZES[reader.read_char()]
+
+    def write(self, writer: EOWriter):
+        writer.add_char(len(self.name))
+        writer.add_fixed_string(self.name)
+        writer.add_short(self.graphic)
+        writer.add_char(self.type)
+        writer.add_char(self.subtype)
+        writer.add_char(self.special)
+        writer.add_short(self.health)
+        writer.add_short(self.mana)
+        writer.add_short(self.min_damage)
+        writer.add_short(self.max_damage)
+        writer.add_short(self.accuracy)
+        writer.add_short(self.evade)
+        writer.add_short(self.armor)
+        writer.fill(1)
+        writer.add_char(self.strength)
+        writer.add_char(self.intelligence)
+        writer.add_char(self.wisdom)
+        writer.add_char(self.agility)
+        writer.add_char(self.constitution)
+        writer.add_char(self.charisma)
+        writer.fill(6)
+        writer.add_three(self.spec1)
+        writer.add_char(self.spec2)
+        writer.add_char(self.spec3)
+        writer.add_short(self.level_requirement)
+        writer.add_short(self.class_requirement)
+        writer.add_short(self.strength_requirement)
+        writer.add_short(self.intelligence_requirement)
+        writer.add_short(self.wisdom_requirement)
+        writer.add_short(self.agility_requirement)
+        writer.add_short(self.constitution_requirement)
+        writer.add_short(self.charisma_requirement)
+        writer.add_char(self.element)
+        writer.add_char(self.element_power)
+        writer.add_char(self.weight)
+        writer.fill(1)
+        writer.add_char(self.size)
 
 
 class ENFType(int, Enum):
@@ -258,9 +513,16 @@ class ENFType(int, Enum):
     Unknown8 = 20
 
 
+ENF_TYPES = members(ENFType)
+
+
 @dataclass
 class ENF:
     """A class used to represent a single entry in an Endless Online NPC pub file."""
+    __slots__ = (
+        "id", "name", "graphic", "boss", "child", "type", "vendor", "health", "min_damage", "max_damage",
+        "accuracy", "evade", "armor", "element_weak", "element_weak_power", "experience"
+    )
     id: int
     name: str
     graphic: int
@@ -285,7 +547,7 @@ class ENF:
             reader.skip(1)
             self.boss = reader.read_short() > 0
             self.child = reader.read_short() > 0
-            self.type = ENFType(reader.read_short())
+            self.type = ENF_TYPES[reader.read_short()]
             self.vendor = reader.read_short()
             self.health = reader.read_three()
             reader.skip(2)
@@ -300,6 +562,28 @@ class ENF:
             reader.skip(1)
             self.experience = reader.read_three()
 
+    def write(self, writer: EOWriter):
+        writer.add_char(len(self.name))
+        writer.add_fixed_string(self.name)
+        writer.add_short(self.graphic)
+        writer.fill(1)
+        writer.add_short(int(self.boss))
+        writer.add_short(int(self.child))
+        writer.add_short(self.type)
+        writer.add_short(self.vendor)
+        writer.add_three(self.health)
+        writer.fill(2)
+        writer.add_short(self.min_damage)
+        writer.add_short(self.max_damage)
+        writer.add_short(self.accuracy)
+        writer.add_short(self.evade)
+        writer.add_short(self.armor)
+        writer.fill(5)
+        writer.add_short(self.element_weak)
+        writer.add_short(self.element_weak_power)
+        writer.fill(1)
+        writer.add_three(self.experience)
+
 
 class ESFType(int, Enum):
     Heal = 0
@@ -307,12 +591,18 @@ class ESFType(int, Enum):
     Bard = 2
 
 
+ESF_TYPES = members(ESFType)
+
+
 class ESFTargetRestrict(int, Enum):
     NPC = 0
     Friendly = 1
     Opponent = 2
 
 
+ESF_TARGET_RESTRICTS = members(ESFTargetRestrict)
+
+
 class ESFTargetType(int, Enum):
     Normal = 0
     Self = 1
@@ -320,9 +610,16 @@ class ESFTargetType(int, Enum):
     Group = 3
 
 
+ESF_TARGET_TYPES = members(ESFTargetType)
+
+
 @dataclass
 class ESF:
     """A class used to represent a single entry in an Endless Online spells pub file."""
+    __slots__ = (
+        "id", "name", "shout", "icon", "graphic", "mana", "stamina", "cast_time", "type", "element",
+        "element_power", "target_restrict", "target_type", "min_damage", "max_damage", "accuracy", "heal"
+    )
     id: int
     name: str
     shout: str
@@ -338,6 +635,7 @@ class ESF:
     target_type: ESFTargetType
     min_damage: int
     max_damage: int
+    accuracy: int
     heal: int
 
     def __init__(self, reader: EOReader = None):
@@ -352,11 +650,11 @@ class ESF:
             self.stamina = reader.read_short()
             self.cast_time = reader.read_char()
             reader.skip(2)
-            self.type = ESFType(reader.read_three())
+            self.type = ESF_TYPES[reader.read_three()]
             self.element = reader.read_char()
             self.element_power = reader.read_short()
-            self.target_restrict = ESFTargetRestrict(reader.read_char())
-            self.target_type = ESFTargetType(reader.read_char())
+            self.target_restrict = ESF_TARGET_RESTRICTS[reader.read_char()]
+            self.target_type = ESF_TARGET_TYPES[reader.read_char()]
             reader.skip(4)
             self.min_damage = reader.read_short()
             self.max_damage = reader.read_short()
@@ -365,10 +663,38 @@ class ESF:
             self.heal = reader.read_short()
             reader.skip(15)
 
+    def write(self, writer: EOWriter):
+        writer.add_char(len(self.name))
+        writer.add_char(len(self.shout))
+        writer.add_fixed_string(self.name)
+        writer.add_fixed_string(self.shout)
+        writer.add_short(self.icon)
+        writer.add_short(self.graphic)
+        writer.add_short(self.mana)
+        writer.add_short(self.stamina)
+        writer.add_char(self.cast_time)
+        writer.fill(2)
+        writer.add_three(self.type)
+        writer.add_char(self.element)
+        writer.add_short(self.element_power)
+        writer.add_char(self.target_restrict)
+        writer.add_char(self.target_type)
+        writer.fill(4)
+        writer.add_short(self.min_damage)
+        writer.add_short(self.max_damage)
+        writer.add_short(self.accuracy)
+        writer.fill(5)
+        writer.add_short(self.heal)
+        writer.fill(15)
+
 
 @dataclass
 class ECF:
     """A class used to represent a single entry in an Endless Online class pub file."""
+    __slots__ = (
+        "id", "name", "parent", "stat_table", "strength", "intelligence", "wisdom", "agility", "constitution",
+        "charisma"
+    )
     id: int
     name: str
     parent: int
@@ -392,6 +718,31 @@ class ECF:
             self.constitution = reader.read_short()
             self.charisma = reader.read_short()
 
+    def write(self, writer: EOWriter):
+        writer.add_char(len(self.name))
+        writer.add_fixed_string(self.name)
+        writer.add_char(self.parent)
+        writer.add_char(self.stat_table)
+        writer.add_short(self.strength)
+        writer.add_short(self.intelligence)
+        writer.add_short(self.wisdom)
+        writer.add_short(self.agility)
+        writer.add_short(self.constitution)
+        writer.add_short(self.charisma)
+
+
+def read_pub_header(file: str) -> tuple[str, int, int]:
+    """
+    Reads the header of an Endless Online pub file without decoding its entries.
+    :param file: the path to the pub file
+    :return: a tuple of the file magic, the rid and the total number of entries
+    """
+    with EOReader(file) as reader:
+        magic = reader.read_fixed_string(3)
+        rid = reader.read_int()
+        total = reader.read_short()
+        return magic, rid, total
+
 
 def __read_pub(pub: type, extension: str, file: str) -> list:
     """
@@ -452,129 +803,669 @@ def read_ecf(file: str) -> list[ECF]:
     return __read_pub(ECF, "ECF", file)
 
 
-def __read_ini(file: str) -> list[tuple[str, str]]:
+def __blank_entry(pub: type, name: str) -> object:
+    """
+    :param pub: a class representing a single entry in a pub file
+    :param name: the name of the entry
+    :return: an entry with every other field zero or empty, such as the eof entry closing a pub file
+    """
+    entry = pub()
+    for field in dataclasses.fields(pub):
+        if field.type is str:
+            value = name if field.name == "name" else ""
+        elif isinstance(field.type, type) and issubclass(field.type, Enum):
+            value = members(field.type)[0]
+        else:
+            value = field.type(0)
+        setattr(entry, field.name, value)
+    return entry
+
+
+def __write_pub(pub: type, extension: str, file: str, entries: list, rid: int = None) -> int:
+    """
+    Writes an Endless Online pub file, closed by an eof entry like the files of the game.
+    :param pub: a class representing a single entry in a pub file
+    :param extension: the file magic of the pub file type
+    :param file: the path to write the pub file to
+    :param entries: the pub entries, in id order
+    :param rid: the rid of the file, defaults to a checksum of the entries
+    :return: the rid of the file
+    """
+    body = EOWriter()
+    for entry in entries:
+        entry.write(body)
+    __blank_entry(pub, "eof").write(body)
+    if rid is None:
+        rid = zlib.crc32(body.data) % (EOWriter.MAX[4] + 1)
+    header = EOWriter()
+    header.add_fixed_string(extension)
+    header.add_int(rid)
+    header.add_short(len(entries) + 1)
+    header.add_char(0)
+    with open(file, "wb") as f:
+        f.write(header.data)
+        f.write(body.data)
+    return rid
+
+
+def write_eif(file: str, entries: list[EIF], rid: int = None) -> int:
+    """
+    Writes an Endless Online items file
+    :param file: the path to the eif file
+    :param entries: the EIF entries
+    :param rid: the rid of the file, defaults to a checksum of the entries
+    :return: the rid of the file
+    """
+    return __write_pub(EIF, "EIF", file, entries, rid)
+
+
+def write_enf(file: str, entries: list[ENF], rid: int = None) -> int:
+    """
+    Writes an Endless Online NPCs file
+    :param file: the path to the enf file
+    :param entries: the ENF entries
+    :param rid: the rid of the file, defaults to a checksum of the entries
+    :return: the rid of the file
+    """
+    return __write_pub(ENF, "ENF", file, entries, rid)
+
+
+def write_esf(file: str, entries: list[ESF], rid: int = None) -> int:
     """
-    Reads an EOServ ini file.
+    Writes an Endless Online spells file
+    :param file: the path to the esf file
+    :param entries: the ESF entries
+    :param rid: the rid of the file, defaults to a checksum of the entries
+    :return: the rid of the file
+    """
+    return __write_pub(ESF, "ESF", file, entries, rid)
+
+
+def write_ecf(file: str, entries: list[ECF], rid: int = None) -> int:
+    """
+    Writes an Endless Online classes file
+    :param file: the path to the ecf file
+    :param entries: the ECF entries
+    :param rid: the rid of the file, defaults to a checksum of the entries
+    :return: the rid of the file
+    """
+    return __write_pub(ECF, "ECF", file, entries, rid)
+
+
+def decode_map_string(data: bytes) -> str:
+    """
+    Decodes a string stored in an Endless Online map file, which are reversed and have every character flipped.
+    :param data: the encoded bytes
+    :return: the decoded string, without its 0xFF padding
+    """
+    decoded = bytearray(data)
+    decoded.reverse()
+    flippy = len(decoded) % 2 == 1
+    for i, c in enumerate(decoded):
+        if flippy:
+            if 0x22 <= c <= 0x4F:
+                decoded[i] = 0x71 - c
+            elif 0x50 <= c <= 0x7E:
+                decoded[i] = 0xCD - c
+        elif 0x22 <= c <= 0x7E:
+            decoded[i] = 0x9F - c
+        flippy = not flippy
+    return str(decoded.split(b"\xff", 1)[0], "latin-1")
+
+
+def __map_string_tables() -> tuple[dict, dict]:
+    """
+    :return: the encoded byte of every decoded byte, for characters at odd and at even positions of a flipped string
+    """
+    flipped = ({}, {})
+    for c in range(256):
+        if 0x22 <= c <= 0x4F:
+            odd = 0x71 - c
+        elif 0x50 <= c <= 0x7E:
+            odd = 0xCD - c
+        else:
+            odd = c
+        flipped[0].setdefault(odd, c)
+        flipped[1].setdefault(0x9F - c if 0x22 <= c <= 0x7E else c, c)
+    return flipped
+
+
+MAP_STRING_TABLES = __map_string_tables()
+
+
+def encode_map_string(value: str, length: int = None) -> bytes:
+    """
+    Encodes a string to be stored in an Endless Online map file, the inverse of decode_map_string.
+    :param value: the string to encode
+    :param length: the number of bytes to store it in, padded with 0xFF (optional)
+    :return: the encoded bytes
+    """
+    decoded = value.encode("latin-1")
+    if length is not None:
+        if len(decoded) > length:
+            raise ValueError(value, "is longer than", length, "bytes")
+        decoded += b"\xff" * (length - len(decoded))
+    encoded = bytearray(len(decoded))
+    flippy = len(decoded) % 2 == 1
+    for i, c in enumerate(decoded):
+        table = MAP_STRING_TABLES[0 if flippy else 1]
+        if c not in table:
+            raise ValueError(value, "can not be stored in a map file")
+        encoded[i] = table[c]
+        flippy = not flippy
+    encoded.reverse()
+    return bytes(encoded)
+
+
+@dataclass
+class EMFNPC:
+    """A class used to represent an NPC spawn in an Endless Online map file."""
+    __slots__ = ("x", "y", "id", "spawn_type", "spawn_time", "amount")
+    x: int
+    y: int
+    id: int
+    spawn_type: int
+    spawn_time: int
+    amount: int
+
+
+@dataclass
+class EMFChest:
+    """A class used to represent an item spawned in a chest of an Endless Online map file."""
+    __slots__ = ("x", "y", "key", "slot", "item", "spawn_time", "amount")
+    x: int
+    y: int
+    key: int
+    slot: int
+    item: int
+    spawn_time: int
+    amount: int
+
+
+@dataclass
+class EMFWarp:
+    """A class used to represent a warp tile in an Endless Online map file."""
+    __slots__ = ("x", "y", "map", "warp_x", "warp_y", "level", "door")
+    x: int
+    y: int
+    map: int
+    warp_x: int
+    warp_y: int
+    level: int
+    door: int
+
+
+@dataclass
+class EMFSign:
+    """A class used to represent a sign in an Endless Online map file."""
+    __slots__ = ("x", "y", "title", "message")
+    x: int
+    y: int
+    title: str
+    message: str
+
+
+@dataclass
+class EMF:
+    """
+    A class used to represent an Endless Online map file.
+
+    The header, NPC spawns, chests, warps and signs are decoded eagerly. The tile spec and graphic layers, which
+    make up most of a map file, are only skipped over and decoded on demand by layer().
+    """
+    __slots__ = (
+        "id", "name", "type", "effect", "music", "music_control", "ambient_sound", "width", "height", "fill_tile",
+        "map_available", "can_scroll", "relog_x", "relog_y", "npcs", "chests", "warps", "signs",
+        "_file", "_rid", "_layers"
+    )
+    id: int
+    name: str
+    type: int
+    effect: int
+    music: int
+    music_control: int
+    ambient_sound: int
+    width: int
+    height: int
+    fill_tile: int
+    map_available: bool
+    can_scroll: bool
+    relog_x: int
+    relog_y: int
+    npcs: list[EMFNPC]
+    chests: list[EMFChest]
+    warps: list[EMFWarp]
+    signs: list[EMFSign]
+
+    # the layers of a map file in the order they are stored: tile specs followed by the graphic layers
+    LAYERS = ("specs", "ground", "objects", "overlay", "down_wall", "right_wall", "roof", "top", "shadow",
+              "overlay2")
+
+    def __init__(self, reader: EOReader = None):
+        if reader:
+            reader.skip(3)
+            self._rid = reader.read_int()
+            self.name = decode_map_string(bytes(reader.read_bytes(24)))
+            self.type = reader.read_char()
+            self.effect = reader.read_char()
+            self.music = reader.read_char()
+            self.music_control = reader.read_char()
+            self.ambient_sound = reader.read_short()
+            self.width = reader.read_char() + 1
+            self.height = reader.read_char() + 1
+            self.fill_tile = reader.read_short()
+            self.map_available = reader.read_char() > 0
+            self.can_scroll = reader.read_char() > 0
+            self.relog_x = reader.read_char()
+            self.relog_y = reader.read_char()
+            reader.skip(1)
+            self.npcs = [EMFNPC(reader.read_char(), reader.read_char(), reader.read_short(), reader.read_char(),
+                                reader.read_short(), reader.read_char()) for _ in range(reader.read_char())]
+            reader.skip(4 * reader.read_char())
+            self.chests = [EMFChest(reader.read_char(), reader.read_char(), reader.read_short(), reader.read_char(),
+                                    reader.read_short(), reader.read_short(), reader.read_three())
+                           for _ in range(reader.read_char())]
+
+            self._layers = {"specs": reader.tell()}
+            EMF.__skip_layer(reader, 2)
+            self.warps = []
+            for _ in range(reader.read_char()):
+                y = reader.read_char()
+                for _ in range(reader.read_char()):
+                    self.warps.append(EMFWarp(reader.read_char(), y, reader.read_short(), reader.read_char(),
+                                              reader.read_char(), reader.read_char(), reader.read_short()))
+            for name in EMF.LAYERS[1:]:
+                self._layers[name] = reader.tell()
+                EMF.__skip_layer(reader, 3)
+
+            self.signs = []
+            for _ in range(reader.read_char() if reader.remaining() else 0):
+                x = reader.read_char()
+                y = reader.read_char()
+                text = decode_map_string(bytes(reader.read_bytes(reader.read_short() - 1)))
+                title_length = reader.read_char()
+                self.signs.append(EMFSign(x, y, text[:title_length], text[title_length:]))
+
+    def write(self, writer: EOWriter, layers: dict[str, dict[int, dict[int, int]]] = None):
+        """
+        :param writer: the writer to append the map file to
+        :param layers: the rows of every layer as returned by layer(), defaults to those of the file the map was read
+            from, or no tiles at all
+        """
+        if layers is None:
+            layers = {name: self.layer(name) for name in EMF.LAYERS} if getattr(self, "_file", None) else {}
+        writer.add_fixed_string("EMF")
+        writer.add_int(getattr(self, "_rid", 0))
+        writer.add_bytes(encode_map_string(self.name, 24))
+        writer.add_char(self.type)
+        writer.add_char(self.effect)
+        writer.add_char(self.music)
+        writer.add_char(self.music_control)
+        writer.add_short(self.ambient_sound)
+        writer.add_char(self.width - 1)
+        writer.add_char(self.height - 1)
+        writer.add_short(self.fill_tile)
+        writer.add_char(int(self.map_available))
+        writer.add_char(int(self.can_scroll))
+        writer.add_char(self.relog_x)
+        writer.add_char(self.relog_y)
+        writer.fill(1)
+        writer.add_char(len(self.npcs))
+        for npc in self.npcs:
+            writer.add_char(npc.x)
+            writer.add_char(npc.y)
+            writer.add_short(npc.id)
+            writer.add_char(npc.spawn_type)
+            writer.add_short(npc.spawn_time)
+            writer.add_char(npc.amount)
+        writer.add_char(0)
+        writer.add_char(len(self.chests))
+        for chest in self.chests:
+            writer.add_char(chest.x)
+            writer.add_char(chest.y)
+            writer.add_short(chest.key)
+            writer.add_char(chest.slot)
+            writer.add_short(chest.item)
+            writer.add_short(chest.spawn_time)
+            writer.add_three(chest.amount)
+
+        EMF.__write_layer(writer, layers.get("specs", {}), writer.add_char)
+        # rows keep the order they were read in, which some shipped maps do not sort by y
+        rows = {}
+        for warp in self.warps:
+            rows.setdefault(warp.y, []).append(warp)
+        writer.add_char(len(rows))
+        for y, warps in rows.items():
+            writer.add_char(y)
+            writer.add_char(len(warps))
+            for warp in warps:
+                writer.add_char(warp.x)
+                writer.add_short(warp.map)
+                writer.add_char(warp.warp_x)
+                writer.add_char(warp.warp_y)
+                writer.add_char(warp.level)
+                writer.add_short(warp.door)
+        for name in EMF.LAYERS[1:]:
+            EMF.__write_layer(writer, layers.get(name, {}), writer.add_short)
+
+        writer.add_char(len(self.signs))
+        for sign in self.signs:
+            text = encode_map_string(sign.title + sign.message)
+            writer.add_char(sign.x)
+            writer.add_char(sign.y)
+            writer.add_short(len(text) + 1)
+            writer.add_bytes(text)
+            writer.add_char(len(sign.title))
+
+    @staticmethod
+    def __write_layer(writer: EOWriter, rows: dict[int, dict[int, int]], write: Callable[[int], None]):
+        """
+        Writes a layer of rows, each a y coordinate and a count followed by that many x coordinates and values, in
+        the order they were read in.
+        """
+        writer.add_char(len(rows))
+        for y, tiles in rows.items():
+            writer.add_char(y)
+            writer.add_char(len(tiles))
+            for x, value in tiles.items():
+                writer.add_char(x)
+                write(value)
+
+    @staticmethod
+    def __skip_layer(reader: EOReader, size: int):
+        """
+        Skips a layer of rows, each a y coordinate and a count followed by that many tiles of size bytes.
+        """
+        for _ in range(reader.read_char()):
+            reader.skip(1)
+            reader.skip(size * reader.read_char())
+
+    def layer(self, name: str) -> dict[int, dict[int, int]]:
+        """
+        Decodes a single layer from a memory-mapped view of the map file.
+        :param name: the name of the layer, one of EMF.LAYERS
+        :return: the tile spec or graphic of every set tile, keyed by y and then x
+        """
+        if name not in self._layers:
+            raise ValueError(name, "is not one of", EMF.LAYERS)
+        with EOReader(self._file, use_mmap=True) as reader:
+            reader.skip(3)
+            if reader.read_int() != self._rid:
+                raise ValueError(self._file, "changed since it was read")
+            reader.seek(self._layers[name])
+            read = reader.read_char if name == "specs" else reader.read_short
+            rows = {}
+            for _ in range(reader.read_char()):
+                y = reader.read_char()
+                rows[y] = {reader.read_char(): read() for _ in range(reader.read_char())}
+            return rows
+
+
+def read_emf(file: str, map_id: int = None) -> EMF:
+    """
+    Reads an Endless Online map file
+    :param file: the path to the emf file
+    :param map_id: the id of the map, defaults to the number in the file name
+    :return: the EMF with its tile spec and graphic layers left to be decoded on demand
+    """
+    with EOReader(file, use_mmap=True) as reader:
+        magic = reader.read_fixed_string(3)
+        if magic != "EMF":
+            raise ValueError(magic, "is not valid", "EMF", "file")
+        reader.seek(0)
+        emf = EMF(reader)
+    emf.id = map_id if map_id is not None else int(os.path.splitext(os.path.basename(file))[0])
+    emf._file = file
+    return emf
+
+
+def write_emf(file: str, emf: EMF, layers: dict[str, dict[int, dict[int, int]]] = None):
+    """
+    Writes an Endless Online map file
+    :param file: the path to the emf file
+    :param emf: the map
+    :param layers: the rows of every layer as returned by EMF.layer(), defaults to those of the file the map was read
+        from
+    """
+    writer = EOWriter()
+    emf.write(writer, layers)
+    writer.save(file)
+
+
+class IniError(ValueError):
+    """An error raised when a line of an EOServ ini file is malformed."""
+
+    def __init__(self, file: str, line: int, message: str):
+        super().__init__("%s:%d: %s" % (file, line, message))
+        self.file = file
+        self.line = line
+
+
+def __read_ini(file: str) -> Iterator[tuple[int, str, str]]:
+    """
+    Reads an EOServ ini file one line at a time.
     :param file: the path to the ini file
-    :return: the key value pairs of the file
+    :return: an iterator of the line number, lowercase key and value of every entry of the file
     """
+    seen = set()
     with open(file, 'r') as f:
-        config_string = '[default]\n' + f.read()
-        config = ConfigParser()
-        config.read_string(config_string)
-        return config.items('default')
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line[0] in '#;':
+                continue
+            key, separator, value = line.partition('=')
+            key = key.strip().lower()
+            if not separator or not key:
+                raise IniError(file, number, "expected key = value")
+            if key in seen:
+                raise IniError(file, number, "duplicate key %s" % key)
+            seen.add(key)
+            yield number, key, value.strip()
+
+
+def __read_values(file: str, number: int, value: str, size: int) -> list[str]:
+    """
+    :param file: the path to the ini file
+    :param number: the line number of the value
+    :param value: a comma separated list of records with size values each
+    :param size: the number of values per record
+    :return: the values of the list
+    """
+    values = value.split(',')
+    if len(values) % size:
+        raise IniError(file, number, "expected groups of %d values, got %d values" % (size, len(values)))
+    return values
+
+
+def __read_ints(file: str, number: int, value: str, size: int) -> list[int]:
+    """
+    :param file: the path to the ini file
+    :param number: the line number of the value
+    :param value: a comma separated list of records with size integers each
+    :param size: the number of integers per record
+    :return: the integers of the list
+    """
+    try:
+        return list(map(int, __read_values(file, number, value, size)))
+    except ValueError as e:
+        if isinstance(e, IniError):
+            raise
+        raise IniError(file, number, str(e))
 
 
-def read_drops(file: str) -> dict:
+def __read_group(file: str, number: int, key: str) -> tuple[int, str]:
+    """
+    :param file: the path to the ini file
+    :param number: the line number of the key
+    :param key: a key such as 3.name
+    :return: the NPC id and the group of the key
+    """
+    npc_id, _, group = key.partition('.')
+    if not npc_id.isdigit() or not group:
+        raise IniError(file, number, "expected a key such as 3.name, got %s" % key)
+    return int(npc_id), group
+
+
+@dataclass
+class Drop:
+    """A class used to represent an item dropped by an NPC."""
+    __slots__ = ("id", "min_amount", "max_amount", "chance")
+    id: int
+    min_amount: int
+    max_amount: int
+    chance: float
+
+
+@dataclass
+class Trade:
+    """A class used to represent an item bought or sold by a shop."""
+    __slots__ = ("id", "buy", "sell")
+    id: int
+    buy: int
+    sell: int
+
+
+@dataclass
+class Ingredient:
+    """A class used to represent an item used to craft another item."""
+    __slots__ = ("id", "amount")
+    id: int
+    amount: int
+
+
+@dataclass
+class Craft:
+    """A class used to represent an item crafted by a shop."""
+    __slots__ = ("id", "ingredients")
+    id: int
+    ingredients: list[Ingredient]
+
+
+@dataclass
+class Shop:
+    """A class used to represent a shop in an EOServ shops.ini file."""
+    __slots__ = ("name", "trade", "craft")
+    name: str
+    trade: list[Trade]
+    craft: list[Craft]
+
+
+@dataclass
+class Skill:
+    """A class used to represent a spell taught by a skill master."""
+    __slots__ = (
+        "id", "cost", "level", "class_id", "spell_req", "str_req", "int_req", "wis_req", "agi_req", "con_req",
+        "cha_req"
+    )
+    id: int
+    cost: int
+    level: int
+    class_id: int
+    spell_req: list[int]
+    str_req: int
+    int_req: int
+    wis_req: int
+    agi_req: int
+    con_req: int
+    cha_req: int
+
+    def serialize(self) -> dict:
+        """
+        :return: a dictionary representing the skill, with the class under the "class" key served by /api/skills
+        """
+        return {
+            "id": self.id,
+            "cost": self.cost,
+            "level": self.level,
+            "class": self.class_id,
+            "str_req": self.str_req,
+            "int_req": self.int_req,
+            "wis_req": self.wis_req,
+            "agi_req": self.agi_req,
+            "con_req": self.con_req,
+            "cha_req": self.cha_req,
+            "spell_req": self.spell_req,
+        }
+
+
+@dataclass
+class SkillMaster:
+    """A class used to represent a skill master in an EOServ skills.ini file."""
+    __slots__ = ("name", "learn")
+    name: str
+    learn: list[Skill]
+
+
+def read_drops(file: str) -> dict[int, list[Drop]]:
     """
     Reads an EOServ drops.ini file
     :param file: the path to the drops.ini file
     :return: a dictionary of the drops.ini file where the keys are the NPC ids and the values are a list of drops
     """
     table = {}
-    entries = __read_ini(file)
-    for key, value in entries:
-        drops = value.split(',')
-        table[key] = []
-        for i in range(0, len(drops), 4):
-            item_id, min_amount, max_amount, chance = tuple(drops[i:i + 4])
-            table[key].append({
-                'id': int(item_id),
-                'min_amount': int(min_amount),
-                'max_amount': int(max_amount),
-                'chance': float(chance)
-            })
+    for number, key, value in __read_ini(file):
+        if key == 'version':
+            continue
+        if not key.isdigit():
+            raise IniError(file, number, "expected an NPC id, got %s" % key)
+        values = __read_values(file, number, value, 4)
+        try:
+            table[int(key)] = [Drop(int(values[i]), int(values[i + 1]), int(values[i + 2]), float(values[i + 3]))
+                               for i in range(0, len(values), 4)]
+        except ValueError as e:
+            raise IniError(file, number, str(e))
     return table
 
 
-def read_shops(file: str) -> dict:
+def read_shops(file: str) -> dict[int, Shop]:
     """
     Reads an EOServ shops.ini file
     :param file: the path to the shops.ini file
-    :return: a dictionary of the shops.ini file where the keys are npc/vendor ids and the values are the associated shop
-    """
-    def parse_name(data: str) -> str:
-        return data
-
-    def parse_trade(data: str) -> list[dict]:
-        trades = []
-        data = data.split(',')
-        for i in range(0, len(data), 3):
-            item_id, buy_price, sell_price = tuple(data[i:i+3])
-            trades.append({
-                'id': int(item_id),
-                'buy': int(buy_price),
-                'sell': int(sell_price),
-            })
-        return trades
-
-    def parse_craft(data: str) -> list[dict]:
-        crafts = []
-        data = data.split(',')
-        for i in range(0, len(data), 9):
-            item_id = data[i]
-            crafts.append({
-                'id': int(item_id),
-                'ingredients': [{
-                    'id': int(data[i+j]),
-                    'amount': int(data[i+j+1])} for j in range(1, 9, 2) if int(data[i+j]) > 0]
-            })
-        return crafts
-
-    read_shops.parsers = {'name': parse_name, 'trade': parse_trade, 'craft': parse_craft}
-
+    :return: a dictionary of the shops.ini file where the keys are vendor ids and the values are the associated shop
+    """
     table = {}
-    entries = __read_ini(file)
-    for key, info in entries:
+    for number, key, value in __read_ini(file):
         if key == 'version':
             continue
-        npc_id, group = key.split('.')
-        if npc_id not in table:
-            table[npc_id] = {}
-        table[npc_id][group] = read_shops.parsers[group](info)
+        vendor_id, group = __read_group(file, number, key)
+        shop = table.get(vendor_id)
+        if shop is None:
+            shop = table[vendor_id] = Shop(None, [], [])
+        if group == 'name':
+            shop.name = value
+        elif group == 'trade':
+            values = __read_ints(file, number, value, 3)
+            shop.trade = [Trade(*values[i:i + 3]) for i in range(0, len(values), 3)]
+        elif group == 'craft':
+            values = __read_ints(file, number, value, 9)
+            shop.craft = [Craft(values[i], [Ingredient(values[i + j], values[i + j + 1])
+                                            for j in range(1, 9, 2) if values[i + j] > 0])
+                          for i in range(0, len(values), 9)]
+        else:
+            raise IniError(file, number, "unknown group %s" % group)
     return table
 
 
-def read_skills(file: str) -> dict:
+def read_skills(file: str) -> dict[int, SkillMaster]:
     """
     Reads an EOServ skills.ini file
     :param file: the path to the skills.ini file
     :return: a dictionary of the skills.ini file where keys are npc ids and the values are the skills offered
     """
-    def _parse_name(data: str) -> str:
-        return data
-
-    def parse_learn(data: str) -> list[dict]:
-        skills = []
-        data = data.split(',')
-        for i in range(0, len(data), 14):
-            spell_id, cost, level, clas = data[i:i+4]
-            stren, intl, wis, agi, con, cha = data[i+8:i+14]
-            skills.append({
-                'id': int(spell_id),
-                'cost': int(cost),
-                'level': int(level),
-                'class': int(clas),
-                'str_req': int(stren),
-                'int_req': int(intl),
-                'wis_req': int(wis),
-                'agi_req': int(agi),
-                'con_req': int(con),
-                'cha_req': int(cha),
-                'spell_req': [int(data[i+j]) for j in range(4, 4, 1) if int(data[i+j]) > 0]
-
-            })
-        return skills
-
-    read_skills.parsers = {'name': _parse_name, 'learn': parse_learn}
-
     table = {}
-    entries = __read_ini(file)
-    for key, info in entries:
+    for number, key, value in __read_ini(file):
         if key == 'version':
             continue
-        npc_id, group = key.split('.')
-        if npc_id not in table:
-            table[npc_id] = {}
-        table[npc_id][group] = read_skills.parsers[group](info)
+        npc_id, group = __read_group(file, number, key)
+        master = table.get(npc_id)
+        if master is None:
+            master = table[npc_id] = SkillMaster(None, [])
+        if group == 'name':
+            master.name = value
+        elif group == 'learn':
+            values = __read_ints(file, number, value, 14)
+            master.learn = [Skill(*values[i:i + 4], [spell for spell in values[i + 4:i + 8] if spell > 0],
+                                  *values[i + 8:i + 14]) for i in range(0, len(values), 14)]
+        else:
+            raise IniError(file, number, "unknown group %s" % group)
     return table
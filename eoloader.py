@@ -0,0 +1,72 @@
+import gc
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Any, Callable
+
+from eocache import DiskCache, PubCache, fingerprint
+
+
+@dataclass
+class LoadResult:
+    """A class used to represent how long a single file took to load, or why it failed to."""
+    file: str
+    seconds: float
+    error: str = None
+
+
+def load_file(file: str, reader: Callable[[str], Any], header: bool = True, disk: DiskCache = None) -> tuple:
+    """
+    Fingerprints and decodes a single file, run in a worker process.
+    :param file: the path to the file
+    :param reader: the function used to decode the file, e.g. eolib.read_eif
+    :param header: whether the file starts with a pub header containing a rid
+    :param disk: the directory of decoded files to load the file from before decoding it (optional)
+    :return: a tuple of the file, its fingerprint and decoded value (or None) and the seconds taken or error
+    """
+    start = time.perf_counter()
+    try:
+        stat, digest, rid = fingerprint(file, header)
+        value = reader(file) if disk is None else disk.read(file, reader, digest)
+    except Exception as e:
+        # a malformed file only fails on its own, and is decoded again when it is first requested
+        return file, None, None, None, None, time.perf_counter() - start, "%s: %s" % (type(e).__name__, e)
+    return file, stat, digest, rid, value, time.perf_counter() - start, None
+
+
+def load(cache: PubCache, files: list[tuple[str, Callable[[str], Any], bool]], processes: int = None,
+         freeze: bool = False) -> list[LoadResult]:
+    """
+    Decodes many files in parallel worker processes and stores them in a cache.
+
+    Decoding is CPU-bound, so the files are spread over a process pool and the decoded values are sent back
+    to this process. When the app is preloaded by a forking server such as Gunicorn (--preload), every worker
+    then shares the decoded values copy-on-write instead of decoding and holding its own copy; freeze moves
+    them out of the reach of the garbage collector, whose bookkeeping would otherwise copy the pages they are on.
+    :param cache: the cache to store the decoded files in
+    :param files: a list of (path, reader, header) tuples, e.g. ("data/pub/dat001.eif", eolib.read_eif, True)
+    :param processes: the number of worker processes, defaults to the number of CPUs
+    :param freeze: whether to freeze every object tracked by the garbage collector once loading is done
+    :return: the load time of every file, in the order given
+    """
+    results = []
+    if not files:
+        return results
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        # sending the decoded files back from a single worker would only add to the load time
+        loaded = [load_file(*i, cache.disk) for i in files]
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            loaded = list(executor.map(load_file, *zip(*files), repeat(cache.disk),
+                                       chunksize=max(1, len(files) // (4 * processes))))
+    for file, stat, digest, rid, value, seconds, error in loaded:
+        if error is None:
+            cache.insert(file, stat, digest, rid, value)
+        results.append(LoadResult(file, seconds, error))
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return results
@@ -0,0 +1,144 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# the upper bounds in seconds of the buckets of every histogram
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# the prefix of the name of every exported metric
+PREFIX = "eoserv_api_"
+
+# the type and help text of every metric, keyed by name without the prefix
+METRICS = {
+    "request_duration_seconds": ("histogram", "Time taken to handle a request."),
+    "requests_total": ("counter", "Requests handled."),
+    "response_bytes_total": ("counter", "Bytes of response bodies served."),
+    "decode_duration_seconds": ("histogram", "Time taken to decode a data file."),
+    "render_duration_seconds": ("histogram", "Time taken to serialize a response body to JSON."),
+}
+
+
+class Histogram:
+    """A class used to represent the number of observations below every bucket bound, and their sum."""
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        i = bisect_left(BUCKETS, value)
+        if i < len(BUCKETS):
+            self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+def labels_text(labels: tuple) -> str:
+    """
+    :param labels: a tuple of (name, value) pairs
+    :return: the labels in the Prometheus text format, e.g. {route="/api/items"}
+    """
+    if not labels:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"')
+                                          .replace("\n", "\\n")) for name, value in labels)
+
+
+def route_label(request) -> str:
+    """
+    :param request: the current request
+    :return: the pattern of the route the request matched, e.g. /api/items/<int:item_id>, so labels stay bounded
+    """
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+class Metrics:
+    """
+    A class used to collect request latencies, counters and parse times and export them in the Prometheus text format.
+
+    Every metric is keyed by name and a tuple of label pairs. Labels should only take a bounded set of values, such
+    as route patterns rather than paths.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        :param name: the name of the histogram, one of METRICS
+        :param value: the value to observe, usually seconds
+        :param labels: the labels of the observation
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        """
+        :param name: the name of the counter, one of METRICS
+        :param amount: the amount to add
+        :param labels: the labels of the counter
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """
+        Observes the seconds taken by the body of a with statement.
+        :param name: the name of the histogram, one of METRICS
+        :param labels: the labels of the observation
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self, samples: list[tuple[str, str, str, tuple, float]] = ()) -> str:
+        """
+        :param samples: extra (name, type, help, labels, value) samples read at scrape time, e.g. from cache counters
+        :return: every metric in the Prometheus text exposition format
+        """
+        with self.lock:
+            histograms = [(key, list(value.counts), value.count, value.sum) for key, value in self.histograms.items()]
+            counters = list(self.counters.items())
+
+        families = {}
+        for (name, labels), counts, count, total in sorted(histograms, key=lambda i: i[0]):
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, counts):
+                cumulative += bucket
+                lines.append("%s%s_bucket%s %d" % (PREFIX, name, labels_text(labels + (("le", repr(bound)),)),
+                                                   cumulative))
+            lines.append("%s%s_bucket%s %d" % (PREFIX, name, labels_text(labels + (("le", "+Inf"),)), count))
+            lines.append("%s%s_sum%s %r" % (PREFIX, name, labels_text(labels), total))
+            lines.append("%s%s_count%s %d" % (PREFIX, name, labels_text(labels), count))
+        for (name, labels), value in sorted(counters):
+            families.setdefault(name, []).append("%s%s%s %r" % (PREFIX, name, labels_text(labels), value))
+
+        descriptions = dict(METRICS)
+        for name, kind, description, labels, value in samples:
+            descriptions.setdefault(name, (kind, description))
+            families.setdefault(name, []).append("%s%s%s %r" % (PREFIX, name, labels_text(labels), value))
+
+        lines = []
+        for name in sorted(families):
+            kind, description = descriptions[name]
+            lines.append("# HELP %s%s %s" % (PREFIX, name, description))
+            lines.append("# TYPE %s%s %s" % (PREFIX, name, kind))
+            lines.extend(families[name])
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
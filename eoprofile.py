@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable
+
+
+def frame_name(frame) -> str:
+    """
+    :param frame: a stack frame
+    :return: the name of the function of the frame and where it is defined, e.g. EIF.__init__ (eolib.py:285)
+    """
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return "%s (%s:%d)" % (name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+def sample(function: Callable[[], Any], n: int = 1, interval: float = 0.001) -> tuple[Counter, float]:
+    """
+    Calls a function n times on a separate thread while sampling the stack of that thread.
+
+    Only the frames below the sampled call are kept, so the stacks start at the function itself.
+    :param function: the function to profile
+    :param n: the number of times to call it
+    :param interval: the number of seconds between samples
+    :return: a tuple of the number of samples of every stack, as tuples of frame names from the outermost call, and
+        the seconds taken by the calls
+    """
+    errors = []
+    elapsed = []
+
+    def run():
+        start = time.perf_counter()
+        try:
+            for _ in range(n):
+                function()
+        except Exception as e:
+            errors.append(e)
+        elapsed.append(time.perf_counter() - start)
+
+    thread = threading.Thread(target=run, name="profile", daemon=True)
+    stacks = Counter()
+    thread.start()
+    while thread.is_alive():
+        frame = sys._current_frames().get(thread.ident)
+        names = []
+        while frame is not None and frame.f_code is not run.__code__:
+            names.append(frame_name(frame))
+            frame = frame.f_back
+        if frame is not None and names:
+            stacks[tuple(reversed(names))] += 1
+        time.sleep(interval)
+    thread.join()
+    if errors:
+        raise errors[0]
+    return stacks, elapsed[0]
+
+
+def folded(stacks: Counter) -> str:
+    """
+    :param stacks: the number of samples of every stack, as returned by sample
+    :return: the stacks in the folded format read by flamegraph.pl and speedscope, one "a;b;c count" line per stack
+    """
+    return "".join("%s %d\n" % (";".join(stack), count) for stack, count in stacks.most_common())
@@ -0,0 +1,168 @@
+import operator
+from enum import Enum
+from typing import Any, Iterable, Mapping
+
+from eoindex import PubIndex
+
+OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "in": lambda value, values: value in values,
+    "contains": lambda value, text: text in value.lower(),
+    "iexact": lambda value, text: text == value.lower(),
+    "prefix": lambda value, text: value.lower().startswith(text),
+}
+
+# operators which compare text case-insensitively
+TEXT_OPERATORS = {"contains", "iexact", "prefix"}
+
+# query arguments which are not filters
+RESERVED = {"offset", "limit", "fields"}
+
+
+class QueryError(ValueError):
+    """An error raised when the arguments of a query are invalid."""
+    pass
+
+
+def parse_value(field: str, sample: Any, text: str) -> Any:
+    """
+    Converts a query argument to the type of the field it is compared with.
+    :param field: the name of the field
+    :param sample: a value of the field used to determine its type
+    :param text: the query argument
+    :return: the converted query argument
+    """
+    try:
+        if isinstance(sample, Enum):
+            if text.isdigit():
+                return type(sample)(int(text))
+            return type(sample)[text]
+        if isinstance(sample, bool):
+            if text.lower() not in ("true", "false", "1", "0"):
+                raise ValueError(text)
+            return text.lower() in ("true", "1")
+        if isinstance(sample, int):
+            return int(text)
+        if isinstance(sample, float):
+            return float(text)
+        return text
+    except (KeyError, ValueError):
+        raise QueryError("invalid value for %s: %s" % (field, text))
+
+
+def parse_filters(fields: Iterable[str], sample: Any, args: Mapping[str, str]) -> list[tuple[str, str, Any]]:
+    """
+    Parses filters such as type=Weapon or level_requirement__lte=10 from query arguments.
+    :param fields: the names of the fields which can be filtered on
+    :param sample: an entry used to determine the type of each field
+    :param args: the query arguments
+    :return: a list of (field, operator name, value) filters
+    """
+    filters = []
+    for key, text in args.items():
+        if key in RESERVED:
+            continue
+        field, _, name = key.partition("__")
+        name = name or "eq"
+        if field not in fields:
+            raise QueryError("unknown field: %s" % field)
+        if name not in OPERATORS:
+            raise QueryError("unknown operator: %s" % name)
+        value = getattr(sample, field)
+        if name == "in":
+            text = {parse_value(field, value, i) for i in text.split(",")}
+        elif name in TEXT_OPERATORS:
+            if not isinstance(value, str):
+                raise QueryError("%s can not be used on %s" % (name, field))
+            text = text.lower()
+        else:
+            text = parse_value(field, value, text)
+        filters.append((field, name, text))
+    return filters
+
+
+def parse_int(args: Mapping[str, str], key: str, default: int = None) -> int:
+    """
+    :param args: the query arguments
+    :param key: the name of the argument
+    :param default: the value to use if the argument is not given
+    :return: the non-negative integer value of the argument
+    """
+    text = args.get(key)
+    if text is None:
+        return default
+    if not text.isdigit():
+        raise QueryError("%s must be a non-negative integer" % key)
+    return int(text)
+
+
+def parse_fields(fields: Iterable[str], args: Mapping[str, str]) -> list[str]:
+    """
+    :param fields: the names of the fields which can be projected
+    :param args: the query arguments
+    :return: the names of the requested fields, or None if all fields were requested
+    """
+    text = args.get("fields")
+    if not text:
+        return None
+    requested = text.split(",")
+    for field in requested:
+        if field not in fields:
+            raise QueryError("unknown field: %s" % field)
+    return requested
+
+
+def select(entries: list, filters: list[tuple[str, str, Any]], index: PubIndex = None) -> list:
+    """
+    Finds the entries matching every filter, narrowing them down through the index where possible.
+    :param entries: the entries to filter, ordered by id
+    :param filters: the (field, operator name, value) filters to apply
+    :param index: the index of the entries (optional)
+    :return: the matching entries, ordered by id
+    """
+    if index is not None:
+        candidates = None
+        remaining = []
+        for field, name, value in filters:
+            ids = index.lookup(field, name, value)
+            if ids is None:
+                remaining.append((field, name, value))
+            else:
+                candidates = set(ids) if candidates is None else candidates.intersection(ids)
+        if candidates is not None:
+            entries = [entries[entry_id - 1] for entry_id in sorted(candidates)]
+            filters = remaining
+
+    checks = [(field, OPERATORS[name], value) for field, name, value in filters]
+    if not checks:
+        return entries
+    return [entry for entry in entries if all(op(getattr(entry, field), value) for field, op, value in checks)]
+
+
+def query(entries: list, fields: Iterable[str], args: Mapping[str, str], index: PubIndex = None) -> dict:
+    """
+    Filters, paginates and projects a list of pub entries.
+    :param entries: the entries to query, ordered by id
+    :param fields: the names of the fields of each entry
+    :param args: the query arguments, e.g. offset, limit, fields and filters such as type=Weapon
+    :param index: the index of the entries, used to avoid scanning every entry (optional)
+    :return: a dictionary of the total number of matches and the requested page of results
+    """
+    fields = set(fields)
+    offset = parse_int(args, "offset", 0)
+    limit = parse_int(args, "limit")
+    projection = parse_fields(fields, args)
+    filters = parse_filters(fields, entries[0], args) if entries else []
+
+    if filters:
+        entries = select(entries, filters, index)
+    total = len(entries)
+    entries = entries[offset:] if limit is None else entries[offset:offset + limit]
+    if projection:
+        entries = [{field: getattr(entry, field) for field in projection} for entry in entries]
+    return {"total": total, "results": entries}
@@ -0,0 +1,177 @@
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+from flask import Flask
+from sqlalchemy import create_engine
+
+from eodatabase import create_indexes, db
+
+# the tables served by the API, every other table is dropped from the replica
+TABLES = ("characters", "guilds")
+
+
+class Replica:
+    """
+    A class used to represent a local, read-optimized snapshot of the characters and guilds of an EOServ database.
+
+    Snapshots are copied with the SQLite online backup API a few pages at a time, so the game server can keep
+    writing while a copy is in progress, then trimmed to the tables the API serves, indexed and analyzed.
+    A finished snapshot is renamed over the replica file and the connection pool is disposed, so readers
+    always see one complete snapshot and move to the new one on their next checkout.
+
+    Several processes, such as the workers of a forking server, can serve the same replica directory. Only the
+    process holding the lock file of the directory takes snapshots; the others follow the replica file and dispose
+    their own pools whenever a new snapshot is renamed in, and one of them takes over if the owner exits.
+    """
+
+    def __init__(self, source: str, directory: str, pages: int = 256, pause: float = 0.005):
+        """
+        :param source: the path of the live EOServ database
+        :param directory: the directory the replica is kept in
+        :param pages: the number of pages copied per backup step
+        :param pause: the number of seconds to yield to the game server between backup steps
+        """
+        self.source = os.path.abspath(source)
+        self.path = os.path.abspath(os.path.join(directory, "replica.sdb"))
+        self.pages = pages
+        self.pause = pause
+        self.taken = None
+        self.version = None
+        self.lock_file = None
+        self.stopped = threading.Event()
+
+    def acquire(self) -> bool:
+        """
+        :return: whether this process holds the lock of the replica directory and takes the snapshots
+        """
+        if self.lock_file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            lock_file = open(self.path + ".lock", "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self.lock_file = lock_file
+        return True
+
+    def __stat(self) -> tuple[int, int]:
+        result = os.stat(self.path)
+        return result.st_ino, result.st_mtime_ns
+
+    def follow(self, app: Flask):
+        """
+        Moves to the snapshot another process renamed over the replica file, if there is a new one.
+        :param app: the app reading from the replica
+        """
+        try:
+            version = self.__stat()
+        except FileNotFoundError:
+            return
+        if version != self.version:
+            self.version = version
+            self.taken = version[1] / 1e9
+            with app.app_context():
+                db.get_engine(app).dispose()
+
+    def copy(self) -> str:
+        """
+        Copies the live database into a new, read-optimized snapshot file.
+        :return: the path of the snapshot
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        path = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            source = sqlite3.connect("file:%s?mode=ro" % urllib.parse.quote(self.source), uri=True)
+            target = sqlite3.connect(path, isolation_level=None)
+            try:
+                source.backup(target, pages=self.pages, sleep=self.pause)
+                tables = [name for name, in target.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+                for table in tables:
+                    if table not in TABLES and not table.startswith("sqlite_"):
+                        target.execute('DROP TABLE "%s"' % table)
+            finally:
+                source.close()
+                target.close()
+
+            engine = create_engine("sqlite:///" + path)
+            try:
+                create_indexes(engine)
+            finally:
+                engine.dispose()
+
+            target = sqlite3.connect(path, isolation_level=None)
+            try:
+                target.execute("ANALYZE")
+                target.execute("VACUUM")
+                target.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                target.close()
+        except Exception:
+            # a failed snapshot must not leave its partial copy behind
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return path
+
+    def snapshot(self, app: Flask):
+        """
+        Takes a new snapshot and swaps it in for the current one.
+        :param app: the app reading from the replica
+        """
+        path = self.copy()
+        taken = time.time()
+        try:
+            os.replace(path, self.path)
+            self.version = self.__stat()
+        except OSError:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        self.taken = taken
+        with app.app_context():
+            db.get_engine(app).dispose()
+
+    def age(self) -> float:
+        """
+        :return: the number of seconds since the current snapshot was copied, or None before the first snapshot
+        """
+        return time.time() - self.taken if self.taken is not None else None
+
+    def start(self, app: Flask, interval: float = 30.0, wait: float = 60.0) -> threading.Thread:
+        """
+        Keeps the replica up to date in a background thread. The process holding the lock of the replica directory
+        takes the first snapshot and then a new one every interval, while every other process waits for a replica
+        file to exist and then follows it. A failed snapshot is logged and the previous one is served until the
+        next attempt succeeds.
+        :param app: the app reading from the replica
+        :param interval: the number of seconds between snapshots
+        :param wait: the number of seconds a following process waits for the first snapshot
+        :return: the snapshot thread
+        """
+        def run():
+            # followers check for a new snapshot more often than they are taken, so they move to it soon after
+            while not self.stopped.wait(interval if self.lock_file is not None else min(interval, 1.0)):
+                try:
+                    if self.acquire():
+                        self.snapshot(app)
+                    else:
+                        self.follow(app)
+                except Exception:
+                    # whatever failed, e.g. sqlite3, SQLAlchemy or the rename, the thread must keep taking snapshots
+                    app.logger.exception("failed to take a snapshot of %s", self.source)
+
+        if self.acquire():
+            self.snapshot(app)
+        else:
+            deadline = time.monotonic() + wait
+            while not os.path.exists(self.path) and time.monotonic() < deadline and not self.stopped.wait(0.1):
+                pass
+            self.follow(app)
+        thread = threading.Thread(target=run, name="replica", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,103 @@
+import os
+import threading
+from typing import Any, Callable
+
+from flask import Flask
+
+from eocache import PubCache
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+
+class Watcher:
+    """
+    A class used to reload the files of a PubCache in the background as soon as they change.
+
+    The watched files are served from the cache without being checked on every request. Changes are picked up
+    through inotify (or the native equivalent) when watchdog is installed, and by polling the mtime and size
+    of every file otherwise. Only the changed file is decoded again, and a file which fails to decode, e.g.
+    because it is still being written, keeps serving its previous version until the next change.
+
+    Only the files given when the watcher is created are watched. Files added later, such as a new map, are not
+    watched but are still loaded on their first request and checked for changes on every request after it.
+    """
+
+    def __init__(self, cache: PubCache, files: list[tuple[str, Callable[[str], Any], bool]], interval: float = 2.0):
+        """
+        :param cache: the cache holding the files
+        :param files: a list of (path, reader, header) tuples, e.g. ("data/pub/dat001.eif", eolib.read_eif, True)
+        :param interval: the number of seconds between polls when watchdog is not installed
+        """
+        self.cache = cache
+        self.files = {os.path.abspath(file): (file, reader, header) for file, reader, header in files}
+        self.interval = interval
+        self.backend = None
+        self.observer = None
+        self.logger = None
+        self.stopped = threading.Event()
+
+    def refresh(self, path: str):
+        """
+        :param path: the absolute path of a changed file
+        """
+        file, reader, header = self.files[path]
+        try:
+            self.cache.refresh(file, reader, header)
+        except Exception:
+            # any decode error must leave the previous version served and the watcher running
+            self.logger.exception("failed to reload %s", file)
+
+    def start(self, app: Flask):
+        """
+        Loads every file and starts watching them for changes.
+        :param app: the app serving the files, whose logger reports files which fail to reload
+        """
+        self.logger = app.logger
+        for path in self.files:
+            self.refresh(path)
+            self.cache.watch(self.files[path][0])
+
+        if Observer is not None:
+            handler = _ChangeHandler(self)
+            self.observer = Observer()
+            for directory in {os.path.dirname(path) for path in self.files}:
+                self.observer.schedule(handler, directory, recursive=False)
+            try:
+                self.observer.start()
+                self.backend = "watchdog"
+                return
+            except OSError:
+                self.logger.exception("failed to watch files, polling them instead")
+                self.observer = None
+
+        def run():
+            while not self.stopped.wait(self.interval):
+                for path in self.files:
+                    self.refresh(path)
+
+        threading.Thread(target=run, name="watcher", daemon=True).start()
+        self.backend = "polling"
+
+    def stop(self):
+        self.stopped.set()
+        if self.observer is not None:
+            self.observer.stop()
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """A watchdog event handler refreshing the watched files an event touches."""
+
+    def __init__(self, watcher: Watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if path and os.path.abspath(path) in self.watcher.files:
+                self.watcher.refresh(os.path.abspath(path))
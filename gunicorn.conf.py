@@ -0,0 +1,14 @@
+"""
+The Gunicorn configuration of the WSGI entry point, read from the working directory by default:
+
+    EOSERV_API_ARGS="--readonly --pool-size 4" gunicorn --workers 4 wsgi:app
+"""
+
+# decode the data files once in the master so the workers share them, see wsgi.py
+preload_app = True
+
+
+def post_fork(server, worker):
+    import wsgi
+
+    wsgi.post_fork()
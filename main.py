@@ -1,95 +1,685 @@
+import dataclasses
+import eodrops
+import eohttp
+import eojson
 import eolib
+import eoloader
+import eoprofile
+import eoquery
+import hashlib
+import hmac
+import math
+import os
+import time
 
-from argparse import ArgumentParser
-from eodatabase import Character, Guild, db
+from argparse import ArgumentParser, Namespace
+from eocache import CacheEntry, DiskCache, JoinCache, PubCache, TTLCache
+from eodatabase import ROSTER_SORTS, Character, Guild, character_listeners, configure_sqlite, create_indexes, \
+    database_metrics, db, guild_roster, journal_mode
+from eoindex import PubIndex
+from eojoin import CrossReference
+from eoleaderboard import STATS, Leaderboards
+from eometrics import metrics, route_label
+from eoreplica import Replica
+from eowatch import Watcher
 
+from flask import Response, g, request
 from flask_api import FlaskAPI, exceptions
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import OperationalError
+
+
+class ServiceUnavailable(exceptions.APIException):
+    status_code = 503
+    detail = 'The database is busy, try again shortly.'
+
 
 app = FlaskAPI(__name__)
+app.config['DEFAULT_RENDERERS'] = ['eojson.FastJSONRenderer', 'flask_api.renderers.BrowsableAPIRenderer']
+pubs = PubCache()
+pubs.decode_listeners.append(lambda file, reader, seconds: metrics.observe("decode_duration_seconds", seconds,
+                                                                           reader=reader.__name__))
+characters = TTLCache()
+character_listeners.append(characters.invalidate)
+leaderboards = Leaderboards()
+cross_references = JoinCache(CrossReference)
+replica = None
+watcher = None
+preloaded = []
+# the ASGI wrapper serving the app, whose request counters are exported by /metrics, set by asgi.py
+server = None
 
 
-@app.route('/api/classes', methods=['GET'])
-def classes():
+def load_entry(key: str, reader, header: bool = True) -> CacheEntry:
+    """
+    :param key: the config key of the file path
+    :param reader: the function used to decode the file
+    :param header: whether the file starts with a pub header containing a rid
+    :return: the cache entry of the current version of the file
+    """
     try:
-        return {"results": eolib.read_ecf(app.config['ECF'])}
+        return pubs.entry(app.config[key], reader, header)
     except FileNotFoundError:
         raise exceptions.NotFound
 
 
-@app.route('/api/items', methods=['GET'])
-def items():
+def conditional(entry: CacheEntry, build, key: str):
+    """
+    Builds a response from a cached file, honoring If-None-Match and reusing the rendered body of
+    requests without arguments, which are served precompressed. The browsable API and every content
+    coding get their own strong ETag, and every response varies on Accept.
+    :param entry: the cache entry of the file the response is built from
+    :param build: the function used to build the response data from the decoded file
+    :param key: the normalized resource the response is built for, e.g. an id or a lowercase name, whose rendered
+        body is kept in the bounded response cache of the entry
+    :return: the response
+    """
+    etag = entry.etag
+    if request.args:
+        etag += "-" + hashlib.sha1(request.query_string).hexdigest()[:16]
+    if request.args or not eohttp.accepts_json(request):
+        etag = eohttp.representation_etag(etag, request)
+        if request.if_none_match.contains(etag):
+            return eohttp.not_modified(etag)
+        return build(entry.value), {"ETag": '"%s"' % etag, "Vary": "Accept"}
+
+    coded = eohttp.coded_etag(etag, eohttp.content_coding(request))
+    if request.if_none_match.contains(coded):
+        return eohttp.not_modified(coded, ("Accept", "Accept-Encoding"))
+    responses = entry.derive("responses", lambda value: TTLCache(app.config.get('RESPONSE_CACHE_SIZE', 256),
+                                                                 math.inf))
+    rendered = responses.get(key)
+    if rendered is None:
+        with entry.lock:
+            # requests racing on the same body wait for a single render
+            rendered = responses.get(key)
+            if rendered is None:
+                with metrics.timer("render_duration_seconds", route=route_label(request)):
+                    rendered = eohttp.render(build(entry.value), eojson.app_serializer(), etag)
+                responses.put(key, rendered)
+    return eohttp.respond(rendered, request)
+
+
+def query_pub(key: str, reader, pub: type):
+    """
+    Filters, paginates and projects the entries of a pub file using the request arguments.
+    :param key: the config key of the pub file path
+    :param reader: the function used to decode the pub file
+    :param pub: the class of the pub entries
+    :return: the response
+    """
+    entry = load_entry(key, reader)
+
+    def build(entries: list) -> dict:
+        try:
+            return eoquery.query(entries, pub.__slots__, request.args, index_pub(entry, pub))
+        except eoquery.QueryError as e:
+            raise exceptions.ParseError(str(e))
+
+    return conditional(entry, build, "list")
+
+
+def index_pub(entry: CacheEntry, pub: type) -> PubIndex:
+    """
+    :param entry: the cache entry of the pub file
+    :param pub: the class of the pub entries
+    :return: the index of the pub entries
+    """
+    return entry.derive("index", lambda entries: PubIndex(entries, pub.__slots__))
+
+
+def named_pub_entries(key: str, reader, pub: type, name: str):
+    """
+    :param key: the config key of the pub file path
+    :param reader: the function used to decode the pub file
+    :param pub: the class of the pub entries
+    :param name: the name of the entries to find, ignoring case
+    :return: the response
+    """
+    entry = load_entry(key, reader)
+    ids = index_pub(entry, pub).named(name)
+    if not ids:
+        raise exceptions.NotFound
+    return conditional(entry, lambda entries: {"results": [entries[entry_id - 1] for entry_id in ids]},
+                       "name:" + name.lower())
+
+
+def pub_entry(key: str, reader, pub: type, entry_id: int):
+    """
+    :param key: the config key of the pub file path
+    :param reader: the function used to decode the pub file
+    :param pub: the class of the pub entries
+    :param entry_id: the id of the entry
+    :return: the response
+    """
+    entry = load_entry(key, reader)
+    if not 1 <= entry_id <= len(entry.value):
+        raise exceptions.NotFound
     try:
-        return {"results": eolib.read_eif(app.config['EIF'])}
-    except FileNotFoundError:
+        fields = eoquery.parse_fields(pub.__slots__, request.args) or pub.__slots__
+    except eoquery.QueryError as e:
+        raise exceptions.ParseError(str(e))
+    return conditional(entry, lambda entries: {field: getattr(entries[entry_id - 1], field) for field in fields},
+                       "id:%d" % entry_id)
+
+
+def cross_reference() -> CacheEntry:
+    """
+    :return: the cache entry of the index joining the drops, shops and skills with the pub files, rebuilt only when
+        one of them changed
+    """
+    return cross_references.entry([
+        load_entry('EIF', eolib.read_eif),
+        load_entry('ENF', eolib.read_enf),
+        load_entry('ESF', eolib.read_esf),
+        load_entry('ECF', eolib.read_ecf),
+        load_entry('DROPS', eolib.read_drops, header=False),
+        load_entry('SHOPS', eolib.read_shops, header=False),
+        load_entry('SKILLS', eolib.read_skills, header=False),
+    ])
+
+
+def joined_entry(pub: str, entry_id: int, name: str, build):
+    """
+    :param pub: the name of the entries of the cross reference the entry is one of, e.g. items
+    :param entry_id: the id of the entry
+    :param name: the name of the joined values in the response
+    :param build: the function used to find the joined values of the entry in the cross reference
+    :return: the response
+    """
+    entry = cross_reference()
+    if not 1 <= entry_id <= len(getattr(entry.value, pub)):
         raise exceptions.NotFound
+    return conditional(entry, lambda index: {"id": entry_id, "name": getattr(index, pub)[entry_id - 1].name,
+                                             name: build(index)}, "%s:%s:%d" % (pub, name, entry_id))
+
+
+@app.route('/api/classes', methods=['GET'])
+def classes():
+    return query_pub('ECF', eolib.read_ecf, eolib.ECF)
+
+
+@app.route('/api/classes/<int:class_id>', methods=['GET'])
+def class_entry(class_id):
+    return pub_entry('ECF', eolib.read_ecf, eolib.ECF, class_id)
+
+
+@app.route('/api/classes/by-name/<name>', methods=['GET'])
+def class_by_name(name):
+    return named_pub_entries('ECF', eolib.read_ecf, eolib.ECF, name)
+
+
+@app.route('/api/items', methods=['GET'])
+def items():
+    return query_pub('EIF', eolib.read_eif, eolib.EIF)
+
+
+@app.route('/api/items/<int:item_id>', methods=['GET'])
+def item(item_id):
+    return pub_entry('EIF', eolib.read_eif, eolib.EIF, item_id)
+
+
+@app.route('/api/items/by-name/<name>', methods=['GET'])
+def item_by_name(name):
+    return named_pub_entries('EIF', eolib.read_eif, eolib.EIF, name)
+
+
+@app.route('/api/items/<int:item_id>/sources', methods=['GET'])
+def item_sources(item_id):
+    return joined_entry('items', item_id, 'sources', lambda index: index.sources(item_id))
 
 
 @app.route('/api/spells', methods=['GET'])
 def spells():
-    try:
-        return {"results": eolib.read_esf(app.config['ESF'])}
-    except FileNotFoundError:
-        raise exceptions.NotFound
+    return query_pub('ESF', eolib.read_esf, eolib.ESF)
+
+
+@app.route('/api/spells/<int:spell_id>', methods=['GET'])
+def spell(spell_id):
+    return pub_entry('ESF', eolib.read_esf, eolib.ESF, spell_id)
+
+
+@app.route('/api/spells/by-name/<name>', methods=['GET'])
+def spell_by_name(name):
+    return named_pub_entries('ESF', eolib.read_esf, eolib.ESF, name)
+
+
+@app.route('/api/spells/<int:spell_id>/trainers', methods=['GET'])
+def spell_trainers(spell_id):
+    return joined_entry('spells', spell_id, 'trainers', lambda index: index.trainers(spell_id))
 
 
 @app.route('/api/npcs', methods=['GET'])
 def npcs():
+    return query_pub('ENF', eolib.read_enf, eolib.ENF)
+
+
+@app.route('/api/npcs/<int:npc_id>', methods=['GET'])
+def npc(npc_id):
+    return pub_entry('ENF', eolib.read_enf, eolib.ENF, npc_id)
+
+
+@app.route('/api/npcs/by-name/<name>', methods=['GET'])
+def npc_by_name(name):
+    return named_pub_entries('ENF', eolib.read_enf, eolib.ENF, name)
+
+
+# the fields of a map which can be filtered on and projected
+MAP_FIELDS = [field.name for field in dataclasses.fields(eolib.EMF)]
+
+
+def map_files() -> dict[int, str]:
+    """
+    :return: the paths of the map files keyed by map id, read from the names of the files such as 00005.emf
+    """
+    directory = app.config['MAPS']
+    files = {}
+    for name in os.listdir(directory):
+        stem, extension = os.path.splitext(name)
+        if extension == '.emf' and stem.isdigit():
+            files[int(stem)] = os.path.join(directory, name)
+    return files
+
+
+@app.route('/api/maps', methods=['GET'])
+def maps():
+    entries = [pubs.entry(path, eolib.read_emf) for _, path in sorted(map_files().items())]
+    etag = hashlib.sha1(b"".join(entry.etag.encode() for entry in entries) + request.query_string).hexdigest()
+    etag = eohttp.representation_etag(etag, request)
+    if request.if_none_match.contains(etag):
+        return eohttp.not_modified(etag)
     try:
-        return {"results": eolib.read_enf(app.config['ENF'])}
-    except FileNotFoundError:
+        result = eoquery.query([entry.value for entry in entries], MAP_FIELDS, request.args)
+    except eoquery.QueryError as e:
+        raise exceptions.ParseError(str(e))
+    return result, {"ETag": '"%s"' % etag, "Vary": "Accept"}
+
+
+@app.route('/api/maps/<int:map_id>', methods=['GET'])
+def map_entry(map_id):
+    path = map_files().get(map_id)
+    if path is None:
+        raise exceptions.NotFound
+    entry = pubs.entry(path, eolib.read_emf)
+    layers = [name for name in request.args.get('layers', '').split(',') if name]
+    for name in layers:
+        if name not in eolib.EMF.LAYERS:
+            raise exceptions.ParseError('layers must be a list of: %s' % ', '.join(eolib.EMF.LAYERS))
+    try:
+        fields = eoquery.parse_fields(MAP_FIELDS, request.args) or MAP_FIELDS
+    except eoquery.QueryError as e:
+        raise exceptions.ParseError(str(e))
+
+    def build(emf: eolib.EMF) -> dict:
+        result = {field: getattr(emf, field) for field in fields}
+        if layers:
+            result["layers"] = {name: entry.derive("layer:" + name, lambda value: value.layer(name)) for name in layers}
+        return result
+
+    return conditional(entry, build, "map")
+
+
+@app.route('/api/npcs/<int:npc_id>/drops', methods=['GET'])
+def npc_drops(npc_id):
+    return joined_entry('npcs', npc_id, 'drops', lambda index: index.drops(npc_id))
+
+
+@app.route('/api/meta/cache', methods=['GET'])
+def cache_stats():
+    return {
+        "pubs": pubs.stats(),
+        "characters": characters.stats(),
+        "cross_reference_builds": cross_references.builds,
+        "preload": preloaded,
+    }
+
+
+@app.route('/api/meta/versions', methods=['GET'])
+def versions():
+    return {
+        "watcher": watcher.backend if watcher is not None else None,
+        "files": pubs.versions(),
+    }
+
+
+@app.route('/api/meta/database', methods=['GET'])
+def database_stats():
+    pool = db.engine.pool
+    return {
+        "journal_mode": journal_mode(),
+        "pool": pool.status(),
+        "timings": database_metrics.stats(),
+        "replica_age": replica.age() if replica is not None else None,
+    }
+
+
+@app.after_request
+def replica_age(response):
+    if replica is not None and replica.taken is not None:
+        response.headers['X-Replica-Age'] = '%d' % replica.age()
+    return response
+
+
+@app.errorhandler(OperationalError)
+def database_busy(error):
+    if 'locked' in str(error.orig) or 'busy' in str(error.orig):
+        return app.handle_api_exception(ServiceUnavailable())
+    raise error
+
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    route = route_label(request)
+    if 'request_start' in g:
+        metrics.observe("request_duration_seconds", time.perf_counter() - g.request_start, route=route,
+                        method=request.method)
+    metrics.increment("requests_total", route=route, method=request.method, status=response.status_code)
+    if not response.is_streamed:
+        metrics.increment("response_bytes_total", response.calculate_content_length() or 0, route=route)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    samples = []
+    pub_stats = pubs.stats()
+    character_stats = characters.stats()
+    for cache, stats, results in (("pubs", pub_stats, ("hits", "misses", "reloads")),
+                                  ("characters", character_stats, ("hits", "misses"))):
+        for result in results:
+            samples.append(("cache_lookups_total", "counter", "Cache lookups by result.",
+                            (("cache", cache), ("result", result)), stats[result]))
+    samples.append(("cache_entries", "gauge", "Entries held by a cache.", (("cache", "pubs"),), pub_stats["files"]))
+    samples.append(("cache_entries", "gauge", "Entries held by a cache.", (("cache", "characters"),),
+                    character_stats["size"]))
+    samples.append(("cross_reference_builds_total", "counter", "Builds of the cross reference index.", (),
+                    cross_references.builds))
+    for timing, stats in database_metrics.stats().items():
+        samples.append(("database_seconds_total", "counter", "Seconds spent in database queries or waiting for a "
+                        "pooled connection.", (("timing", timing),), stats["seconds"]))
+        samples.append(("database_operations_total", "counter", "Database queries run or pooled connections "
+                        "checked out.", (("timing", timing),), stats["count"]))
+    if server is not None:
+        stats = server.stats()
+        samples.append(("asgi_requests_active", "gauge", "Requests handled or waiting for a thread.", (),
+                        stats["active"]))
+        for result in ("handled", "rejected"):
+            samples.append(("asgi_requests_total", "counter", "Requests answered by the ASGI server, handled or rejected as busy.",
+                            (("result", result),), stats[result]))
+    return Response(metrics.render(samples), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# the readers of the data files which can be profiled, keyed by config key
+PROFILE_FILES = {
+    'ECF': eolib.read_ecf,
+    'EIF': eolib.read_eif,
+    'ESF': eolib.read_esf,
+    'ENF': eolib.read_enf,
+    'DROPS': eolib.read_drops,
+    'SKILLS': eolib.read_skills,
+    'SHOPS': eolib.read_shops,
+}
+
+
+@app.route('/api/debug/profile', methods=['GET'])
+def debug_profile():
+    token = app.config.get('PROFILE_TOKEN')
+    if not token:
         raise exceptions.NotFound
+    if not hmac.compare_digest(request.headers.get('X-Profile-Token', '').encode(), token.encode()):
+        raise exceptions.PermissionDenied
+    try:
+        n = eoquery.parse_int(request.args, 'n', 10)
+        interval = eoquery.parse_int(request.args, 'interval', 1)
+    except eoquery.QueryError as e:
+        raise exceptions.ParseError(str(e))
+    if not 1 <= n <= app.config.get('PROFILE_LIMIT', 1000) or interval < 1:
+        raise exceptions.ParseError('n must be between 1 and %d and interval positive'
+                                    % app.config.get('PROFILE_LIMIT', 1000))
+
+    route = request.args.get('route')
+    file = request.args.get('file', '').upper()
+    if route:
+        path, _, query = route.partition('?')
+        if not path.startswith('/api/') or path.startswith('/api/debug/'):
+            raise exceptions.ParseError('route must be the path of an API endpoint, e.g. /api/items/1')
+
+        def run():
+            # responses of requests without arguments are rendered once and then served from the cache entry
+            with app.test_request_context(path, query_string=query, headers={'Accept': 'application/json'}):
+                app.full_dispatch_request().get_data()
+    elif file in PROFILE_FILES:
+        reader = PROFILE_FILES[file]
+
+        def run():
+            reader(app.config[file])
+    else:
+        raise exceptions.ParseError('expected a route or a file, one of: %s' % ', '.join(PROFILE_FILES))
+
+    stacks, seconds = eoprofile.sample(run, n, interval / 1000)
+    return Response(eoprofile.folded(stacks), mimetype='text/plain',
+                    headers={'X-Profile-Seconds': '%.6f' % seconds, 'X-Profile-Samples': str(sum(stacks.values()))})
 
 
 @app.route('/api/drops', methods=['GET'])
 def drops():
+    return conditional(load_entry('DROPS', eolib.read_drops, header=False), lambda table: table, "table")
+
+
+def drop_rate_arguments() -> tuple[int, float]:
+    """
+    :return: the drop rate mode and multiplier of a drop simulation, from the request or the server configuration
+    """
     try:
-        return eolib.read_drops(app.config['DROPS'])
-    except FileNotFoundError:
+        mode = eoquery.parse_int(request.args, 'mode', app.config.get('DROP_RATE_MODE', 3))
+    except eoquery.QueryError as e:
+        raise exceptions.ParseError(str(e))
+    if mode not in eodrops.DROP_RATE_MODES:
+        raise exceptions.ParseError('mode must be one of: %s' % ', '.join(map(str, eodrops.DROP_RATE_MODES)))
+    try:
+        rate = float(request.args.get('rate', app.config.get('DROP_RATE', 1.0)))
+    except ValueError:
+        raise exceptions.ParseError('rate must be a number')
+    if not 0 <= rate <= 1000:
+        raise exceptions.ParseError('rate must be between 0 and 1000')
+    return mode, rate
+
+
+@app.route('/api/drops/<int:npc_id>/simulate', methods=['GET'])
+def simulate_drops(npc_id):
+    table = load_entry('DROPS', eolib.read_drops, header=False).value
+    if npc_id not in table:
         raise exceptions.NotFound
+    mode, rate = drop_rate_arguments()
+    try:
+        kills = eoquery.parse_int(request.args, 'kills', 100000)
+        seed = eoquery.parse_int(request.args, 'seed')
+    except eoquery.QueryError as e:
+        raise exceptions.ParseError(str(e))
+    limit = app.config.get('SIMULATION_LIMIT', 10000000)
+    if kills > limit:
+        raise exceptions.ParseError('at most %d kills can be simulated at once' % limit)
+
+    items = load_entry('EIF', eolib.read_eif).value
+    npcs = load_entry('ENF', eolib.read_enf).value
+    result = eodrops.simulate(table[npc_id], kills, mode, rate, seed)
+    for drop in result["drops"]:
+        drop["name"] = items[drop["id"] - 1].name if 1 <= drop["id"] <= len(items) else None
+    result["npc"] = {"id": npc_id, "name": npcs[npc_id - 1].name if 1 <= npc_id <= len(npcs) else None}
+    return result
+
+
+@app.route('/api/drops/ranking', methods=['GET'])
+def drop_ranking():
+    mode, rate = drop_rate_arguments()
+    sort = request.args.get('sort', 'value')
+    if sort not in eodrops.RANKING_SORTS:
+        raise exceptions.ParseError('sort must be one of: %s' % ', '.join(eodrops.RANKING_SORTS))
+    try:
+        offset = eoquery.parse_int(request.args, 'offset', 0)
+        limit = min(eoquery.parse_int(request.args, 'limit', 100), app.config.get('RANKING_LIMIT', 1000))
+    except eoquery.QueryError as e:
+        raise exceptions.ParseError(str(e))
+
+    entry = cross_reference()
+    index = entry.value
+    rankings = entry.derive("rankings", lambda value: TTLCache(app.config.get('RANKING_CACHE_SIZE', 16), math.inf))
+    ranking = rankings.get((mode, rate))
+    if ranking is None:
+        values = entry.derive("item_values", lambda value: eodrops.item_values(value.shop_table))
+        ranking = eodrops.rank(index.drop_table, index.npcs, values, mode, rate)
+        rankings.put((mode, rate), ranking)
+    if sort != 'value':
+        ranking = sorted(ranking, key=lambda npc: npc[sort] if npc[sort] is not None else -1, reverse=True)
+    return {"total": len(ranking), "mode": mode, "rate": rate, "results": ranking[offset:offset + limit]}
 
 
 @app.route('/api/skills', methods=['GET'])
 def skills():
-    try:
-        return eolib.read_skills(app.config['SKILLS'])
-    except FileNotFoundError:
-        raise exceptions.NotFound
+    return conditional(load_entry('SKILLS', eolib.read_skills, header=False), lambda table: {
+        npc_id: {"name": master.name, "learn": [skill.serialize() for skill in master.learn]}
+        for npc_id, master in table.items()}, "table")
 
 
 @app.route('/api/shops', methods=['GET'])
 def shops():
-    try:
-        return eolib.read_shops(app.config['SHOPS'])
-    except FileNotFoundError:
-        raise exceptions.NotFound
+    return conditional(load_entry('SHOPS', eolib.read_shops, header=False), lambda table: table, "table")
+
+
+def batch_keys(key: str) -> list[str]:
+    """
+    Reads the keys of a batch lookup from either a JSON body such as {"names": [...]} or a comma separated
+    query argument such as ?names=a,b,c.
+    :param key: the name of the list in the body or query
+    :return: the requested keys without duplicates, in request order
+    """
+    if request.method == 'POST':
+        keys = request.data.get(key) if isinstance(request.data, dict) else None
+        if not isinstance(keys, list) or not all(isinstance(i, str) for i in keys):
+            raise exceptions.ParseError('expected a JSON body with a list of strings named "%s"' % key)
+    else:
+        keys = [i for i in request.args.get(key, '').split(',') if i]
+    keys = list(dict.fromkeys(keys))
+    limit = app.config.get('BATCH_LIMIT', 100)
+    if len(keys) > limit:
+        raise exceptions.ParseError('at most %d %s can be requested at once' % (limit, key))
+    return keys
+
+
+def lookup_characters(names: list[str]) -> dict:
+    """
+    Finds many characters, serving cached characters first and resolving the rest with a single IN query.
+    :param names: the names of the characters
+    :return: a dictionary of the serialized characters keyed by lowercase name
+    """
+    found = {}
+    missing = []
+    for name in map(str.lower, names):
+        serialized = characters.get(name)
+        if serialized is None:
+            missing.append(name)
+        else:
+            found[name] = serialized
+    if missing:
+        for result in Character.query.filter(Character.name.in_(missing)):
+            found[result.name] = result.serialize()
+            characters.put(result.name, found[result.name])
+    return found
 
 
 @app.route('/api/characters/<name>', methods=['GET'])
 def character(name):
-    result = Character.query.filter(Character.name == name.lower()).one_or_none()
-    if result is None:
+    result = lookup_characters([name])
+    if not result:
         raise exceptions.NotFound
-    return result.serialize()
+    return result[name.lower()]
+
+
+@app.route('/api/characters', methods=['GET'])
+@app.route('/api/characters:batch', methods=['POST'])
+def character_batch():
+    names = [name.lower() for name in batch_keys('names')]
+    found = lookup_characters(names)
+    return {"results": found, "missing": [name for name in names if name not in found]}
 
 
 @app.route('/api/guilds/<tag>', methods=['GET'])
 def guild(tag):
-    result = Guild.query.filter(Guild.name == tag).one_or_none()
+    result = Guild.query.filter(Guild.tag == tag).one_or_none()
     if result is None:
         raise exceptions.NotFound
     return result.serialize()
 
 
+@app.route('/api/guilds', methods=['GET'])
+@app.route('/api/guilds:batch', methods=['POST'])
+def guild_batch():
+    tags = batch_keys('tags')
+    found = {result.tag: result.serialize() for result in Guild.query.filter(Guild.tag.in_(tags))} if tags else {}
+    return {"results": found, "missing": [tag for tag in tags if tag not in found]}
+
+
 @app.route('/api/guilds/<tag>/characters', methods=['GET'])
 def guild_members(tag):
-    result = Guild.query.filter(Guild.tag == tag).one_or_none()
+    sort = request.args.get('sort', 'level')
+    if sort not in ROSTER_SORTS:
+        raise exceptions.ParseError('sort must be one of: %s' % ', '.join(ROSTER_SORTS))
+    try:
+        limit = min(eoquery.parse_int(request.args, 'limit', 100), app.config.get('ROSTER_LIMIT', 500))
+    except eoquery.QueryError as e:
+        raise exceptions.ParseError(str(e))
+    if limit < 1:
+        raise exceptions.ParseError('limit must be positive')
+    after = request.args.get('after')
+    if after is not None:
+        value, _, name = after.partition(',')
+        if not value.lstrip('-').isdigit() or not name:
+            raise exceptions.ParseError('after must be a cursor returned as "next" by a previous page')
+        after = (int(value), name)
+
+    members = guild_roster(tag, sort, after, limit)
+    if not members and after is None and Guild.query.filter(Guild.tag == tag).count() == 0:
+        raise exceptions.NotFound
+    cursor = None
+    if len(members) == limit:
+        last = members[-1]
+        cursor = '%d,%s' % (last['level'] if sort == 'level' else last['guild_rank_id'] or 0, last['name'])
+    return {"members": members, "next": cursor}
+
+
+@app.route('/api/leaderboards/<stat>', methods=['GET'])
+def leaderboard(stat):
+    if stat not in STATS:
+        raise exceptions.NotFound
+    try:
+        offset = eoquery.parse_int(request.args, 'offset', 0)
+        limit = min(eoquery.parse_int(request.args, 'limit', 100), app.config.get('LEADERBOARD_LIMIT', 1000))
+        class_id = eoquery.parse_int(request.args, 'class')
+    except eoquery.QueryError as e:
+        raise exceptions.ParseError(str(e))
+    return leaderboards.top(stat, offset, limit, request.args.get('guild'), class_id)
+
+
+@app.route('/api/leaderboards/<stat>/<name>', methods=['GET'])
+def leaderboard_rank(stat, name):
+    if stat not in STATS:
+        raise exceptions.NotFound
+    result = leaderboards.rank(stat, name.lower())
     if result is None:
         raise exceptions.NotFound
-    result = Character.query.filter(Character.guild == result.guild)
-    return {"members": [i.serialize for i in result]}
+    return result
 
 
-if __name__ == '__main__':
+def parse_arguments(argv: list[str] = None) -> Namespace:
+    """
+    :param argv: the command line arguments, defaults to those of the process
+    :return: the parsed arguments
+    """
     parser = ArgumentParser(description="EOServ REST API")
     parser.add_argument("--ecf", help="path to EIF pub")
     parser.add_argument("--eif", help="path to EIF pub")
@@ -98,9 +688,56 @@ if __name__ == '__main__':
     parser.add_argument("--drops", help="path to shops config")
     parser.add_argument("--skills", help="path to skills config")
     parser.add_argument("--shops", help="path to shops config")
+    parser.add_argument("--maps", help="path to maps directory")
     parser.add_argument("--database", help="database location")
-    args = parser.parse_args()
+    parser.add_argument("--readonly", action="store_true",
+                        help="read the sqlite database through a pool of tuned read-only connections")
+    parser.add_argument("--pool-size", type=int, default=8, help="number of read-only database connections")
+    parser.add_argument("--mmap-size", type=int, default=256 << 20, help="bytes of the database to memory-map")
+    parser.add_argument("--cache-size", type=int, default=16 << 20, help="bytes of page cache per connection")
+    parser.add_argument("--busy-timeout", type=int, default=250,
+                        help="milliseconds a read waits while the game server is writing")
+    parser.add_argument("--replica", help="directory of a local snapshot of the database to serve reads from")
+    parser.add_argument("--replica-interval", type=float, default=30.0, help="seconds between database snapshots")
+    parser.add_argument("--create-indexes", action="store_true", help="create missing indexes used by the API")
+    parser.add_argument("--leaderboard-interval", type=float, default=60.0,
+                        help="seconds between leaderboard refreshes")
+    parser.add_argument("--character-cache-size", type=int, help="number of serialized characters to cache")
+    parser.add_argument("--character-cache-ttl", type=float, help="seconds a serialized character is cached for")
+    parser.add_argument("--response-cache-size", type=int, default=256,
+                        help="number of rendered response bodies to cache per data file")
+    parser.add_argument("--preload", action="store_true", help="decode every pub, ini and map file at startup")
+    parser.add_argument("--drop-rate-mode", type=int, default=3, choices=sorted(eodrops.DROP_RATE_MODES),
+                        help="DropRateMode of the EOServ server, used by drop simulations")
+    parser.add_argument("--drop-rate", type=float, default=1.0, help="DropRate of the EOServ server")
+    parser.add_argument("--watch", action="store_true",
+                        help="reload changed data files in the background instead of checking them on every request")
+    parser.add_argument("--watch-interval", type=float, default=2.0,
+                        help="seconds between checks for changed files when watchdog is not installed")
+    parser.add_argument("--decode-cache", default=".eocache",
+                        help="directory of decoded files kept between restarts, empty to disable")
+    parser.add_argument("--preload-processes", type=int, help="number of processes decoding files at startup")
+    parser.add_argument("--profile-token",
+                        help="token required in the X-Profile-Token header of /api/debug/profile, disabled without one")
+    parser.add_argument("--threads", type=int, default=8, help="number of threads handling requests of the ASGI app")
+    parser.add_argument("--concurrency", type=int, default=64,
+                        help="number of requests the ASGI app handles or queues at once before answering 503")
+    args = parser.parse_args(argv)
+    if args.readonly and args.create_indexes:
+        parser.error("--create-indexes can not be used with --readonly")
+    if args.replica and args.create_indexes:
+        parser.error("--create-indexes can not be used with --replica, snapshots are always indexed")
+    if args.threads < 1 or args.concurrency < args.threads:
+        parser.error("--threads must be positive and --concurrency at least --threads")
+    return args
 
+
+def configure(args: Namespace):
+    """
+    Configures the app and its database from parsed command line arguments.
+    :param args: the parsed arguments
+    """
+    global replica
     app.config['ECF'] = args.ecf if args.ecf else "data/pub/dat001.ecf"
     app.config['EIF'] = args.eif if args.eif else "data/pub/dat001.eif"
     app.config['ESF'] = args.esf if args.esf else "data/pub/dsl001.esf"
@@ -108,7 +745,88 @@ if __name__ == '__main__':
     app.config['DROPS'] = args.drops if args.drops else "data/drops.ini"
     app.config['SKILLS'] = args.skills if args.skills else "data/skills.ini"
     app.config['SHOPS'] = args.shops if args.shops else "data/shops.ini"
+    app.config['MAPS'] = args.maps if args.maps else "data/maps"
+    app.config['DROP_RATE_MODE'] = args.drop_rate_mode
+    app.config['DROP_RATE'] = args.drop_rate
+    app.config['PROFILE_TOKEN'] = args.profile_token
+    app.config['RESPONSE_CACHE_SIZE'] = args.response_cache_size
+    pubs.disk = DiskCache(args.decode_cache) if args.decode_cache else None
     app.config['SQLALCHEMY_DATABASE_URI'] = args.database if args.database else 'sqlite:///database.sdb'
+    if args.replica:
+        replica = Replica(make_url(app.config['SQLALCHEMY_DATABASE_URI']).database, args.replica)
+        configure_sqlite(app, replica.path, args.pool_size,
+                         mmap_size=args.mmap_size, cache_size=args.cache_size, busy_timeout=args.busy_timeout)
+    elif args.readonly:
+        configure_sqlite(app, make_url(app.config['SQLALCHEMY_DATABASE_URI']).database, args.pool_size,
+                         mmap_size=args.mmap_size, cache_size=args.cache_size, busy_timeout=args.busy_timeout)
+
+    characters.size = args.character_cache_size if args.character_cache_size is not None else characters.size
+    characters.ttl = args.character_cache_ttl if args.character_cache_ttl is not None else characters.ttl
 
     db.init_app(app)
+    if args.create_indexes:
+        with app.app_context():
+            create_indexes()
+
+
+def data_files() -> list[tuple]:
+    """
+    :return: a (path, reader, header) tuple for every configured pub, ini and map file
+    """
+    files = [(app.config[key], reader, True) for key, reader in
+             (('ECF', eolib.read_ecf), ('EIF', eolib.read_eif), ('ESF', eolib.read_esf), ('ENF', eolib.read_enf))]
+    files += [(app.config[key], reader, False) for key, reader in
+              (('DROPS', eolib.read_drops), ('SKILLS', eolib.read_skills), ('SHOPS', eolib.read_shops))]
+    files += [(path, eolib.read_emf, True) for _, path in sorted(map_files().items())]
+    return files
+
+
+def preload(processes: int = None, freeze: bool = False) -> list[eoloader.LoadResult]:
+    """
+    Decodes every configured pub, ini and map file in parallel so no request has to wait for one.
+    :param processes: the number of worker processes, defaults to the number of CPUs
+    :param freeze: whether to freeze the loaded files for sharing with forked workers, see eoloader.load
+    :return: the load time of every file
+    """
+    results = eoloader.load(pubs, data_files(), processes, freeze)
+    preloaded[:] = results
+    for result in results:
+        if result.error is None:
+            app.logger.info("loaded %s in %.1f ms", result.file, result.seconds * 1000)
+        else:
+            app.logger.warning("failed to load %s, it is decoded when first requested: %s", result.file, result.error)
+    return results
+
+
+def start(args: Namespace):
+    """
+    Starts the background threads keeping the data files, replica and leaderboards up to date.
+    :param args: the parsed arguments
+    """
+    global watcher
+    if args.watch:
+        watcher = Watcher(pubs, data_files(), args.watch_interval)
+        watcher.start(app)
+    if replica is not None:
+        replica.start(app, args.replica_interval)
+    leaderboards.start(app, args.leaderboard_interval)
+
+
+def stop():
+    """
+    Stops the background threads started by start.
+    """
+    if watcher is not None:
+        watcher.stop()
+    if replica is not None:
+        replica.stopped.set()
+    leaderboards.stopped.set()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    configure(args)
+    if args.preload:
+        preload(args.preload_processes)
+    start(args)
     app.run(debug=True)
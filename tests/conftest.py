@@ -0,0 +1,34 @@
+import os
+import random
+
+import pytest
+
+import main
+from bench import synthetic
+
+# the directory of the repository, whose data directory holds the pub, ini and map files shipped with the API
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROOT, "data")
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """
+    The app serving the shipped data files and a synthetic database of random characters and guilds, configured
+    once since the database can only be bound to the app once.
+    """
+    directory = tmp_path_factory.mktemp("database")
+    database, _, _ = synthetic.write_database(str(directory / "database.sdb"), os.path.join(ROOT, "database.sdb"),
+                                              300, 10, 100, 50, random.Random(1))
+    options = ["--decode-cache", "", "--database", "sqlite:///" + database, "--maps", os.path.join(DATA, "maps")]
+    for key, name in (("eif", "pub/dat001.eif"), ("enf", "pub/dtn001.enf"), ("esf", "pub/dsl001.esf"),
+                      ("ecf", "pub/dat001.ecf"), ("drops", "drops.ini"), ("shops", "shops.ini"),
+                      ("skills", "skills.ini")):
+        options += ["--" + key, os.path.join(DATA, name)]
+    main.configure(main.parse_arguments(options))
+    return main.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,73 @@
+import gzip
+import os
+import shutil
+
+import pytest
+
+import eohttp
+import eolib
+import main
+from conftest import DATA
+from eocache import PubCache
+
+
+def etag(response) -> str:
+    return response.get_etag()[0]
+
+
+def test_etag_and_not_modified(client):
+    response = client.get("/api/items/1")
+    tag = etag(response)
+
+    assert response.status_code == 200
+    assert {"Accept", "Accept-Encoding"} <= set(response.vary)
+    cached = client.get("/api/items/1", headers={"If-None-Match": '"%s"' % tag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert etag(cached) == tag
+    assert client.get("/api/items/1", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_etag_is_the_file_version(app, client):
+    assert etag(client.get("/api/items/1")) == main.pubs.entry(app.config["EIF"], eolib.read_eif).etag
+
+
+@pytest.mark.parametrize("coding", ["gzip", "br"])
+def test_serves_precompressed_bodies(client, coding):
+    if coding not in eohttp.CODINGS:
+        pytest.skip("%s is not supported without its optional dependency" % coding)
+    identity = client.get("/api/items/1", headers={"Accept-Encoding": "identity"})
+    coded = client.get("/api/items/1", headers={"Accept-Encoding": coding})
+
+    assert coded.content_encoding == coding
+    assert etag(coded) == eohttp.coded_etag(etag(identity), coding) != etag(identity)
+    decompress = gzip.decompress if coding == "gzip" else pytest.importorskip("brotli").decompress
+    assert decompress(coded.data) == identity.data
+    # a body of another coding never satisfies the validator of this one
+    assert client.get("/api/items/1", headers={"Accept-Encoding": coding,
+                                               "If-None-Match": '"%s"' % etag(identity)}).status_code == 200
+    assert client.get("/api/items/1", headers={"Accept-Encoding": coding,
+                                               "If-None-Match": '"%s"' % etag(coded)}).status_code == 304
+
+
+def test_representations_are_tagged_apart(client):
+    json = client.get("/api/items/1", headers={"Accept-Encoding": "identity"})
+    html = client.get("/api/items/1", headers={"Accept": "text/html"})
+    projected = client.get("/api/items/1?fields=name")
+
+    assert len({etag(json), etag(html), etag(projected)}) == 3
+    assert etag(html) == etag(json) + "-html"
+    assert client.get("/api/items/1?fields=name",
+                      headers={"If-None-Match": '"%s"' % etag(projected)}).status_code == 304
+    assert client.get("/api/items/1", headers={"Accept": "text/html",
+                                               "If-None-Match": '"%s"' % etag(json)}).status_code == 200
+
+
+def test_etag_changes_with_the_file(tmp_path):
+    file = str(tmp_path / "dat001.ecf")
+    shutil.copy(os.path.join(DATA, "pub", "dat001.ecf"), file)
+    cache = PubCache()
+    before = cache.entry(file, eolib.read_ecf).etag
+    eolib.write_ecf(file, eolib.read_ecf(file)[:-1])
+
+    assert cache.entry(file, eolib.read_ecf).etag != before
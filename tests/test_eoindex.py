@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+import eolib
+import eoquery
+from conftest import DATA
+from eoindex import PubIndex
+from eolib import EIF
+
+ITEMS = eolib.read_eif(os.path.join(DATA, "pub", "dat001.eif"))
+INDEX = PubIndex(ITEMS, EIF.__slots__)
+
+
+@pytest.mark.parametrize("query", [
+    {"type": "Weapon"},
+    {"type__in": "Hat,Boots,Ring"},
+    {"level_requirement__lte": "10"},
+    {"weight__gt": "50", "type": "Armor"},
+    {"name__prefix": "s"},
+    {"name__iexact": "GOLD"},
+    {"special__ne": "Lore"},
+])
+def test_index_agrees_with_a_scan(query):
+    filters = eoquery.parse_filters(EIF.__slots__, ITEMS[0], query)
+
+    assert eoquery.select(ITEMS, filters, INDEX) == eoquery.select(ITEMS, filters)
+
+
+def test_named_ignores_case():
+    name = ITEMS[0].name
+
+    assert INDEX.named(name.upper()) == [item.id for item in ITEMS if item.name.lower() == name.lower()]
+    assert INDEX.named("no such item") == []
+
+
+def test_prefixed_returns_ids_in_name_order():
+    ids = INDEX.prefixed("Go")
+
+    assert sorted(ids) == sorted(item.id for item in ITEMS if item.name.lower().startswith("go"))
+    assert [ITEMS[i - 1].name.lower() for i in ids] == sorted(ITEMS[i - 1].name.lower() for i in ids)
+
+
+def test_between_honors_bounds():
+    assert set(INDEX.between("weight", 10, 20, low_inclusive=False)) == {item.id for item in ITEMS
+                                                                          if 10 < item.weight <= 20}
+
+
+def test_lookup_leaves_unindexed_filters_to_a_scan():
+    assert INDEX.lookup("name", "contains", "sword") is None
+    assert INDEX.lookup("type", "ne", eolib.EIFType.Weapon) is None
+
+
+def test_by_name_endpoint(client):
+    name = ITEMS[0].name
+    result = client.get("/api/items/by-name/%s" % name.swapcase()).json
+
+    assert [item["id"] for item in result["results"]] == INDEX.named(name)
+    assert client.get("/api/items/by-name/no such item").status_code == 404
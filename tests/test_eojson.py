@@ -0,0 +1,66 @@
+import dataclasses
+import json
+import os
+from enum import Enum
+
+import pytest
+
+import eolib
+from conftest import DATA
+from eojson import JSONSerializer
+
+PUBS = {
+    "items": eolib.read_eif(os.path.join(DATA, "pub", "dat001.eif")),
+    "npcs": eolib.read_enf(os.path.join(DATA, "pub", "dtn001.enf")),
+    "spells": eolib.read_esf(os.path.join(DATA, "pub", "dsl001.esf")),
+    "classes": eolib.read_ecf(os.path.join(DATA, "pub", "dat001.ecf")),
+}
+
+
+def plain(data, enums: str = "value"):
+    """
+    :param data: the data to convert
+    :param enums: whether enum fields are converted to their integer value or their member name
+    :return: the data with every record and enum converted field by field, for the json module to serialize
+    """
+    if isinstance(data, Enum):
+        return data.value if enums == "value" else data.name
+    if dataclasses.is_dataclass(data):
+        return {field.name: plain(getattr(data, field.name), enums) for field in dataclasses.fields(data)}
+    if isinstance(data, dict):
+        return {str(key): plain(value, enums) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [plain(value, enums) for value in data]
+    return data
+
+
+@pytest.mark.parametrize("backend", ["plans", "orjson"])
+@pytest.mark.parametrize("pub", sorted(PUBS))
+def test_records_match_the_plain_serializer(backend, pub):
+    if backend == "orjson":
+        pytest.importorskip("orjson")
+    entries = PUBS[pub]
+
+    assert json.loads(JSONSerializer("value", backend).dumps({"results": entries})) == {"results": plain(entries)}
+
+
+@pytest.mark.parametrize("pub", sorted(PUBS))
+def test_enum_names_match_the_plain_serializer(pub):
+    entries = PUBS[pub]
+
+    assert json.loads(JSONSerializer("name", "plans").dumps(entries)) == plain(entries, "name")
+
+
+def test_nested_records_and_scalars_match_the_plain_serializer():
+    data = {
+        1: eolib.read_shops(os.path.join(DATA, "shops.ini")),
+        "drops": eolib.read_drops(os.path.join(DATA, "drops.ini")),
+        "mixed": [PUBS["items"][0], PUBS["npcs"][0], None, True, 0.25, "quote \" and é"],
+        "empty": [],
+    }
+
+    assert json.loads(JSONSerializer("value", "plans").dumps(data)) == plain(data)
+
+
+def test_app_renders_through_the_serializer(client):
+    assert client.get("/api/npcs").json == {"total": len(PUBS["npcs"]), "results": plain(PUBS["npcs"])}
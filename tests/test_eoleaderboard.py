@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.engine.url import make_url
+
+import main
+from eoleaderboard import STATS, Leaderboards, Ranking
+
+
+def rankings(leaderboards: Leaderboards) -> dict:
+    """
+    :param leaderboards: the leaderboards
+    :return: the sorted keys of every ranking holding at least one character
+    """
+    return {key: list(ranking.keys) for key, ranking in leaderboards.rankings.items() if ranking.keys}
+
+
+def built(app) -> Leaderboards:
+    leaderboards = Leaderboards()
+    with app.app_context():
+        leaderboards.refresh()
+    return leaderboards
+
+
+@pytest.fixture
+def database(app):
+    connection = sqlite3.connect(make_url(app.config["SQLALCHEMY_DATABASE_URI"]).database)
+    yield connection
+    connection.close()
+
+
+def change_characters(connection: sqlite3.Connection, newcomer: str):
+    """
+    Levels up a few characters, moves one to another guild, deletes one and creates another.
+    """
+    names = [name for name, in connection.execute("SELECT name FROM characters ORDER BY name LIMIT 4")]
+    connection.execute("UPDATE characters SET level = level + 7, exp = exp + 5000, karma = karma + 1 "
+                       "WHERE name IN (?, ?)", names[:2])
+    connection.execute("UPDATE characters SET usage = usage + 1, guild = (SELECT tag FROM guilds LIMIT 1), "
+                       "goldbank = goldbank * 2 WHERE name = ?", (names[2],))
+    connection.execute("DELETE FROM characters WHERE name = ?", (names[3],))
+    columns = [column for _, column, *_ in connection.execute("PRAGMA table_info(characters)")]
+    connection.execute("INSERT INTO characters (%s) SELECT %s FROM characters WHERE name = ?" % (
+        ", ".join(columns), ", ".join("?" if column == "name" else column for column in columns)),
+        (newcomer, names[0]))
+    connection.commit()
+
+
+@pytest.mark.parametrize("chunk", [500, 2])
+def test_refresh_matches_a_rebuild(app, database, chunk):
+    leaderboards = built(app)
+    change_characters(database, "newcomer%d" % chunk)
+    with app.app_context():
+        leaderboards.refresh(chunk)
+    rebuilt = built(app)
+
+    assert leaderboards.rows == rebuilt.rows
+    assert rankings(leaderboards) == rankings(rebuilt)
+
+
+def test_rank_is_the_position_in_the_ranking(app):
+    leaderboards = built(app)
+    for stat in STATS:
+        top = leaderboards.top(stat, limit=len(leaderboards.rows))["results"]
+        assert [entry["rank"] for entry in top] == list(range(1, len(top) + 1))
+        assert [entry["value"] for entry in top] == sorted((entry["value"] for entry in top), reverse=True)
+        for entry in top[::37]:
+            result = leaderboards.rank(stat, entry["name"])
+            assert (result["rank"], result["value"]) == (entry["rank"], entry["value"])
+            if "guild_rank" in result:
+                guild = leaderboards.rows[entry["name"]][2].strip()
+                members = leaderboards.top(stat, limit=len(leaderboards.rows), guild=guild)["results"]
+                assert members[result["guild_rank"] - 1]["name"] == entry["name"]
+
+
+def test_ranking_keeps_ties_in_name_order():
+    ranking = Ranking()
+    ranking.extend([("bob", 5), ("amy", 5), ("cat", 9)])
+    ranking.add("abe", 5)
+    ranking.remove("bob", 5)
+
+    assert ranking.top(0, 10) == [(9, "cat"), (5, "abe"), (5, "amy")]
+    assert ranking.rank("amy", 5) == 3
+
+
+def test_leaderboard_endpoints(app, client):
+    with app.app_context():
+        main.leaderboards.refresh()
+    top = client.get("/api/leaderboards/level?limit=5").json
+    name = top["results"][0]["name"]
+
+    assert top == main.leaderboards.top("level", limit=5)
+    assert client.get("/api/leaderboards/level/%s" % name.upper()).json["rank"] == 1
+    assert client.get("/api/leaderboards/level/nobody").status_code == 404
+    assert client.get("/api/leaderboards/height").status_code == 404
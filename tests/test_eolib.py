@@ -0,0 +1,120 @@
+import os
+import random
+
+import pytest
+
+import eogen
+import eolib
+from eolib import EMF, EOReader, EOWriter
+
+# the directory of the pub and map files shipped with the API
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+PUBS = [
+    ("dat001.eif", eolib.read_eif, eolib.write_eif),
+    ("dtn001.enf", eolib.read_enf, eolib.write_enf),
+    ("dsl001.esf", eolib.read_esf, eolib.write_esf),
+    ("dat001.ecf", eolib.read_ecf, eolib.write_ecf),
+]
+
+# the shipped maps named after their id, the others are variants such as 00005christmas.emf
+MAPS = sorted(name for name in os.listdir(os.path.join(DATA, "maps"))
+              if name.endswith(".emf") and name[:-4].isdigit())
+
+
+def read_number(data: bytes) -> int:
+    """
+    :param data: the encoded bytes
+    :return: the value EOReader decodes from the bytes
+    """
+    reader = EOReader(data=data)
+    return (reader.read_char, reader.read_short, reader.read_three, reader.read_int)[len(data) - 1]()
+
+
+def layers(emf: EMF) -> dict:
+    """
+    :param emf: a map read from a file
+    :return: the rows of every layer of the map
+    """
+    return {name: emf.layer(name) for name in EMF.LAYERS}
+
+
+@pytest.mark.parametrize("size, values", [
+    (1, (0, 1, 252)),
+    (2, (0, 252, 253, 64008)),
+    (3, (0, 252, 253, 64008, 64009, 16194276)),
+    (4, (0, 252, 253, 64008, 64009, 16194276, 16194277, EOWriter.MAX[4])),
+])
+def test_encode_number_round_trips_at_byte_boundaries(size, values):
+    for value in values:
+        assert read_number(EOWriter.encode_number(value, size)) == value
+
+
+@pytest.mark.parametrize("value, encoded", [
+    (252, b"\xfd\xfe\xfe\xfe"),
+    (253, b"\x01\x02\xfe\xfe"),
+    (64008, b"\xfd\xfd\xfe\xfe"),
+    (64009, b"\x01\x01\x02\xfe"),
+    (16194276, b"\xfd\xfd\xfd\xfe"),
+    (16194277, b"\x01\x01\x01\x02"),
+])
+def test_encode_number_pads_unused_bytes(value, encoded):
+    assert EOWriter.encode_number(value) == encoded
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 4])
+def test_encode_number_rejects_values_too_large(size):
+    with pytest.raises(ValueError):
+        EOWriter.encode_number(EOWriter.MAX[size] + 1, size)
+
+
+@pytest.mark.parametrize("name, reader, writer", PUBS)
+def test_shipped_pubs_round_trip(tmp_path, name, reader, writer):
+    file = os.path.join(DATA, "pub", name)
+    entries = reader(file)
+    copy = str(tmp_path / name)
+    writer(copy, entries, eolib.read_pub_header(file)[1])
+
+    assert reader(copy) == entries
+    assert eolib.read_pub_header(copy) == eolib.read_pub_header(file)
+
+
+@pytest.mark.parametrize("name", MAPS)
+def test_shipped_maps_round_trip(tmp_path, name):
+    emf = eolib.read_emf(os.path.join(DATA, "maps", name))
+    copy = str(tmp_path / name)
+    eolib.write_emf(copy, emf)
+    rewritten = eolib.read_emf(copy)
+
+    assert rewritten == emf
+    assert layers(rewritten) == layers(emf)
+
+
+def test_shipped_maps_are_all_tested():
+    assert len(MAPS) == 293
+
+
+@pytest.mark.parametrize("pub, reader, writer", [
+    (eolib.EIF, eolib.read_eif, eolib.write_eif),
+    (eolib.ENF, eolib.read_enf, eolib.write_enf),
+    (eolib.ESF, eolib.read_esf, eolib.write_esf),
+    (eolib.ECF, eolib.read_ecf, eolib.write_ecf),
+])
+def test_generated_pubs_decode_to_their_entries(tmp_path, pub, reader, writer):
+    entries = eogen.entries(pub, 500, random.Random(1))
+    file = str(tmp_path / "generated")
+    rid = writer(file, entries)
+
+    assert reader(file) == entries
+    assert eolib.read_pub_header(file)[1:] == (rid, len(entries) + 1)
+
+
+@pytest.mark.parametrize("width, height", [(1, 1), (40, 25), (eogen.CHAR_MAX, eogen.CHAR_MAX)])
+def test_generated_maps_decode_to_their_contents(tmp_path, width, height):
+    emf, rows = eogen.game_map(7, width, height, random.Random(width), npcs=100, items=100, maps=10)
+    file = str(tmp_path / "00007.emf")
+    eolib.write_emf(file, emf, rows)
+    decoded = eolib.read_emf(file)
+
+    assert decoded == emf
+    assert layers(decoded) == {name: rows.get(name, {}) for name in EMF.LAYERS}
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import eolib
+from conftest import DATA
+from eolib import EIFType
+
+ITEMS = eolib.read_eif(os.path.join(DATA, "pub", "dat001.eif"))
+
+
+def test_filters_by_enum_name_and_value(client):
+    weapons = [item.id for item in ITEMS if item.type == EIFType.Weapon]
+    by_name = client.get("/api/items?type=Weapon").json
+    by_value = client.get("/api/items?type=%d" % EIFType.Weapon).json
+
+    assert by_name["total"] == len(weapons) > 0
+    assert [item["id"] for item in by_name["results"]] == weapons
+    assert by_value == by_name
+
+
+def test_filters_by_range_and_text(client):
+    expected = [item.id for item in ITEMS if 1 <= item.level_requirement < 20 and "a" in item.name.lower()]
+    result = client.get("/api/items?level_requirement__gte=1&level_requirement__lt=20&name__contains=A").json
+
+    assert [item["id"] for item in result["results"]] == expected
+    assert 0 < len(expected) < len([item for item in ITEMS if 1 <= item.level_requirement < 20])
+
+
+def test_filters_by_set(client):
+    types = {EIFType.Hat, EIFType.Boots}
+    result = client.get("/api/items?type__in=Hat,Boots&limit=1000").json
+
+    assert [item["id"] for item in result["results"]] == [item.id for item in ITEMS if item.type in types]
+
+
+def test_paginates_after_filtering(client):
+    everything = client.get("/api/items?type=Armor").json
+    page = client.get("/api/items?type=Armor&offset=2&limit=3").json
+
+    assert page["total"] == everything["total"]
+    assert page["results"] == everything["results"][2:5]
+
+
+def test_projects_fields(client):
+    result = client.get("/api/items?fields=id,name&limit=5").json
+
+    assert result["results"] == [{"id": item.id, "name": item.name} for item in ITEMS[:5]]
+    assert client.get("/api/items/1?fields=name,weight").json == {"name": ITEMS[0].name, "weight": ITEMS[0].weight}
+
+
+@pytest.mark.parametrize("query", ["colour=red", "type__like=Weapon", "type=Sword", "limit=-1", "fields=id,colour",
+                                   "name__gt=a&level_requirement__contains=1"])
+def test_rejects_invalid_queries(client, query):
+    assert client.get("/api/items?" + query).status_code == 400
+
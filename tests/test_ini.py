@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+import eolib
+from conftest import DATA
+from eolib import IniError
+
+SKILLS = eolib.read_skills(os.path.join(DATA, "skills.ini"))
+
+
+def test_skills_are_served_with_a_class_key(client):
+    table = client.get("/api/skills").json
+
+    assert table["116"]["name"] == "Aeven Master"
+    assert table["116"]["learn"][0] == {"id": 1, "cost": 100, "level": 1, "class": 0, "str_req": 0, "int_req": 1,
+                                        "wis_req": 1, "agi_req": 0, "con_req": 0, "cha_req": 0, "spell_req": []}
+    assert table["116"]["learn"][1]["spell_req"] == [1]
+    assert table == {str(npc_id): {"name": master.name, "learn": [skill.serialize() for skill in master.learn]}
+                     for npc_id, master in SKILLS.items()}
+
+
+def test_skills_are_typed():
+    skill = SKILLS[116].learn[1]
+
+    assert (skill.id, skill.cost, skill.level, skill.class_id, skill.spell_req) == (2, 200, 3, 2, [1])
+    assert (skill.str_req, skill.int_req, skill.wis_req) == (0, 3, 4)
+
+
+def test_comments_and_blank_lines_are_skipped(tmp_path):
+    file = tmp_path / "drops.ini"
+    file.write_text("# drops\n\n; more comments\nVersion = 1\n 3 = 1,1,5,12.5, 2,2,2,100 \n")
+
+    assert eolib.read_drops(str(file)) == {3: [eolib.Drop(1, 1, 5, 12.5), eolib.Drop(2, 2, 2, 100.0)]}
+
+
+@pytest.mark.parametrize("reader, text, line, message", [
+    (eolib.read_drops, "1 = 1,1,1,50\n2\n", 2, "expected key = value"),
+    (eolib.read_drops, "1 = 1,1,1,50\n1 = 2,1,1,50\n", 2, "duplicate key 1"),
+    (eolib.read_drops, "# drops\n1 = 1,1,1\n", 2, "expected groups of 4 values, got 3 values"),
+    (eolib.read_drops, "1 = 1,1,one,50\n", 1, "invalid literal"),
+    (eolib.read_drops, "goblin = 1,1,1,50\n", 1, "expected an NPC id, got goblin"),
+    (eolib.read_shops, "1.name = Shop\n1.sell = 1,2,3\n", 2, "unknown group sell"),
+    (eolib.read_shops, "1.trade = 1,2,x\n", 1, "invalid literal"),
+    (eolib.read_skills, "master.name = Master\n", 1, "expected a key such as 3.name, got master.name"),
+    (eolib.read_skills, "1.learn = 1,2,3\n", 1, "expected groups of 14 values, got 3 values"),
+])
+def test_malformed_lines_are_reported(tmp_path, reader, text, line, message):
+    file = tmp_path / "file.ini"
+    file.write_text(text)
+    with pytest.raises(IniError, match=message) as error:
+        reader(str(file))
+
+    assert (error.value.file, error.value.line) == (str(file), line)
@@ -0,0 +1,27 @@
+"""
+The WSGI entry point of the API for forking servers such as Gunicorn, configured by gunicorn.conf.py:
+
+    EOSERV_API_ARGS="--readonly --pool-size 4" gunicorn --workers 4 wsgi:app
+
+Every pub, ini and map file is decoded once in the master process before the workers are forked, so the
+workers share the decoded files copy-on-write. Threads do not survive a fork, so the background threads
+are started in each worker by the post_fork hook of the server, which calls post_fork below. Every worker
+keeps its own leaderboards, while only one of them at a time takes replica snapshots, see eoreplica.Replica.
+"""
+import os
+import shlex
+
+import main
+
+args = main.parse_arguments(shlex.split(os.environ.get("EOSERV_API_ARGS", "")))
+main.configure(args)
+main.preload(args.preload_processes, freeze=True)
+
+app = main.app
+
+
+def post_fork():
+    """
+    Starts the background threads of a freshly forked worker.
+    """
+    main.start(args)